@@ -0,0 +1,173 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.predict import RESULT_COLUMNS, StrengthIndex, predict_from_grid
+from src.simulation import _points_for_pos, prepare_race, run_trials
+from src.store import load_table
+
+METRIC_COLUMNS = ["season", "round", "model", "n_drivers", "spearman", "mae_position", "points_mae", "seconds"]
+
+
+@dataclass
+class BacktestReport:
+    events: pd.DataFrame
+    timings: Dict[str, float] = field(default_factory=dict)
+
+    def summary(self) -> pd.DataFrame:
+        """Mean metrics per model across all backtested events."""
+        if self.events.empty:
+            return pd.DataFrame(columns=["model", "events", "spearman", "mae_position", "points_mae", "seconds"])
+        return (
+            self.events.groupby("model")
+            .agg(
+                events=("round", "size"),
+                spearman=("spearman", "mean"),
+                mae_position=("mae_position", "mean"),
+                points_mae=("points_mae", "mean"),
+                seconds=("seconds", "sum"),
+            )
+            .reset_index()
+        )
+
+
+def spearman(a: np.ndarray, b: np.ndarray) -> float:
+    """Spearman rank correlation (average ranks for ties)."""
+    if len(a) < 2:
+        return float("nan")
+    ra = pd.Series(a).rank().to_numpy()
+    rb = pd.Series(b).rank().to_numpy()
+    if ra.std() == 0 or rb.std() == 0:
+        return float("nan")
+    return float(np.corrcoef(ra, rb)[0, 1])
+
+
+def score_event(predicted: pd.DataFrame, actual: pd.DataFrame) -> Dict[str, float]:
+    """
+    Compare one event's predictions to the actual classification.
+
+    `predicted` has driver, predicted_finish and expected_points; `actual`
+    has driver, position and points.
+    """
+    merged = predicted.merge(actual, on="driver", how="inner").dropna(subset=["position"])
+    if merged.empty:
+        return {"n_drivers": 0, "spearman": float("nan"), "mae_position": float("nan"), "points_mae": float("nan")}
+    pred = merged["predicted_finish"].to_numpy(dtype=float)
+    act = merged["position"].to_numpy(dtype=float)
+    return {
+        "n_drivers": len(merged),
+        "spearman": spearman(pred, act),
+        "mae_position": float(np.abs(pred - act).mean()),
+        "points_mae": float(np.abs(merged["expected_points"].to_numpy(dtype=float) - merged["points"].to_numpy(dtype=float)).mean()),
+    }
+
+
+# Shared read-only inputs, set once per worker process
+_CONTEXT: Dict[str, object] = {}
+
+
+def _init_worker(context: Dict[str, object]):
+    _CONTEXT.clear()
+    _CONTEXT.update(context)
+
+
+def _backtest_event(season: int, round_number: int) -> List[Dict[str, float]]:
+    team_idx: StrengthIndex = _CONTEXT["team_index"]
+    actual_by_event: Dict[Tuple[int, int], pd.DataFrame] = _CONTEXT["actual"]
+    grid_by_event: Dict[Tuple[int, int], pd.DataFrame] = _CONTEXT["grid"]
+    actual = actual_by_event.get((season, round_number))
+    grid = grid_by_event.get((season, round_number))
+    rows = []
+    if actual is None or grid is None:
+        return rows
+
+    if "predictor" in _CONTEXT["models"]:
+        start = time.perf_counter()
+        pred = predict_from_grid(grid, team_idx, None, season, round_number)
+        pred["expected_points"] = pred["predicted_finish"].map(_points_for_pos)
+        metrics = score_event(pred[["driver", "predicted_finish", "expected_points"]], actual)
+        rows.append({"season": season, "round": round_number, "model": "predictor",
+                     **metrics, "seconds": time.perf_counter() - start})
+
+    if "simulator" in _CONTEXT["models"]:
+        start = time.perf_counter()
+        setup = prepare_race(season, round_number, data_dir=_CONTEXT["data_dir"])
+        seeds = np.random.SeedSequence([_CONTEXT["base_seed"], season, round_number]).spawn(_CONTEXT["n_trials"])
+        summary = run_trials(setup, seeds).summary()
+        pred = pd.DataFrame({
+            "driver": summary["driver"].astype(object),
+            "predicted_finish": np.arange(1, len(summary) + 1),
+            "expected_points": summary["mean_points"],
+        })
+        metrics = score_event(pred, actual)
+        rows.append({"season": season, "round": round_number, "model": "simulator",
+                     **metrics, "seconds": time.perf_counter() - start})
+    return rows
+
+
+def run_backtest(
+    seasons: Iterable[int] = range(2022, 2026),
+    models: Iterable[str] = ("predictor", "simulator"),
+    n_trials: int = 200,
+    base_seed: int = 42,
+    n_workers: Optional[int] = None,
+    data_dir: str = "data",
+) -> BacktestReport:
+    """
+    Backtest the predictor and/or simulator on every past event of `seasons`.
+
+    Results and qualifying are loaded once and shared with a process pool
+    that runs one task per event; nothing is written to the database.
+    Each event's metrics include its wall time, and `timings` records the
+    load, index and fan-out stages.
+    """
+    seasons = list(seasons)
+    timings: Dict[str, float] = {}
+    t0 = time.perf_counter()
+
+    start = time.perf_counter()
+    results = load_table("results", columns=RESULT_COLUMNS + ["position"], data_dir=data_dir)
+    quali = load_table("qualifying", columns=["season", "round", "driver", "team", "position"], seasons=seasons, data_dir=data_dir)
+    timings["load_s"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    team_index = StrengthIndex(results, key="team")
+    actual = {
+        (int(s), int(r)): g.assign(driver=g["driver"].astype(object))[["driver", "position", "points"]]
+        for (s, r), g in results[results["season"].isin(seasons)].groupby(["season", "round"])
+    }
+    grid = {(int(s), int(r)): g for (s, r), g in quali.groupby(["season", "round"])}
+    timings["index_s"] = time.perf_counter() - start
+
+    context = {
+        "team_index": team_index,
+        "actual": actual,
+        "grid": grid,
+        "models": set(models),
+        "n_trials": n_trials,
+        "base_seed": base_seed,
+        "data_dir": data_dir,
+    }
+    events = sorted(actual)
+    n_workers = n_workers or os.cpu_count() or 1
+
+    start = time.perf_counter()
+    if n_workers == 1:
+        _init_worker(context)
+        outputs = [_backtest_event(s, r) for s, r in events]
+    else:
+        with ProcessPoolExecutor(max_workers=n_workers, initializer=_init_worker, initargs=(context,)) as pool:
+            outputs = list(pool.map(_backtest_event, [s for s, _ in events], [r for _, r in events]))
+    timings["events_s"] = time.perf_counter() - start
+    timings["total_s"] = time.perf_counter() - t0
+
+    rows = [row for event_rows in outputs for row in event_rows]
+    df = pd.DataFrame(rows, columns=METRIC_COLUMNS)
+    for model in ("predictor", "simulator"):
+        timings[f"{model}_s"] = float(df.loc[df["model"] == model, "seconds"].sum())
+    return BacktestReport(events=df, timings=timings)
@@ -0,0 +1,150 @@
+"""
+Benchmark suite on synthetic data and a local SQLite database.
+
+    python -m src.benchmark --events 4 --drivers 20 --laps 57 --out bench.json
+    python -m src.benchmark --out new.json --compare bench.json
+
+Results are written as JSON so runs can be compared for regressions.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+
+def _time(fn: Callable[[], object], repeats: int, warmup: int = 1) -> Dict[str, float]:
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return {
+        "min_s": min(samples),
+        "median_s": statistics.median(samples),
+        "mean_s": statistics.fmean(samples),
+        "repeats": repeats,
+    }
+
+
+def run_benchmarks(
+    work_dir: Path,
+    seasons: int = 1,
+    events: int = 4,
+    drivers: int = 20,
+    laps: int = 57,
+    n_trials: int = 1000,
+    repeats: int = 5,
+    seed: int = 0,
+) -> Dict[str, object]:
+    """Generate synthetic data under `work_dir`, then time each pipeline stage on it."""
+    # Point the DB layer at SQLite before anything imports it
+    os.environ["F1_DB_URI"] = f"sqlite:///{work_dir / 'bench.db'}"
+    import numpy as np
+    import pandas as pd
+    from src.db import bulk_load, get_engine, simulations
+    from src.predict import predict_finishing_positions, predict_season
+    from src.simulation import _estimate_base_pace, _load_event_data, prepare_race, run_trials, simulate_race
+    from src.store import LAP_SECONDS, apply_schema, load_partition, write_partition
+    from src.synthetic import generate_synthetic_data
+
+    data_dir = work_dir / "data"
+    start = time.perf_counter()
+    counts = generate_synthetic_data(data_dir, seasons=seasons, events=events, drivers=drivers, laps=laps, seed=seed)
+    generate_s = time.perf_counter() - start
+
+    engine = get_engine()
+    simulations.metadata.create_all(engine)
+    season, round_number = 2022 + seasons - 1, events
+    laps_evt = load_partition("laps", season, round_number, data_dir=data_dir)
+    # Legacy-style laps: FastF1 Timedeltas written to CSV as text
+    raw_laps = laps_evt.drop(columns=list(LAP_SECONDS)).assign(
+        Driver=laps_evt["Driver"].astype(object),
+        **{sources[0]: pd.to_timedelta(laps_evt[col], unit="s").astype(str) for col, sources in LAP_SECONDS.items()},
+    )
+    setup = prepare_race(season, round_number, data_dir=str(data_dir))
+    seeds = list(range(n_trials))
+    scratch = work_dir / "scratch"
+
+    benches: Dict[str, Callable[[], object]] = {
+        "load_event_data": lambda: _load_event_data(season, round_number, data_dir=str(data_dir)),
+        "estimate_base_pace": lambda: _estimate_base_pace(laps_evt),
+        "estimate_base_pace_from_strings": lambda: _estimate_base_pace(raw_laps),
+        "simulate_race": lambda: simulate_race(season, round_number, random_seed=1, data_dir=str(data_dir)),
+        f"run_trials_x{n_trials}": lambda: run_trials(setup, seeds),
+        "predict_finishing_positions": lambda: predict_finishing_positions(season, round_number, data_dir=str(data_dir)),
+        "predict_season": lambda: predict_season(season, data_dir=str(data_dir)),
+        "apply_schema_laps": lambda: apply_schema(raw_laps, "laps"),
+        "write_partition_laps": lambda: write_partition(raw_laps, "laps", season, round_number, scratch),
+        "bulk_load_laps_sqlite": lambda: bulk_load(laps_evt, "laps", db_engine=engine),
+    }
+
+    results = {}
+    for name, fn in benches.items():
+        results[name] = _time(fn, repeats)
+        print(f"{name:<34} median {results[name]['median_s'] * 1e3:9.2f} ms")
+
+    return {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "scale": {"seasons": seasons, "events": events, "drivers": drivers, "laps": laps, "n_trials": n_trials},
+            "rows": counts,
+            "generate_s": generate_s,
+        },
+        "results": results,
+    }
+
+
+def compare_results(baseline: Dict[str, object], current: Dict[str, object], threshold: float = 0.10) -> Dict[str, float]:
+    """Median-time ratio current/baseline per benchmark; prints those slower than 1 + threshold."""
+    ratios = {}
+    for name, cur in current["results"].items():
+        base = baseline["results"].get(name)
+        if not base or base["median_s"] <= 0:
+            continue
+        ratios[name] = cur["median_s"] / base["median_s"]
+        flag = "REGRESSION" if ratios[name] > 1 + threshold else ""
+        print(f"{name:<34} x{ratios[name]:6.2f} {flag}")
+    return ratios
+
+
+def main(argv: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seasons", type=int, default=1)
+    parser.add_argument("--events", type=int, default=4)
+    parser.add_argument("--drivers", type=int, default=20)
+    parser.add_argument("--laps", type=int, default=57)
+    parser.add_argument("--trials", type=int, default=1000)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default="bench.json")
+    parser.add_argument("--compare", help="baseline JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="allowed slowdown before flagging")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        report = run_benchmarks(
+            Path(tmp), seasons=args.seasons, events=args.events, drivers=args.drivers,
+            laps=args.laps, n_trials=args.trials, repeats=args.repeats, seed=args.seed,
+        )
+    Path(args.out).write_text(json.dumps(report, indent=2))
+    print(f"Wrote {args.out}")
+
+    if args.compare:
+        ratios = compare_results(json.loads(Path(args.compare).read_text()), report, args.threshold)
+        if any(r > 1 + args.threshold for r in ratios.values()):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
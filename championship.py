@@ -0,0 +1,300 @@
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, replace
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from src.simulation import RaceSetup, prepare_race, run_trials
+from src.store import has_partition, list_partitions, load_table
+
+
+@dataclass
+class ChampionshipAggregate:
+    """
+    Mergeable standings distributions over a number of season trials.
+
+    Counts are (entrants x positions): how often each driver or team ended
+    the season in each championship position. Like `RaceAggregate`, two
+    aggregates of the same season add up with `merge`, so chunks of trials
+    can be reduced as they arrive and memory never grows with `n_trials`.
+    """
+    season: int
+    rounds: List[int]
+    drivers: List[str]
+    teams: List[str]
+    driver_position_counts: np.ndarray
+    driver_points_sum: np.ndarray
+    driver_points_sq_sum: np.ndarray
+    team_position_counts: np.ndarray
+    team_points_sum: np.ndarray
+    team_points_sq_sum: np.ndarray
+    n_trials: int
+
+    def merge(self, other: "ChampionshipAggregate") -> "ChampionshipAggregate":
+        if other.drivers != self.drivers or other.teams != self.teams:
+            raise ValueError("Cannot merge aggregates with different entrants")
+        return ChampionshipAggregate(
+            season=self.season,
+            rounds=self.rounds,
+            drivers=self.drivers,
+            teams=self.teams,
+            driver_position_counts=self.driver_position_counts + other.driver_position_counts,
+            driver_points_sum=self.driver_points_sum + other.driver_points_sum,
+            driver_points_sq_sum=self.driver_points_sq_sum + other.driver_points_sq_sum,
+            team_position_counts=self.team_position_counts + other.team_position_counts,
+            team_points_sum=self.team_points_sum + other.team_points_sum,
+            team_points_sq_sum=self.team_points_sq_sum + other.team_points_sq_sum,
+            n_trials=self.n_trials + other.n_trials,
+        )
+
+    def _standings(self, names: List[str], counts: np.ndarray, pts_sum: np.ndarray, pts_sq: np.ndarray, key: str) -> pd.DataFrame:
+        n = max(self.n_trials, 1)
+        probs = counts / n
+        positions = np.arange(1, len(names) + 1)
+        mean_points = pts_sum / n
+        df = pd.DataFrame({
+            key: names,
+            "mean_position": probs @ positions,
+            "p_champion": probs[:, 0],
+            "p_top3": probs[:, :3].sum(axis=1),
+            "mean_points": mean_points,
+            "std_points": np.sqrt(np.maximum(pts_sq / n - mean_points ** 2, 0.0)),
+        })
+        return df.sort_values(["mean_position", "mean_points"], ascending=[True, False]).reset_index(drop=True)
+
+    def driver_standings(self) -> pd.DataFrame:
+        """Title odds and points per driver, best expected position first."""
+        return self._standings(self.drivers, self.driver_position_counts, self.driver_points_sum,
+                               self.driver_points_sq_sum, "driver")
+
+    def team_standings(self) -> pd.DataFrame:
+        """Title odds and points per constructor, best expected position first."""
+        return self._standings(self.teams, self.team_position_counts, self.team_points_sum,
+                               self.team_points_sq_sum, "team")
+
+    def position_distribution(self, kind: str = "drivers") -> pd.DataFrame:
+        """Probability of each driver (or team, with kind="teams") finishing the season in each position."""
+        names, counts = (self.drivers, self.driver_position_counts) if kind == "drivers" else (self.teams, self.team_position_counts)
+        return pd.DataFrame(
+            counts / max(self.n_trials, 1),
+            index=pd.Index(names, name=kind[:-1]),
+            columns=pd.RangeIndex(1, len(names) + 1, name="championship_position"),
+        )
+
+
+# Shared read-only inputs, set once per worker process
+_CONTEXT: Dict[str, object] = {}
+
+
+def _init_worker(context: Dict[str, object]):
+    _CONTEXT.clear()
+    _CONTEXT.update(context)
+
+
+def _rank(points: np.ndarray, wins: np.ndarray) -> np.ndarray:
+    """(trials x entrants) championship positions: points, then wins, then entrant order."""
+    n_trials, n = points.shape
+    order = np.lexsort((np.broadcast_to(np.arange(n), points.shape), -wins, -points), axis=1)
+    ranks = np.empty_like(order)
+    ranks[np.arange(n_trials)[:, None], order] = np.arange(n)
+    return ranks
+
+
+def _position_counts(ranks: np.ndarray) -> np.ndarray:
+    n = ranks.shape[1]
+    counts = np.zeros((n, n), dtype=np.int64)
+    for j in range(n):
+        counts[j] = np.bincount(ranks[:, j], minlength=n)
+    return counts
+
+
+def _run_chunk(n_trials: int, seeds_by_round: List[List[np.random.SeedSequence]]) -> ChampionshipAggregate:
+    """Run every remaining round for one chunk of `n_trials` season trials and reduce it."""
+    setups: List[RaceSetup] = _CONTEXT["setups"]
+    driver_maps: List[np.ndarray] = _CONTEXT["driver_maps"]
+    team_maps: List[np.ndarray] = _CONTEXT["team_maps"]
+
+    # Running totals for this chunk only: (trials x entrants)
+    driver_pts = np.tile(_CONTEXT["driver_points"], (n_trials, 1))
+    driver_wins = np.tile(_CONTEXT["driver_wins"], (n_trials, 1))
+    team_pts = np.tile(_CONTEXT["team_points"], (n_trials, 1))
+    team_wins = np.tile(_CONTEXT["team_wins"], (n_trials, 1))
+    for setup, seeds, d_idx, t_idx in zip(setups, seeds_by_round, driver_maps, team_maps):
+        batch = run_trials(setup, seeds)
+        pts = batch.points
+        won = (batch.finish_positions == 1).astype(np.int64)
+        driver_pts[:, d_idx] += pts
+        driver_wins[:, d_idx] += won
+        # Teammates share a team index, so accumulate with add.at
+        np.add.at(team_pts.T, t_idx, pts.T)
+        np.add.at(team_wins.T, t_idx, won.T)
+
+    return ChampionshipAggregate(
+        season=_CONTEXT["season"],
+        rounds=list(_CONTEXT["rounds"]),
+        drivers=list(_CONTEXT["drivers"]),
+        teams=list(_CONTEXT["teams"]),
+        driver_position_counts=_position_counts(_rank(driver_pts, driver_wins)),
+        driver_points_sum=driver_pts.sum(axis=0),
+        driver_points_sq_sum=(driver_pts ** 2).sum(axis=0),
+        team_position_counts=_position_counts(_rank(team_pts, team_wins)),
+        team_points_sum=team_pts.sum(axis=0),
+        team_points_sq_sum=(team_pts ** 2).sum(axis=0),
+        n_trials=n_trials,
+    )
+
+
+def _chunk_seeds(n_rounds: int, n_trials: int, base_seed: int, chunk_size: int):
+    """
+    Yield (size, seeds per round) for each chunk of trials, lazily. Streams
+    are spawned by chunk, then round, then trial, so results do not depend
+    on the number of workers.
+    """
+    n_chunks = -(-n_trials // chunk_size)
+    for chunk_index, chunk_seq in enumerate(np.random.SeedSequence(base_seed).spawn(n_chunks)):
+        size = min(chunk_size, n_trials - chunk_index * chunk_size)
+        yield size, [round_seq.spawn(size) for round_seq in chunk_seq.spawn(n_rounds)]
+
+
+def current_standings(season: int, after_round: int, data_dir: str = "data") -> pd.DataFrame:
+    """Actual points and wins per driver (with team) from results up to `after_round`."""
+    results = load_table("results", columns=["season", "round", "driver", "team", "position", "points"],
+                         seasons=[season], data_dir=data_dir)
+    results = results[results["round"] <= after_round]
+    df = results.assign(
+        driver=results["driver"].astype(object),
+        team=results["team"].astype(object).fillna("Unknown"),
+        win=(results["position"] == 1).astype(int),
+        points=results["points"].fillna(0.0).astype(float),
+    )
+    return (
+        df.sort_values("round")
+        .groupby("driver", sort=True)
+        .agg(team=("team", "last"), points=("points", "sum"), wins=("win", "sum"))
+        .reset_index()
+    )
+
+
+def _schedule_rounds(season: int, data_dir: str = "data") -> List[int]:
+    """Race rounds of `season` from the FastF1 schedule, or the rounds in the store if it cannot be loaded."""
+    try:
+        import fastf1
+        schedule = fastf1.get_event_schedule(season, include_testing=False)
+        return sorted(int(r) for r in schedule["RoundNumber"] if r > 0)
+    except Exception as e:
+        print(f"Could not load the {season} schedule ({e}); using the rounds in the store")
+        races = load_table("races", columns=["season", "round"], seasons=[season], data_dir=data_dir)
+        return sorted(int(r) for r in races["round"])
+
+
+def _round_setup(season: int, round_number: int, data_dir: str, sources: Dict[int, RaceSetup]) -> RaceSetup:
+    """
+    Setup for one round of the season. A round that has not been extracted
+    yet has no entry list or grid of its own, so it takes the field, grid
+    and fitted pace of the latest earlier event in the store; `sources`
+    caches those events.
+    """
+    if has_partition("races", season, round_number, data_dir):
+        return prepare_race(season, round_number, data_dir=data_dir)
+    past = [r for s, r in list_partitions("races", data_dir) if s == season and r < round_number]
+    if not past:
+        raise ValueError(f"{season} round {round_number} has no event data and no earlier {season} event to take the field from")
+    latest = max(past)
+    if latest not in sources:
+        sources[latest] = prepare_race(season, latest, data_dir=data_dir)
+    print(f"{season} round {round_number} has no event data; using the field from round {latest}")
+    return replace(sources[latest], round_number=round_number, event_name=f"Round {round_number}")
+
+
+def simulate_championship(
+    season: int,
+    after_round: int = 0,
+    rounds: Optional[Iterable[int]] = None,
+    n_trials: int = 10000,
+    base_seed: int = 42,
+    chunk_size: int = 500,
+    n_workers: Optional[int] = 1,
+    data_dir: str = "data",
+) -> ChampionshipAggregate:
+    """
+    Monte Carlo the rest of a season: drivers' and constructors' standings.
+
+    Standings start from the actual results up to `after_round` and every
+    later round of the season's schedule (or the given `rounds`) is
+    simulated, `n_trials` times. Rounds not in the store yet race the field
+    of the latest earlier event (see `_round_setup`); a ValueError is raised
+    if there is none. Each event is prepared once and shared by
+    all trials (and, with `n_workers > 1`, sent once to each worker).
+    Trials run in chunks of `chunk_size` that are reduced to a
+    `ChampionshipAggregate` as they finish, so memory is bounded by the
+    chunk, not by `n_trials`. Ties on points go to the entrant with more
+    wins.
+    """
+    if rounds is None:
+        rounds = [r for r in _schedule_rounds(season, data_dir) if r > after_round]
+    rounds = sorted(rounds)
+    sources: Dict[int, RaceSetup] = {}
+    setups = [_round_setup(season, r, data_dir, sources) for r in rounds]
+    standings = current_standings(season, after_round, data_dir) if after_round else pd.DataFrame(
+        columns=["driver", "team", "points", "wins"])
+
+    # Everyone who has scored or will race, plus their (latest) team
+    team_of: Dict[str, str] = dict(zip(standings["driver"], standings["team"]))
+    for setup in setups:
+        team_of.update({d: t if t is not None else "Unknown" for d, t in zip(setup.drivers, setup.teams)})
+    drivers = sorted(team_of)
+    teams = sorted(set(team_of.values()))
+    d_pos = {d: i for i, d in enumerate(drivers)}
+    t_pos = {t: i for i, t in enumerate(teams)}
+
+    driver_points = np.zeros(len(drivers))
+    driver_wins = np.zeros(len(drivers), dtype=np.int64)
+    team_points = np.zeros(len(teams))
+    team_wins = np.zeros(len(teams), dtype=np.int64)
+    for d, t, p, w in zip(standings["driver"], standings["team"], standings["points"], standings["wins"]):
+        driver_points[d_pos[d]] += p
+        driver_wins[d_pos[d]] += w
+        team_points[t_pos[t]] += p
+        team_wins[t_pos[t]] += w
+
+    context = {
+        "season": season,
+        "rounds": rounds,
+        "drivers": drivers,
+        "teams": teams,
+        "setups": setups,
+        "driver_maps": [np.array([d_pos[d] for d in s.drivers], dtype=np.int64) for s in setups],
+        "team_maps": [np.array([t_pos[t if t is not None else "Unknown"] for t in s.teams], dtype=np.int64) for s in setups],
+        "driver_points": driver_points,
+        "driver_wins": driver_wins,
+        "team_points": team_points,
+        "team_wins": team_wins,
+    }
+    chunks = _chunk_seeds(len(setups), n_trials, base_seed, chunk_size)
+    n_workers = n_workers or os.cpu_count() or 1
+
+    total: Optional[ChampionshipAggregate] = None
+    if n_workers == 1:
+        _init_worker(context)
+        for size, seeds in chunks:
+            agg = _run_chunk(size, seeds)
+            total = agg if total is None else total.merge(agg)
+    else:
+        with ProcessPoolExecutor(max_workers=n_workers, initializer=_init_worker, initargs=(context,)) as pool:
+            # A bounded window of chunks in flight, reduced in chunk order
+            pending: deque = deque()
+            for size, seeds in chunks:
+                pending.append(pool.submit(_run_chunk, size, seeds))
+                if len(pending) >= 2 * n_workers:
+                    agg = pending.popleft().result()
+                    total = agg if total is None else total.merge(agg)
+            while pending:
+                agg = pending.popleft().result()
+                total = agg if total is None else total.merge(agg)
+    if total is None:
+        _init_worker(context)
+        total = _run_chunk(0, [[] for _ in setups])
+    return total
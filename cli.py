@@ -0,0 +1,192 @@
+"""
+Lightweight command line entry point.
+
+    python -m src.cli predict 2024 5
+    python -m src.cli simulate 2024 5 --trials 1000
+    python -m src.cli simulate 2024 5 --persist
+    python -m src.cli simulate 2024 5 --trials 10000 --sketch
+    python -m src.cli championship 2024 --after-round 10 --trials 10000
+    python -m src.cli fit-models --season 2024
+    python -m src.cli init-db
+    python -m src.cli cache warm --year 2024 --workers 4
+    python -m src.cli cache prune --max-mb 2000
+    python -m src.cli import-budget --budget 1.5
+
+Only argparse is imported up front; each command imports what it needs,
+so `--help` and the cheap commands start without pandas, SQLAlchemy,
+FastF1 or plotly.
+"""
+import argparse
+import subprocess
+import sys
+from typing import Dict, List, Optional, Sequence
+
+# Modules whose cold import time `import-budget` checks by default
+BUDGET_MODULES = ["src.cli", "src.predict", "src.simulation", "src.compare", "src.visualize", "src.extract"]
+
+_IMPORT_PROBE = (
+    "import time; t = time.perf_counter(); import {module}; "
+    "print(time.perf_counter() - t)"
+)
+
+
+def measure_import(module: str) -> float:
+    """Seconds to import `module` in a fresh interpreter."""
+    out = subprocess.run(
+        [sys.executable, "-c", _IMPORT_PROBE.format(module=module)],
+        capture_output=True, text=True, check=True,
+    )
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def check_import_budget(modules: Sequence[str] = BUDGET_MODULES, budget_s: float = 1.5, repeats: int = 3) -> Dict[str, float]:
+    """Best-of-`repeats` cold import time per module; prints those over `budget_s`."""
+    timings = {}
+    for module in modules:
+        timings[module] = min(measure_import(module) for _ in range(repeats))
+        flag = "OVER BUDGET" if timings[module] > budget_s else ""
+        print(f"{module:<20} {timings[module] * 1e3:8.1f} ms {flag}")
+    return timings
+
+
+def _cmd_predict(args) -> int:
+    from src.predict import predict_finishing_positions
+    df = predict_finishing_positions(args.season, args.round, data_dir=args.data_dir)
+    print(df.to_string(index=False))
+    return 0
+
+
+def _cmd_simulate(args) -> int:
+    if args.sketch:
+        from src.simulation import simulate_race_sketch
+        sim_id, sketch = simulate_race_sketch(args.season, args.round, n_trials=args.trials, random_seed=args.seed,
+                                              data_dir=args.data_dir)
+        print(sketch.finish_frame().to_string(index=False))
+        print(f"Simulation {sim_id} written as a sketch of {sketch.n_trials} trials")
+        return 0
+    if args.persist:
+        from src.simulation import simulate_race
+        sim_id = simulate_race(args.season, args.round, random_seed=args.seed, data_dir=args.data_dir)
+        print(f"Simulation {sim_id} written")
+        return 0
+    from src.simulation import simulate_race_batch
+    batch = simulate_race_batch(args.season, args.round, n_trials=args.trials, random_seed=args.seed, data_dir=args.data_dir)
+    print(batch.summary().to_string(index=False))
+    return 0
+
+
+def _cmd_championship(args) -> int:
+    from src.championship import simulate_championship
+    agg = simulate_championship(args.season, after_round=args.after_round, n_trials=args.trials,
+                                base_seed=args.seed, n_workers=args.workers, data_dir=args.data_dir)
+    print(f"{args.season}: rounds {agg.rounds} simulated, {agg.n_trials} trials")
+    print(agg.driver_standings().to_string(index=False))
+    print(agg.team_standings().to_string(index=False))
+    return 0
+
+
+def _cmd_fit_models(args) -> int:
+    from src.pace_model import fit_pace_models
+    models = fit_pace_models(args.data_dir, seasons=args.season, refit=args.refit)
+    for (season, round_number), model in models.items():
+        tyres = ", ".join(f"{c} {off:+.2f}s {deg:.3f}s/lap" for c, (off, deg) in (model.tyre_model or {}).items())
+        print(f"{season} R{round_number:<3} {model.circuit or '?':<20} {tyres or 'no tyre fit'}")
+    return 0
+
+
+def _cmd_init_db(args) -> int:
+    from src.db import create_schema, refresh_event_stats
+    create_schema()
+    print(f"Schema ready; {refresh_event_stats()} event_driver_stats rows rebuilt")
+    return 0
+
+
+def _parse_session(text: str):
+    """'Q' -> ("Q", False), 'R:laps' -> ("R", True)."""
+    kind, _, extra = text.partition(":")
+    if extra not in ("", "laps"):
+        raise argparse.ArgumentTypeError(f"expected KIND or KIND:laps, got {text!r}")
+    return kind, extra == "laps"
+
+
+def _cmd_cache(args) -> int:
+    from src.fastf1_cache import DEFAULT_SESSIONS, cache_status, enforce_budget, warm_cache
+    if args.action == "warm":
+        counts = warm_cache(years=args.year, sessions=args.session or DEFAULT_SESSIONS, workers=args.workers,
+                            cache_dir=args.cache_dir, offline=args.offline)
+        return 1 if counts["failed"] and not counts["loaded"] + counts["cached"] else 0
+    if args.action == "prune":
+        enforce_budget(args.cache_dir, args.max_mb)
+    status = cache_status(args.cache_dir)
+    snapshots = int(status["snapshot_dir"].notna().sum())
+    print(f"{len(status)} cached sessions ({snapshots} with snapshots), "
+          f"{status['snapshot_bytes'].sum() / 1e6:.1f} MB snapshots, {status['raw_bytes'].sum() / 1e6:.1f} MB raw")
+    return 0
+
+
+def _cmd_import_budget(args) -> int:
+    timings = check_import_budget(args.modules or BUDGET_MODULES, args.budget, args.repeats)
+    return 1 if any(t > args.budget for t in timings.values()) else 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="f1", description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("predict", help="baseline finishing order for an event")
+    p.add_argument("season", type=int)
+    p.add_argument("round", type=int)
+    p.add_argument("--data-dir", default="data")
+    p.set_defaults(func=_cmd_predict)
+
+    p = sub.add_parser("simulate", help="Monte Carlo race summary (no DB unless --persist)")
+    p.add_argument("season", type=int)
+    p.add_argument("round", type=int)
+    p.add_argument("--trials", type=int, default=1000)
+    p.add_argument("--seed", type=int, default=42)
+    p.add_argument("--persist", action="store_true", help="run one trial and write it to the database")
+    p.add_argument("--sketch", action="store_true", help="write all trials as one compact aggregate sketch")
+    p.add_argument("--data-dir", default="data")
+    p.set_defaults(func=_cmd_simulate)
+
+    p = sub.add_parser("championship", help="title odds from simulating the rest of a season")
+    p.add_argument("season", type=int)
+    p.add_argument("--after-round", type=int, default=0, help="use actual results up to this round")
+    p.add_argument("--trials", type=int, default=10000)
+    p.add_argument("--seed", type=int, default=42)
+    p.add_argument("--workers", type=int, default=1)
+    p.add_argument("--data-dir", default="data")
+    p.set_defaults(func=_cmd_championship)
+
+    p = sub.add_parser("fit-models", help="fit or refresh the cached pace/tyre models")
+    p.add_argument("--season", type=int, action="append", help="limit to a season (repeatable)")
+    p.add_argument("--refit", action="store_true", help="refit even when the artifact is current")
+    p.add_argument("--data-dir", default="data")
+    p.set_defaults(func=_cmd_fit_models)
+
+    p = sub.add_parser("init-db", help="create the declared tables, indexes and aggregate views")
+    p.set_defaults(func=_cmd_init_db)
+
+    p = sub.add_parser("cache", help="warm, prune or inspect the managed FastF1 cache")
+    p.add_argument("action", choices=["warm", "prune", "status"])
+    p.add_argument("--year", type=int, action="append", help="season to warm (repeatable)")
+    p.add_argument("--session", type=_parse_session, action="append",
+                   help="session to warm as KIND or KIND:laps (repeatable; default Q and R:laps)")
+    p.add_argument("--workers", type=int, default=4)
+    p.add_argument("--offline", action="store_true", help="only parse what is already cached")
+    p.add_argument("--max-mb", type=float, default=None, help="size budget for prune (default FASTF1_CACHE_MAX_MB)")
+    p.add_argument("--cache-dir", default=None)
+    p.set_defaults(func=_cmd_cache)
+
+    p = sub.add_parser("import-budget", help="fail if cold imports exceed a time budget")
+    p.add_argument("modules", nargs="*")
+    p.add_argument("--budget", type=float, default=1.5, help="seconds allowed per module")
+    p.add_argument("--repeats", type=int, default=3)
+    p.set_defaults(func=_cmd_import_budget)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,36 +1,111 @@
+import weakref
+from typing import Iterable
+
 import pandas as pd
-from sqlalchemy import insert
-from src.db import engine, simulation_results, simulation_vs_actual
+from sqlalchemy import insert, select
+from src.db import ensure_indexes, get_engine, simulations, simulation_results, simulation_vs_actual
+from src.instrument import span
+from src.store import load_partition
+
+VS_ACTUAL_COLUMNS = [
+    "simulation_id", "season", "round", "driver",
+    "actual_finish", "sim_finish", "diff_positions", "actual_points", "sim_points",
+]
+
+# Engines whose indexes have been ensured, so each new engine gets checked once
+_indexes_checked: "weakref.WeakSet" = weakref.WeakSet()
+
+
+def _ensure_indexes_once(db_engine):
+    if db_engine not in _indexes_checked:
+        ensure_indexes(db_engine)
+        _indexes_checked.add(db_engine)
+
 
+def _load_actual(season: int, round_number: int, data_dir: str) -> pd.DataFrame:
+    actual_evt = load_partition("results", season, round_number, columns=["driver", "position", "points"], data_dir=data_dir)
+    actual_evt = actual_evt.rename(columns={"position": "actual_finish", "points": "actual_points"})
+    actual_evt["driver"] = actual_evt["driver"].astype(object)
+    return actual_evt
 
-def compare_sim_to_actual(simulation_id: int, season: int, round_number: int, data_dir: str = "data") -> pd.DataFrame:
+
+def _persist(merged: pd.DataFrame, db_engine):
+    records = merged[VS_ACTUAL_COLUMNS].to_dict(orient="records")
+    if records:
+        with span("db_write", table="simulation_vs_actual") as s, db_engine.begin() as conn:
+            s.add_rows(len(records))
+            conn.execute(insert(simulation_vs_actual), records)
+
+
+def compare_sim_to_actual(simulation_id: int, season: int, round_number: int, data_dir: str = "data",
+                          db_engine=None) -> pd.DataFrame:
     """
     Compare a simulation to actual results and persist per-driver diffs.
     """
-    # Load actual results from CSV store
-    actual = pd.read_csv(f"{data_dir}/results_2022_2025.csv")
-    actual_evt = actual[(actual["season"] == season) & (actual["round"] == round_number)]
-    actual_evt = actual_evt[["driver", "position", "points"]].rename(
-        columns={"position": "actual_finish", "points": "actual_points"}
-    )
+    db_engine = db_engine if db_engine is not None else get_engine()
+    _ensure_indexes_once(db_engine)
+    # Load actual results from the event store
+    actual_evt = _load_actual(season, round_number, data_dir)
 
-    # Load sim results from DB
-    sim_df = pd.read_sql_table("simulation_results", con=engine)
-    sim_evt = sim_df[sim_df["simulation_id"] == simulation_id][["driver", "finish_position", "points"]].rename(
-        columns={"finish_position": "sim_finish", "points": "sim_points"}
-    )
+    # Load only this simulation's results from DB
+    stmt = select(
+        simulation_results.c.driver,
+        simulation_results.c.finish_position.label("sim_finish"),
+        simulation_results.c.points.label("sim_points"),
+    ).where(simulation_results.c.simulation_id == simulation_id)
+    with span("db_read", table="simulation_results") as s, db_engine.connect() as conn:
+        sim_evt = pd.read_sql(stmt, conn)
+        s.add_rows(len(sim_evt))
 
     merged = actual_evt.merge(sim_evt, on="driver", how="inner")
     merged["diff_positions"] = merged["sim_finish"] - merged["actual_finish"]
 
     # Persist
-    records = merged.assign(season=season, round=round_number)[
-        ["season", "round", "driver", "actual_finish", "sim_finish", "diff_positions", "actual_points", "sim_points"]
-    ].to_dict(orient="records")
-    if records:
-        with engine.begin() as conn:
-            conn.execute(insert(simulation_vs_actual), records)
+    _persist(merged.assign(simulation_id=simulation_id, season=season, round=round_number), db_engine)
     return merged
 
 
+def compare_many(simulation_ids: Iterable[int], data_dir: str = "data", persist: bool = True,
+                 db_engine=None) -> pd.DataFrame:
+    """
+    Compare several simulations to actual results in one pass.
+
+    Results for all ids come from a single indexed query joined to
+    `simulations` for each id's (season, round); each event's actual
+    results are loaded once and all diffs are persisted in one bulk insert.
+    """
+    simulation_ids = [int(s) for s in simulation_ids]
+    if not simulation_ids:
+        return pd.DataFrame(columns=VS_ACTUAL_COLUMNS)
+    db_engine = db_engine if db_engine is not None else get_engine()
+    _ensure_indexes_once(db_engine)
 
+    stmt = (
+        select(
+            simulation_results.c.simulation_id,
+            simulations.c.season,
+            simulations.c.round,
+            simulation_results.c.driver,
+            simulation_results.c.finish_position.label("sim_finish"),
+            simulation_results.c.points.label("sim_points"),
+        )
+        .join_from(simulation_results, simulations, simulations.c.id == simulation_results.c.simulation_id)
+        .where(simulation_results.c.simulation_id.in_(simulation_ids))
+    )
+    with span("db_read", table="simulation_results") as s, db_engine.connect() as conn:
+        sims = pd.read_sql(stmt, conn)
+        s.add_rows(len(sims))
+
+    frames = []
+    for (season, round_number), sim_evt in sims.groupby(["season", "round"], sort=True):
+        actual_evt = _load_actual(int(season), int(round_number), data_dir)
+        frames.append(sim_evt.merge(actual_evt, on="driver", how="inner"))
+    if not frames:
+        return pd.DataFrame(columns=VS_ACTUAL_COLUMNS)
+
+    merged = pd.concat(frames, ignore_index=True)
+    merged["diff_positions"] = merged["sim_finish"] - merged["actual_finish"]
+    merged = merged[VS_ACTUAL_COLUMNS].sort_values(["simulation_id", "sim_finish"]).reset_index(drop=True)
+    if persist:
+        _persist(merged, db_engine)
+    return merged
@@ -1,47 +1,534 @@
 # src/db.py
+import io
 import sys
+import time
 from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
 import pandas as pd
-from sqlalchemy import create_engine
+from sqlalchemy import (
+    DDL, BigInteger, Boolean, Column, DateTime, Float, ForeignKey, Index, Integer, LargeBinary, MetaData,
+    SmallInteger, String, Table, and_, delete, event, func, insert, inspect, select, text, tuple_,
+)
 
-# --- Ensure project root is in sys.path for standalone runs ---
-project_root = Path(__file__).parent.parent
-if str(project_root) not in sys.path:
-    sys.path.insert(0, str(project_root))
-
-# --- Import DB_URI from config ---
+# --- Import settings from config ---
 try:
-    from src.config import DB_URI
+    from src import config
 except ImportError:
-    # fallback if running standalone
-    import importlib.util
-    cfg_path = project_root / "src" / "config.py"
-    spec = importlib.util.spec_from_file_location("config", str(cfg_path))
-    cfg = importlib.util.module_from_spec(spec)
-    spec.loader.exec_module(cfg)
-    DB_URI = cfg.DB_URI
+    # fallback if running standalone: make the project root importable
+    project_root = Path(__file__).parent.parent
+    if str(project_root) not in sys.path:
+        sys.path.insert(0, str(project_root))
+    from src import config
+
+from src.instrument import span
+
+# --- SQLAlchemy engine, created on first use ---
+_ENGINE = None
+
+def get_engine():
+    """Return the shared engine, creating it (and its pool) on first call."""
+    global _ENGINE
+    if _ENGINE is None:
+        from sqlalchemy import create_engine
+        kwargs = {"pool_pre_ping": config.DB_POOL_PRE_PING}
+        if not config.DB_URI.startswith("sqlite"):
+            kwargs.update(
+                pool_size=config.DB_POOL_SIZE,
+                max_overflow=config.DB_MAX_OVERFLOW,
+                pool_recycle=config.DB_POOL_RECYCLE,
+            )
+        _ENGINE = create_engine(config.DB_URI, **kwargs)
+    return _ENGINE
+
+def dispose_engine():
+    """Close pooled connections (e.g. in a forked worker) and forget the engine."""
+    global _ENGINE
+    if _ENGINE is not None:
+        _ENGINE.dispose()
+        _ENGINE = None
+
+def __getattr__(name):
+    # `from src.db import engine` keeps working, but only connects when asked
+    if name == "engine":
+        return get_engine()
+    if name == "DB_URI":
+        return config.DB_URI
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# Natural keys used for idempotent (upsert) loads of the ingestion tables
+NATURAL_KEYS: Dict[str, List[str]] = {
+    "races": ["season", "round"],
+    "results": ["season", "round", "driver"],
+    "qualifying": ["season", "round", "driver"],
+    "laps": ["season", "round", "Driver", "LapNumber"],
+    "drivers": ["driver"],
+    "constructors": ["team"],
+    "circuits": ["name"],
+}
+
+# --- Declared schema ---
+# Ingestion tables mirror the store's typed partitions (timedeltas as integer
+# nanoseconds, as _prepare_frame writes them); simulation tables are what
+# persist writes. On PostgreSQL the lap tables are partitioned: `laps` by
+# season (one range partition per season, created on load) and
+# `simulation_laps` by hash of simulation_id. SQLite ignores both.
+metadata = MetaData()
+
+# Hash partitions of simulation_laps on PostgreSQL
+SIMULATION_LAP_PARTITIONS = 8
+
+races = Table(
+    "races", metadata,
+    Column("season", SmallInteger, primary_key=True),
+    Column("round", SmallInteger, primary_key=True),
+    Column("race_name", String),
+    Column("circuit", String),
+    Column("date", DateTime),
+)
+
+results = Table(
+    "results", metadata,
+    Column("season", SmallInteger, primary_key=True),
+    Column("round", SmallInteger, primary_key=True),
+    Column("driver", String, primary_key=True),
+    Column("team", String),
+    Column("position", Float),
+    Column("laps", Float),
+    Column("time", BigInteger),
+    Column("points", Float),
+    Column("fastest_lap", String),
+    Column("grid", Float),
+    Index("ix_results_driver", "driver"),
+    Index("ix_results_team", "team"),
+)
+
+qualifying = Table(
+    "qualifying", metadata,
+    Column("season", SmallInteger, primary_key=True),
+    Column("round", SmallInteger, primary_key=True),
+    Column("driver", String, primary_key=True),
+    Column("team", String),
+    Column("position", Float),
+    Column("q1", BigInteger),
+    Column("q2", BigInteger),
+    Column("q3", BigInteger),
+    Index("ix_qualifying_driver", "driver"),
+)
+
+laps = Table(
+    "laps", metadata,
+    Column("season", SmallInteger, primary_key=True),
+    Column("round", SmallInteger, primary_key=True),
+    Column("Driver", String, primary_key=True),
+    Column("LapNumber", SmallInteger, primary_key=True),
+    Column("Team", String),
+    Column("Stint", SmallInteger),
+    Column("Compound", String),
+    Column("TyreLife", SmallInteger),
+    Column("Position", SmallInteger),
+    Column("LapTime_s", Float),
+    Column("Sector1Time_s", Float),
+    Column("Sector2Time_s", Float),
+    Column("Sector3Time_s", Float),
+    Column("PitIn", Boolean),
+    Column("PitOut", Boolean),
+    postgresql_partition_by="RANGE (season)",
+)
+
+drivers = Table("drivers", metadata, Column("driver", String, primary_key=True), Column("team", String))
+constructors = Table("constructors", metadata, Column("team", String, primary_key=True))
+circuits = Table(
+    "circuits", metadata,
+    Column("name", String, primary_key=True),
+    Column("location", String),
+    Column("country", String),
+)
 
-# --- Create SQLAlchemy engine ---
-engine = create_engine(DB_URI)
+simulations = Table(
+    "simulations", metadata,
+    Column("id", Integer, primary_key=True, autoincrement=True),
+    Column("season", SmallInteger, nullable=False),
+    Column("round", SmallInteger, nullable=False),
+    Column("event_name", String),
+    Column("strategy_model", String),
+    Column("created_at", DateTime, server_default=func.now()),
+    Index("ix_simulations_season_round", "season", "round"),
+)
 
-def push_to_db(df: pd.DataFrame, table_name: str):
+simulation_results = Table(
+    "simulation_results", metadata,
+    Column("id", Integer, primary_key=True, autoincrement=True),
+    Column("simulation_id", Integer, ForeignKey("simulations.id", ondelete="CASCADE"), nullable=False),
+    Column("driver", String, nullable=False),
+    Column("team", String),
+    Column("grid_position", SmallInteger),
+    Column("finish_position", SmallInteger),
+    Column("points", Float),
+    Column("status", String),
+    Column("total_time_s", Float),
+    Index("ix_simulation_results_simulation_id", "simulation_id"),
+)
+
+simulation_laps = Table(
+    "simulation_laps", metadata,
+    Column("simulation_id", Integer, ForeignKey("simulations.id", ondelete="CASCADE"), primary_key=True),
+    Column("lap", SmallInteger, primary_key=True),
+    Column("driver", String, primary_key=True),
+    Column("position", SmallInteger),
+    Column("lap_time_s", Float),
+    Column("stint", SmallInteger),
+    Column("tyre_compound", String),
+    Column("is_pit", Boolean),
+    postgresql_partition_by="HASH (simulation_id)",
+)
+
+simulation_pitstops = Table(
+    "simulation_pitstops", metadata,
+    Column("id", Integer, primary_key=True, autoincrement=True),
+    Column("simulation_id", Integer, ForeignKey("simulations.id", ondelete="CASCADE"), nullable=False),
+    Column("driver", String, nullable=False),
+    Column("lap", SmallInteger, nullable=False),
+    Column("pit_time_s", Float),
+    Column("from_compound", String),
+    Column("to_compound", String),
+    Index("ix_simulation_pitstops_simulation_id", "simulation_id"),
+)
+
+simulation_vs_actual = Table(
+    "simulation_vs_actual", metadata,
+    Column("id", Integer, primary_key=True, autoincrement=True),
+    Column("simulation_id", Integer, ForeignKey("simulations.id", ondelete="CASCADE"), nullable=False),
+    Column("season", SmallInteger, nullable=False),
+    Column("round", SmallInteger, nullable=False),
+    Column("driver", String, nullable=False),
+    Column("actual_finish", Float),
+    Column("sim_finish", Float),
+    Column("diff_positions", Float),
+    Column("actual_points", Float),
+    Column("sim_points", Float),
+    Index("ix_simulation_vs_actual_simulation_id", "simulation_id"),
+    Index("ix_simulation_vs_actual_season_round", "season", "round"),
+)
+
+# Compact per-batch aggregates (src.sketch), one row per sketched simulation
+simulation_sketches = Table(
+    "simulation_sketches", metadata,
+    Column("simulation_id", Integer, ForeignKey("simulations.id", ondelete="CASCADE"), primary_key=True),
+    Column("n_trials", Integer, nullable=False),
+    Column("format", Integer, nullable=False),
+    Column("payload", LargeBinary, nullable=False),
+)
+
+# Per (event, driver) qualifying-vs-race summary, refreshed event by event on ingest
+event_driver_stats = Table(
+    "event_driver_stats", metadata,
+    Column("season", SmallInteger, primary_key=True),
+    Column("round", SmallInteger, primary_key=True),
+    Column("driver", String, primary_key=True),
+    Column("team", String),
+    Column("quali_position", Float),
+    Column("finish_position", Float),
+    Column("position_delta", Float),
+    Column("points", Float),
+    Index("ix_event_driver_stats_driver", "driver"),
+    Index("ix_event_driver_stats_team", "team"),
+)
+
+for _i in range(SIMULATION_LAP_PARTITIONS):
+    event.listen(simulation_laps, "after_create", DDL(
+        f"CREATE TABLE IF NOT EXISTS simulation_laps_p{_i} PARTITION OF simulation_laps "
+        f"FOR VALUES WITH (MODULUS {SIMULATION_LAP_PARTITIONS}, REMAINDER {_i})"
+    ).execute_if(dialect="postgresql"))
+
+# Driver and team roll-ups over event_driver_stats (a few rows per event, so cheap to group)
+AGGREGATE_VIEWS = {
+    "driver_stats": (
+        "SELECT driver, COUNT(*) AS events, SUM(points) AS total_points, AVG(points) AS avg_points, "
+        "AVG(finish_position) AS avg_finish, AVG(position_delta) AS avg_position_delta "
+        "FROM event_driver_stats GROUP BY driver"
+    ),
+    "team_stats": (
+        "SELECT team, COUNT(*) AS entries, SUM(points) AS total_points, AVG(points) AS avg_points, "
+        "AVG(finish_position) AS avg_finish, AVG(position_delta) AS avg_position_delta "
+        "FROM event_driver_stats GROUP BY team"
+    ),
+}
+
+def _ensure_partitions(conn, table_name: str, df: pd.DataFrame):
+    """PostgreSQL: create the season partitions of `laps` that `df` needs."""
+    if conn.dialect.name != "postgresql" or table_name != "laps" or "season" not in df.columns:
+        return
+    quote = conn.dialect.identifier_preparer.quote
+    for season in sorted(int(s) for s in df["season"].dropna().unique()):
+        conn.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {quote(f'laps_{season}')} PARTITION OF {quote('laps')} "
+            f"FOR VALUES FROM ({season}) TO ({season + 1})"
+        ))
+
+def create_schema(db_engine=None):
+    """
+    Create every declared table, index and aggregate view that is missing.
+    Idempotent; tables created earlier (e.g. by `to_sql`) are left as they
+    are, apart from gaining the lookup indexes.
+    """
+    db_engine = db_engine if db_engine is not None else get_engine()
+    metadata.create_all(db_engine, checkfirst=True)
+    ensure_indexes(db_engine)
+    with db_engine.begin() as conn:
+        create = "CREATE OR REPLACE VIEW" if conn.dialect.name == "postgresql" else "CREATE VIEW IF NOT EXISTS"
+        for name, sql in AGGREGATE_VIEWS.items():
+            conn.execute(text(f"{create} {name} AS {sql}"))
+
+def refresh_event_stats(events: Optional[Iterable[Tuple[int, int]]] = None, db_engine=None) -> int:
+    """
+    Recompute `event_driver_stats` for the given (season, round) events, or
+    for every event when None. Qualifying position falls back to the race
+    grid. Returns the number of rows written.
+    """
+    db_engine = db_engine if db_engine is not None else get_engine()
+    stats = event_driver_stats
+    with db_engine.begin() as conn:
+        existing = set(inspect(conn).get_table_names())
+        if "results" not in existing:
+            return 0
+        stats.create(conn, checkfirst=True)
+        r = results
+        if "qualifying" in existing:
+            q = qualifying
+            source = r.outerjoin(q, and_(q.c.season == r.c.season, q.c.round == r.c.round, q.c.driver == r.c.driver))
+            quali_position = func.coalesce(q.c.position, r.c.grid)
+        else:
+            source, quali_position = r, r.c.grid
+        query = select(
+            r.c.season, r.c.round, r.c.driver, r.c.team, quali_position, r.c.position,
+            quali_position - r.c.position, r.c.points,
+        ).select_from(source)
+
+        if events is None:
+            conn.execute(delete(stats))
+        else:
+            events = sorted({(int(s), int(rd)) for s, rd in events})
+            if not events:
+                return 0
+            conn.execute(delete(stats).where(tuple_(stats.c.season, stats.c.round).in_(events)))
+            query = query.where(tuple_(r.c.season, r.c.round).in_(events))
+        with span("db_write", table="event_driver_stats") as s:
+            written = conn.execute(insert(stats).from_select(
+                ["season", "round", "driver", "team", "quali_position", "finish_position", "position_delta", "points"],
+                query,
+            )).rowcount
+            s.add_rows(max(written, 0))
+    return written
+
+def push_to_db(df: pd.DataFrame, table_name: str, upsert: bool = True):
     """
     Push a DataFrame to the database table.
     Automatically skips if DataFrame is empty.
+
+    Tables with natural keys are upserted through `bulk_load`, so re-running
+    ingestion updates rows instead of duplicating them.
     """
     if df.empty:
         print(f"No data to insert into {table_name}")
         return
-    df.to_sql(table_name, engine, if_exists="append", index=False)
+    if upsert and table_name in NATURAL_KEYS:
+        bulk_load(df, table_name)
+        return
+    with span("db_write", table=table_name) as s:
+        df.to_sql(table_name, get_engine(), if_exists="append", index=False)
+        s.add_rows(len(df))
     print(f"Inserted {len(df)} rows into {table_name}")
 
+def _prepare_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Convert dtypes the way `to_sql` would, so bulk loads match tables it created."""
+    out = df.copy()
+    for col in out.columns:
+        series = out[col]
+        if pd.api.types.is_timedelta64_dtype(series):
+            # to_sql stores timedeltas as integer nanoseconds
+            out[col] = series.astype("int64").astype(object).where(series.notna(), None)
+        elif pd.api.types.is_datetime64_any_dtype(series):
+            out[col] = pd.Series([None if pd.isna(v) else v.to_pydatetime() for v in series], index=series.index, dtype=object)
+        elif isinstance(series.dtype, pd.CategoricalDtype):
+            out[col] = series.astype(object)
+    return out
+
+def _frame_column_type(series: pd.Series):
+    """SQL type for a frame column, as `to_sql` would choose it."""
+    if pd.api.types.is_bool_dtype(series):
+        return Boolean()
+    if pd.api.types.is_integer_dtype(series) or pd.api.types.is_timedelta64_dtype(series):
+        return BigInteger()
+    if pd.api.types.is_float_dtype(series):
+        return Float()
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return DateTime()
+    return String()
+
+def _ensure_table(conn, df: pd.DataFrame, table_name: str, keys: List[str]) -> List[str]:
+    """
+    Create the table if needed (from the declared schema, else from the
+    frame) and the unique index upserts rely on. A table that already
+    exists with fewer columns (e.g. created by an older `to_sql`) gets the
+    declared columns, or for undeclared tables the frame's, added.
+    Returns its column names.
+    """
+    table = metadata.tables.get(table_name)
+    if table is not None:
+        table.create(conn, checkfirst=True)
+        _ensure_partitions(conn, table_name, df)
+    elif not inspect(conn).has_table(table_name):
+        df.head(0).to_sql(table_name, conn, index=False)
+    quote = conn.dialect.identifier_preparer.quote
+    existing = {c["name"] for c in inspect(conn).get_columns(table_name)}
+    if table is not None:
+        wanted = {c.name: c.type for c in table.columns}
+    else:
+        wanted = {c: _frame_column_type(df[c]) for c in df.columns}
+    for name, col_type in wanted.items():
+        if name not in existing:
+            conn.execute(text(
+                f"ALTER TABLE {quote(table_name)} ADD COLUMN {quote(name)} {col_type.compile(dialect=conn.dialect)}"
+            ))
+            print(f"Added missing column {name} to {table_name}")
+    conn.execute(text(
+        f"CREATE UNIQUE INDEX IF NOT EXISTS {quote('uq_' + table_name + '_natural_key')} "
+        f"ON {quote(table_name)} ({', '.join(quote(k) for k in keys)})"
+    ))
+    return [c["name"] for c in inspect(conn).get_columns(table_name)]
+
+def _upsert_sql(dialect, table_name: str, source: str, columns: List[str], keys: List[str]) -> str:
+    quote = dialect.identifier_preparer.quote
+    cols = ", ".join(quote(c) for c in columns)
+    updates = [c for c in columns if c not in keys]
+    if updates:
+        action = "DO UPDATE SET " + ", ".join(f"{quote(c)} = excluded.{quote(c)}" for c in updates)
+    else:
+        action = "DO NOTHING"
+    conflict = ", ".join(quote(k) for k in keys)
+    return f"INSERT INTO {quote(table_name)} ({cols}) {source} ON CONFLICT ({conflict}) {action}"
+
+def copy_into(conn, table_name: str, df: pd.DataFrame):
+    """Postgres: append a frame to `table_name` with COPY FROM STDIN (CSV)."""
+    quote = conn.dialect.identifier_preparer.quote
+    cols = ", ".join(quote(c) for c in df.columns)
+    buf = io.StringIO()
+    df.to_csv(buf, index=False, header=False)
+    buf.seek(0)
+    cursor = conn.connection.cursor()
+    cursor.copy_expert(f"COPY {quote(table_name)} ({cols}) FROM STDIN WITH (FORMAT csv)", buf)
+
+def _copy_chunk(conn, chunk: pd.DataFrame, table_name: str, keys: List[str]):
+    """Postgres: COPY the chunk into a temp staging table, then upsert from it."""
+    quote = conn.dialect.identifier_preparer.quote
+    cols = ", ".join(quote(c) for c in chunk.columns)
+    conn.execute(text(
+        f"CREATE TEMP TABLE _bulk_stage ON COMMIT DROP AS SELECT {cols} FROM {quote(table_name)} WITH NO DATA"
+    ))
+    copy_into(conn, "_bulk_stage", chunk)
+
+    conn.execute(text(_upsert_sql(conn.dialect, table_name, f"SELECT {cols} FROM _bulk_stage", list(chunk.columns), keys)))
+
+def _executemany_chunk(conn, chunk: pd.DataFrame, table_name: str, keys: List[str]):
+    """Portable fallback (SQLite etc.): one batched executemany per chunk."""
+    params = [f"p{i}" for i in range(len(chunk.columns))]
+    sql = _upsert_sql(conn.dialect, table_name, "VALUES (" + ", ".join(f":{p}" for p in params) + ")", list(chunk.columns), keys)
+    # Column-wise conversion to plain Python values, NaN/NaT -> None
+    values = [chunk[c].astype(object).where(chunk[c].notna(), None).tolist() for c in chunk.columns]
+    rows = [dict(zip(params, row)) for row in zip(*values)]
+    conn.execute(text(sql), rows)
+
+def bulk_load(
+    df: pd.DataFrame,
+    table_name: str,
+    keys: Optional[List[str]] = None,
+    chunksize: int = 50_000,
+    db_engine=None,
+) -> Dict[str, float]:
+    """
+    Idempotently load a DataFrame, upserting on the table's natural keys.
+
+    On PostgreSQL each chunk is streamed with COPY FROM STDIN into a staging
+    table and merged with INSERT ... ON CONFLICT; other backends (SQLite for
+    local testing) use a batched executemany of the same upsert. Columns
+    the declared schema has but an existing table lacks are added; frame
+    columns outside the declared schema are skipped with a warning. Loading results or
+    qualifying refreshes `event_driver_stats` for the events loaded.
+    Returns row count, elapsed seconds and rows per second.
+    """
+    db_engine = db_engine if db_engine is not None else get_engine()
+    keys = keys or NATURAL_KEYS.get(table_name)
+    if not keys:
+        raise ValueError(f"No natural key known for table {table_name!r}; pass keys=")
+    if df.empty:
+        print(f"No data to insert into {table_name}")
+        return {"rows": 0, "seconds": 0.0, "rows_per_s": 0.0}
+
+    deduped = df.drop_duplicates(subset=keys, keep="last")
+    frame = _prepare_frame(deduped)
+    use_copy = db_engine.dialect.name == "postgresql"
+    load_chunk = _copy_chunk if use_copy else _executemany_chunk
+
+    start = time.perf_counter()
+    with span("db_bulk_load", table=table_name, method="copy" if use_copy else "executemany") as s:
+        with db_engine.begin() as conn:
+            columns = set(_ensure_table(conn, deduped, table_name, keys))
+        skipped = [c for c in frame.columns if c not in columns]
+        if skipped:
+            print(f"Warning: {table_name} has no column for {skipped}; those values are not loaded")
+        frame = frame[[c for c in frame.columns if c in columns]]
+        for offset in range(0, len(frame), chunksize):
+            with db_engine.begin() as conn:
+                load_chunk(conn, frame.iloc[offset:offset + chunksize], table_name, keys)
+            s.incr("chunks")
+        s.add_rows(len(frame))
+    elapsed = time.perf_counter() - start
+
+    rate = len(frame) / elapsed if elapsed > 0 else float("inf")
+    print(f"Upserted {len(frame)} rows into {table_name} in {elapsed:.2f}s ({rate:,.0f} rows/s)")
+    if table_name in ("results", "qualifying"):
+        refresh_event_stats(zip(deduped["season"], deduped["round"]), db_engine)
+    return {"rows": len(frame), "seconds": elapsed, "rows_per_s": rate}
+
+def push_dataset(dataset, db_engine=None):
+    """Upsert every extracted table; laps go one event partition at a time."""
+    create_schema(db_engine)
+    for table in dataset:
+        if table == "laps" and hasattr(dataset, "iter_partitions"):
+            for _, part in dataset.iter_partitions("laps"):
+                bulk_load(part, "laps", db_engine=db_engine)
+        else:
+            bulk_load(dataset[table], table, db_engine=db_engine)
+
+# Lookup indexes for the simulation tables: (table, index name, columns)
+SIMULATION_INDEXES = [
+    ("simulations", "ix_simulations_season_round", ["season", "round"]),
+    ("simulation_results", "ix_simulation_results_simulation_id", ["simulation_id"]),
+    ("simulation_laps", "ix_simulation_laps_simulation_id", ["simulation_id"]),
+    ("simulation_pitstops", "ix_simulation_pitstops_simulation_id", ["simulation_id"]),
+    ("simulation_vs_actual", "ix_simulation_vs_actual_simulation_id", ["simulation_id"]),
+    ("simulation_vs_actual", "ix_simulation_vs_actual_season_round", ["season", "round"]),
+]
+
+def ensure_indexes(db_engine=None):
+    """Create the simulation lookup indexes on whichever of those tables exist. Idempotent."""
+    db_engine = db_engine if db_engine is not None else get_engine()
+    with db_engine.begin() as conn:
+        existing = set(inspect(conn).get_table_names())
+        quote = conn.dialect.identifier_preparer.quote
+        for table_name, index_name, cols in SIMULATION_INDEXES:
+            if table_name in existing:
+                conn.execute(text(
+                    f"CREATE INDEX IF NOT EXISTS {quote(index_name)} "
+                    f"ON {quote(table_name)} ({', '.join(quote(c) for c in cols)})"
+                ))
+
 # --- Optional test when running this file directly ---
-from sqlalchemy import text
 
 if __name__ == "__main__":
     print("Testing DB connection...")
     try:
-        with engine.connect() as conn:
+        with get_engine().connect() as conn:
             result = conn.execute(text("SELECT 1"))
             print("✅ Connection successful:", result.scalar())
     except Exception as e:
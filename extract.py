@@ -1,22 +1,27 @@
 # src/extract.py
-import fastf1
 import pandas as pd
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
-from tqdm import tqdm
 
-def setup_cache_and_dirs(cache_dir="fastf1_cache", data_dir="data"):
-    Path(cache_dir).mkdir(exist_ok=True)
+from src.fastf1_cache import enable_cache, enforce_budget, load_session, snapshot_session
+from src.instrument import span
+from src.store import StoreDataset, export_csv, has_partition, write_partition
+from src.telemetry import ingest_session_telemetry
+
+def setup_cache_and_dirs(cache_dir=None, data_dir="data", offline=False):
     Path(data_dir).mkdir(exist_ok=True)
-    fastf1.Cache.enable_cache(cache_dir)
+    enable_cache(cache_dir, offline)
     return Path(data_dir)
 
-def fetch_f1_data(years=range(2022, 2026), data_dir="data"):
-    """Fetch races, results, qualifying, laps, drivers, constructors, circuits."""
-    data_dir = Path(data_dir)
-    races_all, results_all, qualifying_all, laps_all = [], [], [], []
-    drivers_map, constructors_map, circuits_map = {}, {}, {}
+def _init_worker(cache_dir, offline):
+    # The parent applies the cache size budget once the pool is done
+    enable_cache(cache_dir, offline, evict=False)
 
-    for year in tqdm(years, desc="Seasons"):
+def _list_events(years, data_dir, resume):
+    """Past events from the schedules, minus those already in the store when resuming."""
+    import fastf1
+    events = []
+    for year in years:
         try:
             schedule = fastf1.get_event_schedule(year)
         except Exception as e:
@@ -24,103 +29,174 @@ def fetch_f1_data(years=range(2022, 2026), data_dir="data"):
             continue
 
         for _, race in schedule.iterrows():
-            round_ = race['RoundNumber']
-            race_name = race['EventName']
-            circuit = race['Location']
-            date = race['EventDate']
-
-            if pd.to_datetime(date) > pd.Timestamp.now():
+            if pd.to_datetime(race['EventDate']) > pd.Timestamp.now():
                 continue
-
-            races_all.append({
+            round_ = int(race['RoundNumber'])
+            if resume and is_event_extracted(year, round_, data_dir):
+                continue
+            events.append({
                 "season": year,
                 "round": round_,
-                "race_name": race_name,
-                "circuit": circuit,
-                "date": date
+                "race_name": race['EventName'],
+                "circuit": race['Location'],
+                "country": race['Country'],
+                "date": race['EventDate'],
             })
-            circuits_map[circuit] = {"name": circuit, "location": race['Location'], "country": race['Country']}
+    return events
 
-            # Load race session
-            try:
-                race_session = fastf1.get_session(year, round_, 'R')
+def is_event_extracted(season, round_number, data_dir="data"):
+    # The races partition is written last, so it marks a completed event
+    return has_partition("races", season, round_number, data_dir)
+
+def _fetch_event(event, data_dir, telemetry=False):
+    """Load one event's sessions and checkpoint it to the store. Returns a status string."""
+    year, round_ = event["season"], event["round"]
+    race_name, circuit = event["race_name"], event["circuit"]
+
+    # Load race session; telemetry is not snapshotted, so that needs FastF1 itself
+    try:
+        if telemetry:
+            import fastf1
+            race_session = fastf1.get_session(year, round_, 'R')
+            with span("fastf1_load", session="R"):
                 race_session.load(laps=True, telemetry=True)
-            except Exception as e:
-                print(f"Skipping {race_name} ({year}) - race data unavailable: {e}")
-                continue
+            snapshot_session(race_session, year, round_, 'R', laps=True)
+        else:
+            race_session = load_session(year, round_, 'R', laps=True)
+    except Exception as e:
+        return f"Skipping {race_name} ({year}) - race data unavailable: {e}"
+
+    # Results
+    res_df = race_session.results.reset_index()
+    results_evt = pd.DataFrame({
+        "season": year,
+        "round": round_,
+        "driver": res_df['Abbreviation'],
+        "team": res_df['TeamName'],
+        "position": res_df['Position'],
+        "laps": res_df['Laps'],
+        "time": res_df['Time'],
+        "points": res_df['Points'],
+        "fastest_lap": res_df.get('FastestLap'),
+        "grid": res_df.get("Grid"),
+    })
+    drivers_evt = pd.DataFrame({"season": year, "round": round_, "driver": res_df['FullName'], "team": res_df['TeamName']})
+
+    # Qualifying
+    status = f"Fetched {race_name} ({year})"
+    try:
+        qual_session = load_session(year, round_, 'Q')
+        qual_df = qual_session.results.reset_index()
+        qualifying_evt = pd.DataFrame({
+            "season": year,
+            "round": round_,
+            "driver": qual_df['Abbreviation'],
+            "team": qual_df['TeamName'] if 'TeamName' in qual_df else qual_df.get('Team'),
+            "position": qual_df['Position'],
+            "q1": qual_df.get('Q1'),
+            "q2": qual_df.get('Q2'),
+            "q3": qual_df.get('Q3'),
+        })
+    except Exception:
+        # fallback: use grid from race if quali missing
+        qualifying_evt = pd.DataFrame({
+            "season": year,
+            "round": round_,
+            "driver": res_df['Abbreviation'],
+            "team": res_df['TeamName'],
+            "position": res_df.get('Grid'),
+            "q1": None,
+            "q2": None,
+            "q3": None,
+        })
+        status = f"Qualifying data missing for {race_name} ({year}) - using grid fallback"
 
-            # Results
-            res_df = race_session.results.reset_index()
-            for _, r in res_df.iterrows():
-                results_all.append({
-                    "season": year,
-                    "round": round_,
-                    "driver": r['Abbreviation'],
-                    "team": r['TeamName'],
-                    "position": r['Position'],
-                    "laps": r['Laps'],
-                    "time": r['Time'],
-                    "points": r['Points'],
-                    "fastest_lap": r.get('FastestLap', None),
-                    "grid": r.get("Grid", None)
-                })
-                drivers_map[r['Abbreviation']] = {"driver": r['FullName'], "team": r['TeamName']}
-                constructors_map[r['TeamName']] = {"team": r['TeamName']}
-
-            # Qualifying
+    # Laps
+    laps = race_session.laps.copy()
+    laps['season'] = year
+    laps['round'] = round_
+
+    write_partition(results_evt, "results", year, round_, data_dir)
+    write_partition(qualifying_evt, "qualifying", year, round_, data_dir)
+    write_partition(laps, "laps", year, round_, data_dir)
+    write_partition(drivers_evt, "drivers", year, round_, data_dir)
+    if telemetry:
+        try:
+            ingest_session_telemetry(race_session, year, round_, data_dir)
+        except Exception as e:
+            status += f" - telemetry unavailable: {e}"
+    write_partition(pd.DataFrame([{
+        "season": year, "round": round_, "name": circuit, "location": circuit, "country": event["country"],
+    }]), "circuits", year, round_, data_dir)
+    # Races last: its partition is the event's completion checkpoint
+    write_partition(pd.DataFrame([{
+        "season": year, "round": round_, "race_name": race_name, "circuit": circuit, "date": event["date"],
+    }]), "races", year, round_, data_dir)
+    return status
+
+def _export_csvs(data_dir):
+    """Rebuild the season-wide CSVs from the store, streaming one event at a time."""
+    for table in ("races", "results", "qualifying", "laps"):
+        export_csv(table, data_dir/f"{table}_2022_2025.csv", data_dir)
+    dataset = StoreDataset(data_dir)
+    for table in ("drivers", "constructors", "circuits"):
+        dataset[table].to_csv(data_dir/f"{table}_2022_2025.csv", index=False)
+    return dataset
+
+def fetch_f1_data(
+    years=range(2022, 2026),
+    data_dir="data",
+    workers=1,
+    resume=True,
+    telemetry=False,
+    cache_dir=None,
+    offline=False,
+):
+    """
+    Fetch races, results, qualifying, laps, drivers, constructors, circuits.
+
+    Each event is written to the partitioned Parquet store (data/store) as
+    soon as it has been fetched, so a crash only loses events in flight.
+    With `resume` (default) events already in the store are skipped and
+    only new rounds are fetched. `workers > 1` fetches events in a process
+    pool; `offline=True` serves everything from session snapshots and
+    the FastF1 cache without touching the network (see src.fastf1_cache,
+    whose size budget is applied at the end). With `telemetry=True` the
+    race's car telemetry is also loaded and written per lap to the
+    telemetry store (see src.telemetry).
+
+    Returns a lazy `StoreDataset`: tables are read from disk on access, so
+    peak memory stays at about one event regardless of how many seasons
+    are extracted.
+    """
+    from tqdm import tqdm
+    data_dir = setup_cache_and_dirs(cache_dir, data_dir, offline)
+
+    events = _list_events(years, data_dir, resume)
+    progress = tqdm(total=len(events), desc="Events")
+
+    if workers <= 1:
+        for event in events:
+            progress.set_postfix_str(f"{event['season']} R{event['round']}")
             try:
-                qual_session = fastf1.get_session(year, round_, 'Q')
-                qual_session.load(results=True, laps=False, telemetry=False)
-                qual_df = qual_session.results.reset_index()
-                for _, q in qual_df.iterrows():
-                    qualifying_all.append({
-                        "season": year,
-                        "round": round_,
-                        "driver": q['Abbreviation'],
-                        "team": q['TeamName'] if 'TeamName' in q else q.get('Team', None),
-                        "position": q['Position'],
-                        "q1": q.get('Q1', None),
-                        "q2": q.get('Q2', None),
-                        "q3": q.get('Q3', None)
-                    })
-            except Exception:
-                # fallback: use grid from race if quali missing
-                for _, r in res_df.iterrows():
-                    qualifying_all.append({
-                        "season": year,
-                        "round": round_,
-                        "driver": r['Abbreviation'],
-                        "team": r['TeamName'],
-                        "position": r.get('Grid', None),
-                        "q1": None,
-                        "q2": None,
-                        "q3": None
-                    })
-                print(f"Qualifying data missing for {race_name} ({year}) - using grid fallback")
-
-            # Laps
-            laps = race_session.laps.copy()
-            laps['season'] = year
-            laps['round'] = round_
-            laps_all.append(laps)
-
-    # Save CSVs
-    pd.DataFrame(races_all).to_csv(data_dir/"races_2022_2025.csv", index=False)
-    pd.DataFrame(results_all).to_csv(data_dir/"results_2022_2025.csv", index=False)
-    pd.DataFrame(qualifying_all).to_csv(data_dir/"qualifying_2022_2025.csv", index=False)
-    if laps_all:
-        pd.concat(laps_all).to_csv(data_dir/"laps_2022_2025.csv", index=False)
-    pd.DataFrame(list(drivers_map.values())).to_csv(data_dir/"drivers_2022_2025.csv", index=False)
-    pd.DataFrame(list(constructors_map.values())).to_csv(data_dir/"constructors_2022_2025.csv", index=False)
-    pd.DataFrame(list(circuits_map.values())).to_csv(data_dir/"circuits_2022_2025.csv", index=False)
+                tqdm.write(_fetch_event(event, data_dir, telemetry))
+            except Exception as e:
+                tqdm.write(f"Failed {event['race_name']} ({event['season']}): {e}")
+            progress.update()
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(cache_dir, offline)) as pool:
+            futures = {pool.submit(_fetch_event, event, data_dir, telemetry): event for event in events}
+            for fut in as_completed(futures):
+                event = futures[fut]
+                progress.set_postfix_str(f"{event['season']} R{event['round']}")
+                try:
+                    tqdm.write(fut.result())
+                except Exception as e:
+                    tqdm.write(f"Failed {event['race_name']} ({event['season']}): {e}")
+                progress.update()
+    progress.close()
+    enforce_budget(cache_dir)
 
+    data = _export_csvs(data_dir)
     print("✅ All CSVs saved successfully.")
-    return {
-        "races": pd.DataFrame(races_all),
-        "results": pd.DataFrame(results_all),
-        "qualifying": pd.DataFrame(qualifying_all),
-        "laps": pd.concat(laps_all) if laps_all else pd.DataFrame(),
-        "drivers": pd.DataFrame(list(drivers_map.values())),
-        "constructors": pd.DataFrame(list(constructors_map.values())),
-        "circuits": pd.DataFrame(list(circuits_map.values()))
-    }
+    return data
@@ -0,0 +1,381 @@
+"""
+Managed FastF1 cache: parsed-session snapshots, warm-up and a size budget.
+
+FastF1 keeps raw API responses under FASTF1_CACHE, but every cold load
+still re-parses them. On top of that cache this module keeps the parsed
+frames we actually use, one directory per session:
+
+    fastf1_cache/snapshots/season=2024/round=5/R/results.parquet
+    fastf1_cache/snapshots/season=2024/round=5/R/laps.parquet
+    fastf1_cache/snapshots/season=2024/round=5/R/meta.json
+
+`load_session` serves a session from its snapshot when it has the parts
+asked for, without importing FastF1 at all; otherwise it loads the session
+through FastF1 and snapshots it once the session is over. In offline mode
+(`offline=True` or FASTF1_OFFLINE=1) FastF1 is put in its own offline mode,
+so a session missing from both layers fails instead of being requested.
+
+`warm_cache` prefetches sessions in parallel, and `enforce_budget` evicts
+whole sessions (snapshot plus FastF1's raw files for it), least recently
+used first, until they fit in FASTF1_CACHE_MAX_MB. New snapshots only add
+to a running total, so the cache is rescanned when that total passes the
+budget, not on every load. FastF1's HTTP response database is not per
+session and is not counted.
+"""
+import json
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Sequence, Tuple
+
+import pandas as pd
+
+from src.config import FASTF1_CACHE, FASTF1_CACHE_MAX_MB, FASTF1_OFFLINE
+from src.instrument import span
+
+SNAPSHOT_SUBDIR = "snapshots"
+SNAPSHOT_FORMAT = 1
+# Session types and whether their laps are needed, as extract uses them
+DEFAULT_SESSIONS: Tuple[Tuple[str, bool], ...] = (("Q", False), ("R", True))
+# Sessions are snapshotted only this long after their start, so live and
+# freshly finished sessions (provisional results) keep coming from FastF1
+FINAL_AFTER = pd.Timedelta(hours=12)
+# Eviction goes down to this share of the budget, so the next few
+# snapshots do not each trigger another scan
+EVICT_TO = 0.9
+
+
+@dataclass
+class CachedSession:
+    """Parsed frames of one session; stands in for a loaded FastF1 `Session`."""
+    season: int
+    round_number: int
+    kind: str
+    results: pd.DataFrame
+    laps: Optional[pd.DataFrame] = None
+
+
+# Cache directory, offline flag and eviction setting of this process
+_STATE: Dict[str, object] = {}
+# Cache directory -> running total of cached session bytes
+_SIZES: Dict[str, int] = {}
+
+
+def enable_cache(cache_dir=None, offline: bool = False, evict: bool = True) -> Path:
+    """
+    Point FastF1 at `cache_dir` (default FASTF1_CACHE) and make it the
+    default for `load_session`. Pool workers pass `evict=False` and leave
+    the budget to the parent process.
+    """
+    import fastf1
+    cache_dir = Path(cache_dir or FASTF1_CACHE)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    offline = bool(offline or FASTF1_OFFLINE)
+    fastf1.Cache.enable_cache(str(cache_dir))
+    if offline:
+        fastf1.Cache.offline_mode(True)
+    _STATE.update(cache_dir=cache_dir, offline=offline, evict=evict, fastf1=True)
+    return cache_dir
+
+
+def _cache_dir(cache_dir=None) -> Path:
+    return Path(cache_dir or _STATE.get("cache_dir") or FASTF1_CACHE)
+
+
+def snapshot_dir(season: int, round_number: int, kind: str, cache_dir=None) -> Path:
+    return _cache_dir(cache_dir) / SNAPSHOT_SUBDIR / f"season={int(season)}" / f"round={int(round_number)}" / kind
+
+
+def _read_meta(path: Path) -> Optional[dict]:
+    try:
+        meta = json.loads((path / "meta.json").read_text())
+    except (FileNotFoundError, ValueError):
+        return None
+    return meta if meta.get("format") == SNAPSHOT_FORMAT else None
+
+
+def _write_frame(df: pd.DataFrame, path: Path, name: str) -> str:
+    """Parquet when Arrow can type every column, pickle otherwise. Returns the file name."""
+    import pyarrow as pa
+    df = pd.DataFrame(df)  # FastF1's Laps/SessionResults subclasses
+    try:
+        file_name = f"{name}.parquet"
+        df.to_parquet(path / f"{file_name}.tmp")
+    except (pa.ArrowException, TypeError, ValueError):
+        (path / f"{file_name}.tmp").unlink(missing_ok=True)
+        file_name = f"{name}.pkl"
+        df.to_pickle(path / f"{file_name}.tmp", compression=None)
+    (path / f"{file_name}.tmp").replace(path / file_name)
+    return file_name
+
+
+def _read_frame(path: Path, file_name: str) -> pd.DataFrame:
+    if file_name.endswith(".parquet"):
+        return pd.read_parquet(path / file_name)
+    return pd.read_pickle(path / file_name)
+
+
+def read_snapshot(season: int, round_number: int, kind: str, laps: bool = False,
+                  cache_dir=None) -> Optional[CachedSession]:
+    """The session's snapshot if it has results (and laps, when asked for), else None."""
+    path = snapshot_dir(season, round_number, kind, cache_dir)
+    meta = _read_meta(path)
+    if meta is None or (laps and "laps" not in meta["parts"]):
+        return None
+    with span("snapshot_load", session=kind):
+        frames = {part: _read_frame(path, file_name) for part, file_name in meta["parts"].items()}
+    # Touch the marker: its mtime is the session's last use for eviction
+    os.utime(path / "meta.json")
+    return CachedSession(int(season), int(round_number), kind, frames["results"], frames.get("laps"))
+
+
+def write_snapshot(session, season: int, round_number: int, kind: str, laps: bool = False,
+                   cache_dir=None) -> Path:
+    """
+    Snapshot a loaded FastF1 session's results (and laps). meta.json is
+    written last and marks a complete snapshot.
+    """
+    path = snapshot_dir(season, round_number, kind, cache_dir)
+    path.mkdir(parents=True, exist_ok=True)
+    (path / "meta.json").unlink(missing_ok=True)
+    parts = {"results": _write_frame(session.results, path, "results")}
+    if laps:
+        parts["laps"] = _write_frame(session.laps, path, "laps")
+    api_path = getattr(session, "api_path", None)
+    meta = {
+        "format": SNAPSHOT_FORMAT,
+        "season": int(season),
+        "round": int(round_number),
+        "kind": kind,
+        "parts": parts,
+        # FastF1 stores the session's raw files under <cache>/<api path without /static/>
+        "raw_dir": api_path[len("/static/"):] if isinstance(api_path, str) and api_path.startswith("/static/") else None,
+    }
+    (path / "meta.json.tmp").write_text(json.dumps(meta, indent=1))
+    (path / "meta.json.tmp").replace(path / "meta.json")
+    return path
+
+
+def _is_final(session) -> bool:
+    """Whether the session ended long enough ago to be snapshotted; unknown dates count as final."""
+    date = getattr(session, "date", None)
+    if date is None or pd.isna(date):
+        return True
+    date = pd.Timestamp(date)
+    now = pd.Timestamp.now(tz=date.tz) if date.tz is not None else pd.Timestamp.now(tz="UTC").tz_localize(None)
+    return now - date > FINAL_AFTER
+
+
+def session_not_available_errors() -> Tuple[type, ...]:
+    """
+    FastF1 exceptions meaning a session has no data yet (not run or not
+    started), as opposed to a failed load. Imports FastF1, so only evaluate
+    it in an `except` clause.
+    """
+    from fastf1._api import SessionNotAvailableError
+    from fastf1.exceptions import DataNotLoadedError, NoLapDataError
+    return SessionNotAvailableError, DataNotLoadedError, NoLapDataError
+
+
+def load_session(season: int, round_number: int, kind: str, laps: bool = False,
+                 cache_dir=None, offline: Optional[bool] = None, refresh: bool = False):
+    """
+    Results (and laps) of one session: from its snapshot when present,
+    otherwise loaded through FastF1 and snapshotted if the session is over.
+
+    Returns a `CachedSession` or the loaded FastF1 session; both have
+    `.results` and, when `laps=True`, `.laps`. `refresh` skips the snapshot.
+    """
+    if not refresh:
+        snapshot = read_snapshot(season, round_number, kind, laps, cache_dir)
+        if snapshot is not None:
+            return snapshot
+
+    if not _STATE.get("fastf1") or (cache_dir is not None and Path(cache_dir) != _STATE.get("cache_dir")):
+        enable_cache(cache_dir, offline=bool(offline), evict=bool(_STATE.get("evict", True)))
+    elif offline and not _STATE.get("offline"):
+        import fastf1
+        fastf1.Cache.offline_mode(True)
+        _STATE["offline"] = True
+
+    import fastf1
+    session = fastf1.get_session(season, round_number, kind)
+    with span("fastf1_load", session=kind):
+        session.load(results=True, laps=laps, telemetry=False, weather=False, messages=laps)
+    snapshot_session(session, season, round_number, kind, laps, cache_dir)
+    return session
+
+
+def snapshot_session(session, season: int, round_number: int, kind: str, laps: bool = False,
+                     cache_dir=None) -> bool:
+    """Snapshot a session loaded through FastF1 if it is over and has results; applies the budget."""
+    if not _is_final(session) or session.results.empty:
+        return False
+    path = write_snapshot(session, season, round_number, kind, laps, cache_dir)
+    if _STATE.get("evict", True) and FASTF1_CACHE_MAX_MB:
+        key = str(_cache_dir(cache_dir))
+        if key in _SIZES:
+            meta = _read_meta(path) or {}
+            raw = _cache_dir(cache_dir) / meta["raw_dir"] if meta.get("raw_dir") else None
+            _SIZES[key] += _dir_size(path) + (_dir_size(raw) if raw is not None and raw.is_dir() else 0)
+        else:
+            # First snapshot in this process: one scan to start the running total
+            _SIZES[key] = int(cache_status(cache_dir)["bytes"].sum())
+        if _SIZES[key] > FASTF1_CACHE_MAX_MB * 1024 * 1024:
+            enforce_budget(cache_dir)
+    return True
+
+
+# --- Size budget ---
+
+def _dir_size(path: Path) -> int:
+    return sum(f.stat().st_size for f in path.rglob("*") if f.is_file())
+
+
+def _raw_session_dirs(cache_dir: Path) -> Iterable[Path]:
+    """FastF1's per-session directories: <year>/<event>/<session>/*.ff1pkl."""
+    for year_dir in cache_dir.iterdir():
+        if year_dir.is_dir() and year_dir.name.isdigit():
+            for path in year_dir.glob("*/*"):
+                if path.is_dir():
+                    yield path
+
+
+def cache_status(cache_dir=None) -> pd.DataFrame:
+    """
+    One row per cached session, least recently used first: its snapshot
+    and raw FastF1 directories, their bytes and last use. Raw sessions
+    without a snapshot are listed by the newest file in them.
+    """
+    cache_dir = _cache_dir(cache_dir)
+    rows = []
+    claimed = set()
+    for meta_path in (cache_dir / SNAPSHOT_SUBDIR).glob("season=*/round=*/*/meta.json"):
+        meta = _read_meta(meta_path.parent)
+        if meta is None:
+            continue
+        raw = cache_dir / meta["raw_dir"] if meta.get("raw_dir") else None
+        raw = raw if raw is not None and raw.is_dir() else None
+        if raw is not None:
+            claimed.add(raw.resolve())
+        rows.append({
+            "season": meta["season"], "round": meta["round"], "kind": meta["kind"],
+            "parts": ",".join(meta["parts"]),
+            "snapshot_dir": str(meta_path.parent), "raw_dir": str(raw) if raw is not None else None,
+            "snapshot_bytes": _dir_size(meta_path.parent), "raw_bytes": _dir_size(raw) if raw is not None else 0,
+            "last_used": meta_path.stat().st_mtime,
+        })
+    if cache_dir.is_dir():
+        for raw in _raw_session_dirs(cache_dir):
+            if raw.resolve() in claimed:
+                continue
+            files = [f for f in raw.rglob("*") if f.is_file()]
+            rows.append({
+                "season": int(raw.parent.parent.name), "round": None, "kind": raw.name, "parts": "",
+                "snapshot_dir": None, "raw_dir": str(raw),
+                "snapshot_bytes": 0, "raw_bytes": sum(f.stat().st_size for f in files),
+                "last_used": max((f.stat().st_mtime for f in files), default=0.0),
+            })
+    columns = ["season", "round", "kind", "parts", "snapshot_dir", "raw_dir", "snapshot_bytes", "raw_bytes", "last_used"]
+    df = pd.DataFrame(rows, columns=columns)
+    df["bytes"] = df["snapshot_bytes"] + df["raw_bytes"]
+    return df.sort_values("last_used", kind="stable").reset_index(drop=True)
+
+
+def enforce_budget(cache_dir=None, max_mb: Optional[float] = None) -> int:
+    """
+    If the cached sessions exceed `max_mb` (default FASTF1_CACHE_MAX_MB;
+    0 means no limit), evict the least recently used ones until they fit
+    in EVICT_TO of it. The most recently used session is always kept.
+    Returns the bytes freed.
+    """
+    max_mb = FASTF1_CACHE_MAX_MB if max_mb is None else max_mb
+    if not max_mb:
+        return 0
+    status = cache_status(cache_dir)
+    total, budget, freed = int(status["bytes"].sum()), int(max_mb * 1024 * 1024), 0
+    target = budget * EVICT_TO if total > budget else total
+    for row in status.iloc[:-1].itertuples():
+        if total - freed <= target:
+            break
+        for path in (row.snapshot_dir, row.raw_dir):
+            if path:
+                shutil.rmtree(path, ignore_errors=True)
+        freed += int(row.bytes)
+    _SIZES[str(_cache_dir(cache_dir))] = total - freed
+    if freed:
+        print(f"FastF1 cache: evicted {freed / 1e6:.1f} MB to stay under {max_mb} MB")
+    return freed
+
+
+# --- Warm-up ---
+
+def _init_worker(cache_dir, offline):
+    enable_cache(cache_dir, offline, evict=False)
+
+
+def _warm_session(season: int, round_number: int, kind: str, laps: bool) -> str:
+    start = time.perf_counter()
+    if read_snapshot(season, round_number, kind, laps) is not None:
+        return "cached"
+    load_session(season, round_number, kind, laps)
+    return f"loaded in {time.perf_counter() - start:.1f}s"
+
+
+def warm_cache(
+    years: Optional[Iterable[int]] = None,
+    events: Optional[Sequence[Tuple[int, int]]] = None,
+    sessions: Sequence[Tuple[str, bool]] = DEFAULT_SESSIONS,
+    workers: int = 4,
+    cache_dir=None,
+    offline: bool = False,
+) -> Dict[str, int]:
+    """
+    Prefetch and parse `sessions` ((kind, with laps) pairs) of every past
+    event of `years`, or of the given (season, round) `events`, so later
+    loads are served from snapshots. Runs `workers` loads in parallel and
+    applies the size budget once at the end. Returns counts per outcome.
+    """
+    from tqdm import tqdm
+    cache_dir = enable_cache(cache_dir, offline)
+    if events is None:
+        from src.extract import _list_events
+        events = [(e["season"], e["round"]) for e in _list_events(years or [], None, resume=False)]
+    tasks = [(int(s), int(r), kind, laps) for s, r in events for kind, laps in sessions]
+
+    counts = {"cached": 0, "loaded": 0, "failed": 0}
+    progress = tqdm(total=len(tasks), desc="Sessions")
+
+    def _record(task, outcome):
+        counts["cached" if outcome == "cached" else "loaded"] += 1
+        progress.set_postfix_str(f"{task[0]} R{task[1]} {task[2]} {outcome}")
+        progress.update()
+
+    def _failed(task, e):
+        counts["failed"] += 1
+        tqdm.write(f"Could not load {task[0]} R{task[1]} {task[2]}: {e}")
+        progress.update()
+
+    if workers <= 1:
+        for task in tasks:
+            try:
+                _record(task, _warm_session(*task))
+            except Exception as e:
+                _failed(task, e)
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(str(cache_dir), offline)) as pool:
+            futures = {pool.submit(_warm_session, *task): task for task in tasks}
+            for fut in as_completed(futures):
+                try:
+                    _record(futures[fut], fut.result())
+                except Exception as e:
+                    _failed(futures[fut], e)
+    progress.close()
+
+    enforce_budget(cache_dir)
+    print(f"FastF1 cache warm: {counts['cached']} already cached, {counts['loaded']} loaded, {counts['failed']} failed")
+    return counts
@@ -0,0 +1,201 @@
+"""
+Lightweight stage instrumentation: timing spans with call, row and custom
+counters, exportable as structured log lines or a Prometheus text file,
+plus an opt-in cProfile/tracemalloc capture for a single run.
+
+    with span("load_event_data", season=2024) as s:
+        ...
+        s.add_rows(len(laps))
+
+    export_prometheus("metrics.prom")
+"""
+import cProfile
+import io
+import json
+import logging
+import pstats
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_Key = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+
+@dataclass
+class SpanStats:
+    calls: int = 0
+    errors: int = 0
+    total_s: float = 0.0
+    max_s: float = 0.0
+    rows: int = 0
+    counters: Dict[str, float] = field(default_factory=dict)
+
+
+class Span:
+    """Handle yielded by `span`; attach row counts and counters while it runs."""
+
+    def __init__(self, name: str, labels: Dict[str, str]):
+        self.name = name
+        self.labels = labels
+        self.rows = 0
+        self.counters: Dict[str, float] = {}
+        self.elapsed = 0.0
+
+    def add_rows(self, n: int):
+        self.rows += int(n)
+
+    def incr(self, counter: str, n: float = 1):
+        self.counters[counter] = self.counters.get(counter, 0) + n
+
+
+class MetricsRegistry:
+    """Thread-safe aggregate of finished spans, keyed by name and labels."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats: Dict[_Key, SpanStats] = {}
+
+    def record(self, s: Span, failed: bool = False):
+        key = (s.name, tuple(sorted(s.labels.items())))
+        with self._lock:
+            st = self._stats.setdefault(key, SpanStats())
+            st.calls += 1
+            st.errors += int(failed)
+            st.total_s += s.elapsed
+            st.max_s = max(st.max_s, s.elapsed)
+            st.rows += s.rows
+            for k, v in s.counters.items():
+                st.counters[k] = st.counters.get(k, 0) + v
+
+    def snapshot(self) -> Dict[_Key, SpanStats]:
+        with self._lock:
+            return {k: SpanStats(v.calls, v.errors, v.total_s, v.max_s, v.rows, dict(v.counters)) for k, v in self._stats.items()}
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+
+METRICS = MetricsRegistry()
+
+# When True, every finished span is also logged as one JSON line at DEBUG level
+LOG_SPANS = False
+
+
+@contextmanager
+def span(name: str, **labels) -> Iterator[Span]:
+    s = Span(name, {k: str(v) for k, v in labels.items()})
+    start = time.perf_counter()
+    failed = False
+    try:
+        yield s
+    except BaseException:
+        failed = True
+        raise
+    finally:
+        s.elapsed = time.perf_counter() - start
+        METRICS.record(s, failed)
+        if LOG_SPANS:
+            logger.debug(json.dumps({
+                "span": name, **s.labels, "seconds": round(s.elapsed, 6),
+                "rows": s.rows, **s.counters, "error": failed,
+            }))
+
+
+def log_metrics(log: Optional[logging.Logger] = None, level: int = logging.INFO):
+    """Emit one structured (JSON) log line per aggregated span."""
+    log = log or logger
+    for (name, labels), st in sorted(METRICS.snapshot().items()):
+        log.log(level, json.dumps({
+            "span": name, **dict(labels), "calls": st.calls, "errors": st.errors,
+            "total_s": round(st.total_s, 6), "max_s": round(st.max_s, 6), "rows": st.rows, **st.counters,
+        }))
+
+
+def _prom_labels(name: str, labels: Tuple[Tuple[str, str], ...]) -> str:
+    items = [("span", name)] + list(labels)
+    escaped = (v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in items)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(items, escaped)) + "}"
+
+
+def prometheus_text(prefix: str = "f1") -> str:
+    """Render the registry in the Prometheus text exposition format."""
+    snap = sorted(METRICS.snapshot().items())
+    lines = []
+    metrics = [
+        ("span_calls_total", "counter", "Completed spans", lambda st: st.calls),
+        ("span_errors_total", "counter", "Spans that raised", lambda st: st.errors),
+        ("span_seconds_total", "counter", "Wall time spent in spans", lambda st: st.total_s),
+        ("span_seconds_max", "gauge", "Longest single span", lambda st: st.max_s),
+        ("span_rows_total", "counter", "Rows processed in spans", lambda st: st.rows),
+    ]
+    for metric, kind, help_text, value in metrics:
+        lines.append(f"# HELP {prefix}_{metric} {help_text}")
+        lines.append(f"# TYPE {prefix}_{metric} {kind}")
+        for (name, labels), st in snap:
+            lines.append(f"{prefix}_{metric}{_prom_labels(name, labels)} {value(st)}")
+    counter_names = sorted({c for _, st in snap for c in st.counters})
+    for counter in counter_names:
+        lines.append(f"# TYPE {prefix}_{counter}_total counter")
+        for (name, labels), st in snap:
+            if counter in st.counters:
+                lines.append(f"{prefix}_{counter}_total{_prom_labels(name, labels)} {st.counters[counter]}")
+    return "\n".join(lines) + "\n"
+
+
+def export_prometheus(path, prefix: str = "f1") -> Path:
+    """Write the registry to a local .prom file (e.g. for node_exporter's textfile collector)."""
+    path = Path(path)
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    tmp.write_text(prometheus_text(prefix))
+    tmp.replace(path)
+    return path
+
+
+@dataclass
+class ProfileReport:
+    seconds: float
+    stats_text: str
+    peak_bytes: Optional[int] = None
+    top_allocations: Optional[list] = None
+
+
+@contextmanager
+def profile(out_path=None, memory: bool = True, top: int = 25) -> Iterator[ProfileReport]:
+    """
+    Opt-in cProfile (and tracemalloc) capture around one run.
+
+        with profile("sim.prof") as report:
+            simulate_race(2024, 5)
+        print(report.stats_text)
+
+    The report is filled in when the block exits. With `out_path` the raw
+    cProfile stats are dumped there for snakeviz/pstats.
+    """
+    report = ProfileReport(seconds=0.0, stats_text="")
+    prof = cProfile.Profile()
+    if memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    prof.enable()
+    try:
+        yield report
+    finally:
+        prof.disable()
+        report.seconds = time.perf_counter() - start
+        if memory:
+            snapshot = tracemalloc.take_snapshot()
+            report.peak_bytes = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            report.top_allocations = [str(s) for s in snapshot.statistics("lineno")[:top]]
+        buf = io.StringIO()
+        pstats.Stats(prof, stream=buf).sort_stats("cumulative").print_stats(top)
+        report.stats_text = buf.getvalue()
+        if out_path is not None:
+            prof.dump_stats(str(out_path))
@@ -1,30 +1,37 @@
-from typing import Dict, Tuple
+import asyncio
+from concurrent.futures import Executor
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Dict, List, Optional, Tuple
 import pandas as pd
-import fastf1
+
+from src.fastf1_cache import load_session, session_not_available_errors
+from src.store import compact_laps
 
 
 def get_event_grid_and_results(season: int, round_number: int) -> Tuple[pd.DataFrame, pd.DataFrame]:
     """
     Retrieve grid (from qualifying or race grid) and actual race results
-    for an event using FastF1. Suitable for near-live (polling) if telemetry
-    and cache are enabled externally.
+    for an event using FastF1. Suitable for near-live (polling): finished
+    sessions are served from the managed cache's snapshots (src.fastf1_cache).
+
+    A session that has no data yet gives an empty frame; any other load
+    failure is raised, so it is not mistaken for "not run yet".
     """
     # Qualifying
+    grid = pd.DataFrame(columns=["driver", "team", "grid_position"])
     try:
-        q = fastf1.get_session(season, round_number, "Q")
-        q.load(results=True, laps=False, telemetry=False)
+        q = load_session(season, round_number, "Q")
         qdf = q.results.reset_index()
         grid = qdf[["Abbreviation", "TeamName", "Position"]].rename(
             columns={"Abbreviation": "driver", "TeamName": "team", "Position": "grid_position"}
         )
-    except Exception:
-        grid = pd.DataFrame(columns=["driver", "team", "grid_position"]).copy()
+    except session_not_available_errors():
+        pass
 
     # Race results (if completed / during)
     results = pd.DataFrame()
     try:
-        r = fastf1.get_session(season, round_number, "R")
-        r.load(results=True, laps=False, telemetry=False)
+        r = load_session(season, round_number, "R")
         rdf = r.results.reset_index()
         results = rdf[["Abbreviation", "TeamName", "Position", "Points", "Time"]].rename(
             columns={
@@ -35,24 +42,176 @@ def get_event_grid_and_results(season: int, round_number: int) -> Tuple[pd.DataF
                 "Time": "time",
             }
         )
-    except Exception:
+    except session_not_available_errors():
         pass
 
     return grid, results
 
 
+def _compact_session_laps(laps: pd.DataFrame, season: int, round_number: int) -> pd.DataFrame:
+    """FastF1 session laps in the compact lap schema, with the driver column lower-cased."""
+    laps = compact_laps(laps.assign(season=season, round=round_number))
+    return laps.rename(columns={"Driver": "driver"})
+
+
 def get_event_laps(season: int, round_number: int) -> pd.DataFrame:
-    """Retrieve laps dataframe for an event (can be used in polling)."""
-    try:
-        r = fastf1.get_session(season, round_number, "R")
-        r.load(laps=True, telemetry=False)
-        laps = r.laps.copy()
-        # Normalize driver column name
-        if "Driver" in laps.columns:
-            laps = laps.rename(columns={"Driver": "driver"})
-        return laps
-    except Exception:
-        return pd.DataFrame()
+    """
+    Retrieve laps for an event (can be used in polling), in the compact lap
+    schema: float32 `LapTime_s`/sector seconds, categorical driver/team/compound.
+
+    Load failures are raised, not turned into an empty frame, so a poller
+    can tell a failed poll from one without new laps.
+    """
+    r = load_session(season, round_number, "R", laps=True)
+    return _compact_session_laps(r.laps, season, round_number)
+
+
+class FastF1Source:
+    """Loads the current race laps through FastF1 (blocking; run in an executor)."""
+
+    def load_laps(self, season: int, round_number: int) -> pd.DataFrame:
+        # Live sessions are never snapshotted, so each poll reaches FastF1
+        return get_event_laps(season, round_number)
+
+
+class ReplaySource:
+    """
+    Offline stand-in for a live session: replays recorded laps a few at a
+    time, revealing `laps_per_poll` more race laps on every load.
+    """
+
+    def __init__(self, laps: pd.DataFrame, laps_per_poll: int = 1):
+        self.laps = laps.rename(columns={"Driver": "driver"}) if "Driver" in laps.columns else laps
+        self.laps_per_poll = laps_per_poll
+        self.current_lap = 0
+        self.final_lap = int(self.laps["LapNumber"].max()) if not self.laps.empty else 0
+
+    @property
+    def finished(self) -> bool:
+        return self.current_lap >= self.final_lap
+
+    def load_laps(self, season: int, round_number: int) -> pd.DataFrame:
+        self.current_lap = min(self.current_lap + self.laps_per_poll, self.final_lap)
+        return self.laps[self.laps["LapNumber"] <= self.current_lap]
+
+
+@dataclass
+class LiveUpdate:
+    season: int
+    round_number: int
+    new_laps: pd.DataFrame
+    position_changes: pd.DataFrame
+    error: Optional[BaseException] = None
+
+    @property
+    def has_changes(self) -> bool:
+        return not self.new_laps.empty or not self.position_changes.empty
+
+
+@dataclass
+class SessionSnapshot:
+    """What a poller has already emitted: last lap seen and position per driver."""
+    last_lap: Dict[str, float] = field(default_factory=dict)
+    positions: Dict[str, float] = field(default_factory=dict)
+
+    def diff(self, laps: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """Return (new laps, position changes) and advance the snapshot."""
+        if laps.empty or "LapNumber" not in laps.columns:
+            return laps.iloc[0:0], pd.DataFrame(columns=["driver", "old_position", "new_position"])
+        # Compact laps have a categorical driver; map on plain strings so misses can be filled
+        drivers = laps["driver"].astype(str)
+        seen = drivers.map(self.last_lap).astype(float).fillna(0)
+        new_laps = laps[laps["LapNumber"].astype(float) > seen]
+
+        changes = pd.DataFrame(columns=["driver", "old_position", "new_position"])
+        if not new_laps.empty:
+            latest = new_laps.sort_values("LapNumber").groupby("driver", observed=True).tail(1)
+            self.last_lap.update(dict(zip(latest["driver"].astype(str), latest["LapNumber"].astype(float))))
+            if "Position" in latest.columns:
+                current = latest[["driver", "Position"]].dropna().astype({"driver": str, "Position": float})
+                old = current["driver"].map(self.positions).astype(float)
+                moved = current[old.ne(current["Position"])]
+                changes = pd.DataFrame({
+                    "driver": moved["driver"].values,
+                    "old_position": old[moved.index].values,
+                    "new_position": moved["Position"].values,
+                })
+                self.positions.update(dict(zip(current["driver"], current["Position"])))
+        return new_laps, changes
+
+
+class LivePoller:
+    """
+    Polls one session and emits only what changed since the previous poll.
+
+    Loads run in a thread executor so several pollers can share an event
+    loop. The interval drops to `min_interval` after a poll that brought
+    changes and grows by `backoff` (up to `max_interval`) after quiet or
+    failed polls. Errors are reported on the update instead of being
+    swallowed, and `max_errors` consecutive failures stop the poller.
+    """
+
+    def __init__(
+        self,
+        season: int,
+        round_number: int,
+        source=None,
+        min_interval: float = 5.0,
+        max_interval: float = 60.0,
+        backoff: float = 2.0,
+        max_errors: int = 5,
+        executor: Optional[Executor] = None,
+    ):
+        self.season = season
+        self.round_number = round_number
+        self.source = source or FastF1Source()
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.max_errors = max_errors
+        self.executor = executor
+        self.interval = min_interval
+        self.snapshot = SessionSnapshot()
+        self._errors = 0
+
+    async def poll_once(self) -> LiveUpdate:
+        loop = asyncio.get_running_loop()
+        try:
+            laps = await loop.run_in_executor(self.executor, self.source.load_laps, self.season, self.round_number)
+        except Exception as e:
+            self._errors += 1
+            self.interval = min(self.interval * self.backoff, self.max_interval)
+            return LiveUpdate(self.season, self.round_number, pd.DataFrame(), pd.DataFrame(), error=e)
+
+        self._errors = 0
+        new_laps, changes = self.snapshot.diff(laps)
+        update = LiveUpdate(self.season, self.round_number, new_laps, changes)
+        if update.has_changes:
+            self.interval = self.min_interval
+        else:
+            self.interval = min(self.interval * self.backoff, self.max_interval)
+        return update
+
+    async def stream(self, max_polls: Optional[int] = None) -> AsyncIterator[LiveUpdate]:
+        """Yield updates with changes (or errors) until the source finishes or polls run out."""
+        polls = 0
+        while max_polls is None or polls < max_polls:
+            update = await self.poll_once()
+            polls += 1
+            if update.has_changes or update.error is not None:
+                yield update
+            if self._errors >= self.max_errors:
+                raise RuntimeError(f"Polling {self.season} R{self.round_number} failed {self._errors} times") from update.error
+            if getattr(self.source, "finished", False):
+                return
+            await asyncio.sleep(self.interval)
+
 
+async def poll_sessions(pollers: List[LivePoller], on_update, max_polls: Optional[int] = None):
+    """Run several pollers concurrently, calling `on_update(update)` for each emitted update."""
 
+    async def _run(poller: LivePoller):
+        async for update in poller.stream(max_polls=max_polls):
+            on_update(update)
 
+    await asyncio.gather(*(_run(p) for p in pollers))
@@ -0,0 +1,130 @@
+"""
+Load test for the simulation service: many concurrent small requests.
+
+    python -m src.loadtest --socket /tmp/f1sim.sock --events 2024:5 2024:6
+    python -m src.loadtest --spawn --data-dir data --events 2024:5 --concurrency 64
+
+With `--spawn` a service is started in-process on a temporary socket, so
+no separate server is needed. Reports p50/p90/p99 latency and throughput.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import tempfile
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.service import DEFAULT_SOCKET, AsyncServiceClient, SimulationService
+
+
+async def run_load(
+    events: Sequence[Tuple[int, int]],
+    socket_path: Optional[str] = DEFAULT_SOCKET,
+    port: Optional[int] = None,
+    op: str = "simulate",
+    concurrency: int = 32,
+    requests: int = 500,
+    n_trials: int = 1,
+    persist: bool = False,
+) -> Dict[str, float]:
+    """Fire `requests` requests from `concurrency` connections; returns latency stats in ms."""
+    counter = itertools.count()
+    latencies: List[float] = []
+    errors = 0
+
+    async def worker():
+        nonlocal errors
+        client = await AsyncServiceClient.connect(socket_path, port=port)
+        try:
+            while True:
+                i = next(counter)
+                if i >= requests:
+                    return
+                season, round_number = events[i % len(events)]
+                params = {"season": season, "round": round_number}
+                if op == "simulate":
+                    params.update(n_trials=n_trials, seed=i, persist=persist)
+                start = time.perf_counter()
+                try:
+                    await client.call(op, **params)
+                except RuntimeError:
+                    errors += 1
+                latencies.append(time.perf_counter() - start)
+        finally:
+            await client.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    ms = np.array(latencies) * 1e3
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "seconds": elapsed,
+        "throughput_rps": len(latencies) / elapsed if elapsed > 0 else float("inf"),
+        "mean_ms": float(ms.mean()),
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p90_ms": float(np.percentile(ms, 90)),
+        "p99_ms": float(np.percentile(ms, 99)),
+        "max_ms": float(ms.max()),
+    }
+
+
+async def _main(args) -> Dict[str, float]:
+    events = [tuple(int(x) for x in evt.split(":")) for evt in args.events]
+    if not args.spawn:
+        report = await run_load(events, args.socket, args.port, args.op, args.concurrency, args.requests, args.trials, args.persist)
+        client = await AsyncServiceClient.connect(args.socket, port=args.port)
+        report["service"] = await client.call("stats")
+        await client.close()
+        return report
+
+    service = SimulationService(data_dir=args.data_dir, batch_window=args.batch_window)
+    with tempfile.TemporaryDirectory() as tmp:
+        socket_path = os.path.join(tmp, "f1sim.sock")
+        server = await service.start(socket_path)
+        try:
+            # Warm-up: load every event once before timing
+            await run_load(events, socket_path, None, args.op, 1, len(events), args.trials, False)
+            report = await run_load(events, socket_path, None, args.op, args.concurrency, args.requests, args.trials, args.persist)
+            report["service"] = dict(service.stats)
+        finally:
+            server.close()
+            await server.wait_closed()
+            service.close()
+    return report
+
+
+def main(argv: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", nargs="+", required=True, help="SEASON:ROUND pairs, requested round-robin")
+    parser.add_argument("--socket", default=DEFAULT_SOCKET)
+    parser.add_argument("--port", type=int)
+    parser.add_argument("--op", choices=["simulate", "predict"], default="simulate")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--trials", type=int, default=1, help="trials per simulate request")
+    parser.add_argument("--persist", action="store_true")
+    parser.add_argument("--spawn", action="store_true", help="start a service in-process")
+    parser.add_argument("--data-dir", default="data")
+    parser.add_argument("--batch-window", type=float, default=0.005)
+    parser.add_argument("--out", help="also write the report as JSON")
+    args = parser.parse_args(argv)
+
+    report = asyncio.run(_main(args))
+    for key in ("requests", "errors", "throughput_rps", "mean_ms", "p50_ms", "p90_ms", "p99_ms", "max_ms"):
+        print(f"{key:<16} {report[key]:10.2f}")
+    print(f"service          {report['service']}")
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+    return 1 if report["errors"] else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,294 @@
+"""
+Fitted pace and tyre-degradation models for the simulator.
+
+For each event, the laps of every race at the same circuit up to that
+season are fitted in one least-squares pass:
+
+    LapTime_s = pace[event, driver] + offset[compound] + deg[compound] * TyreLife + fuel * LapNumber
+
+The result is saved as a small versioned JSON artifact,
+
+    data/models/pace/season=2024/round=5/v1.json
+
+which records the lap partitions it was fitted from and a fingerprint of
+them. `get_pace_model` loads the artifact and refits only when the
+circuit's events in the store, their fingerprint or MODEL_VERSION no
+longer match, so `prepare_race` normally pays one small file read
+instead of a fit.
+"""
+import hashlib
+import json
+import os
+import tempfile
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.instrument import span
+from src.store import CSV_FILES, load_partition, load_table, partition_path, store_root
+
+# Bump when the model or its inputs change; older artifacts are then refitted
+MODEL_VERSION = 1
+MODELS_SUBDIR = "models"
+
+FIT_COLUMNS = ["season", "round", "Driver", "LapNumber", "LapTime_s", "Compound", "TyreLife", "PitIn", "PitOut"]
+# Dry compounds the simulator plans with; wet laps say little about degradation
+SLICK_COMPOUNDS = ("Soft", "Medium", "Hard")
+# Compounds with fewer clean laps than this are not fitted
+MIN_COMPOUND_LAPS = 30
+# Laps slower than this multiple of the event's median (safety car, traffic) are dropped
+SLOW_LAP_FACTOR = 1.07
+
+
+@dataclass
+class PaceModel:
+    """Fitted parameters for one event."""
+    season: int
+    round_number: int
+    circuit: Optional[str]
+    # Seconds per lap on the fastest compound, fresh tyres, average fuel load
+    base_pace: Dict[str, float]
+    # Compound -> (offset in s, extra s per lap of tyre age); None when not fitted
+    tyre_model: Optional[Dict[str, Tuple[float, float]]]
+    fuel_per_lap: float
+    n_laps: int
+    sources: List[Tuple[int, int]] = field(default_factory=list)
+    fingerprint: str = ""
+    version: int = MODEL_VERSION
+
+    def to_json(self) -> str:
+        return json.dumps(asdict(self), indent=1, sort_keys=True)
+
+    @classmethod
+    def from_json(cls, text: str) -> "PaceModel":
+        raw = json.loads(text)
+        raw["sources"] = [tuple(s) for s in raw.get("sources", [])]
+        if raw.get("tyre_model") is not None:
+            raw["tyre_model"] = {k: tuple(v) for k, v in raw["tyre_model"].items()}
+        return cls(**raw)
+
+
+def model_path(season: int, round_number: int, data_dir="data", version: int = MODEL_VERSION) -> Path:
+    return Path(data_dir) / MODELS_SUBDIR / "pace" / f"season={int(season)}" / f"round={int(round_number)}" / f"v{version}.json"
+
+
+def _source_file(season: int, round_number: int, data_dir) -> Path:
+    path = partition_path("laps", season, round_number, data_dir)
+    if path.exists() or store_root(data_dir).joinpath("laps").exists():
+        return path
+    return Path(data_dir) / CSV_FILES["laps"]
+
+
+def data_fingerprint(sources: Iterable[Tuple[int, int]], data_dir="data") -> str:
+    """Hash of MODEL_VERSION and the size and mtime of each source lap file."""
+    digest = hashlib.sha1(f"v{MODEL_VERSION}".encode())
+    for season, round_number in sorted(sources):
+        path = _source_file(season, round_number, data_dir)
+        try:
+            st = path.stat()
+            digest.update(f"{season}:{round_number}:{st.st_size}:{st.st_mtime_ns};".encode())
+        except FileNotFoundError:
+            digest.update(f"{season}:{round_number}:missing;".encode())
+    return digest.hexdigest()
+
+
+def _circuit_events(races: pd.DataFrame, season: int, round_number: int) -> Tuple[Optional[str], List[Tuple[int, int]]]:
+    """The event's circuit and every event there up to and including it."""
+    hit = races[(races["season"] == season) & (races["round"] == round_number)]
+    if hit.empty or pd.isna(hit["circuit"].iloc[0]):
+        return None, [(int(season), int(round_number))]
+    circuit = str(hit["circuit"].iloc[0])
+    same = races[(races["circuit"] == circuit) & ((races["season"] < season) | (races["round"] == round_number) & (races["season"] == season))]
+    return circuit, sorted({(int(s), int(r)) for s, r in zip(same["season"], same["round"])})
+
+
+# data_dir -> (races files and mtimes, races frame), re-read when an event is ingested
+_RACES: Dict[str, Tuple[tuple, pd.DataFrame]] = {}
+
+
+def _races(data_dir) -> pd.DataFrame:
+    """Season, round and circuit of every event, cached until the races files change."""
+    files = sorted((store_root(data_dir) / "races").glob("season=*/round=*/part.parquet"))
+    if not files:
+        files = [Path(data_dir) / CSV_FILES["races"]]
+    signature = tuple((str(f), f.stat().st_mtime_ns) for f in files if f.exists())
+    cached = _RACES.get(str(data_dir))
+    if cached is None or cached[0] != signature:
+        races = load_table("races", columns=["season", "round", "circuit"], data_dir=data_dir)
+        cached = _RACES[str(data_dir)] = (signature, races)
+    return cached[1]
+
+
+def _clean_laps(laps: pd.DataFrame) -> pd.DataFrame:
+    """Green-flag dry laps on a known compound, excluding lap 1 and in/out laps."""
+    df = laps.dropna(subset=["LapTime_s", "TyreLife", "Compound"]).copy()
+    df["Compound"] = df["Compound"].astype(str).str.capitalize()
+    keep = (df["LapNumber"] > 1) & df["Compound"].isin(SLICK_COMPOUNDS)
+    for flag in ("PitIn", "PitOut"):
+        if flag in df.columns:
+            keep &= ~df[flag].fillna(False).astype(bool)
+    df = df[keep]
+    median = df.groupby(["season", "round"])["LapTime_s"].transform("median")
+    return df[df["LapTime_s"] <= SLOW_LAP_FACTOR * median]
+
+
+def fit_pace(laps: pd.DataFrame, season: int, round_number: int, race_laps: Optional[int] = None):
+    """
+    Least-squares fit of driver pace, compound offset and degradation, and
+    fuel effect over `laps` (compact lap columns, any number of events).
+
+    Returns (base_pace for the target event's drivers, tyre_model or None,
+    fuel_per_lap, clean laps used). Drivers without clean laps at the
+    target event get their median lap time, as the unfitted simulator did.
+    """
+    target = laps[(laps["season"] == season) & (laps["round"] == round_number)]
+    fallback = target.dropna(subset=["LapTime_s"]).groupby("Driver", observed=True)["LapTime_s"].median()
+    base_pace = {str(d): float(t) for d, t in fallback.items()}
+
+    clean = _clean_laps(laps)
+    counts = clean["Compound"].value_counts()
+    compounds = [c for c in SLICK_COMPOUNDS if counts.get(c, 0) >= MIN_COMPOUND_LAPS]
+    clean = clean[clean["Compound"].isin(compounds)]
+    if not compounds or clean.empty:
+        return base_pace, None, 0.0, 0
+
+    # Design matrix: one pace column per (event, driver), compound offsets
+    # relative to the first compound, one degradation slope per compound, fuel
+    key = clean["season"].astype(str) + ":" + clean["round"].astype(str) + ":" + clean["Driver"].astype(str)
+    key_codes, keys = pd.factorize(key)
+    comp_codes = pd.Categorical(clean["Compound"], categories=compounds).codes
+    age = clean["TyreLife"].to_numpy(dtype=float)
+    n, k, c = len(clean), len(keys), len(compounds)
+
+    X = np.zeros((n, k + (c - 1) + c + 1))
+    rows = np.arange(n)
+    X[rows, key_codes] = 1.0
+    off_cols = comp_codes >= 1
+    X[rows[off_cols], k + comp_codes[off_cols] - 1] = 1.0
+    X[rows, k + (c - 1) + comp_codes] = age
+    X[:, -1] = clean["LapNumber"].to_numpy(dtype=float)
+    y = clean["LapTime_s"].to_numpy(dtype=float)
+    coef, *_ = np.linalg.lstsq(X, y, rcond=None)
+
+    offsets = np.concatenate([[0.0], coef[k:k + c - 1]])
+    degradation = np.maximum(coef[k + c - 1:k + 2 * c - 1], 0.0)
+    fuel = float(coef[-1])
+    # Shift so the fastest compound has offset 0; pace absorbs the difference
+    shift = offsets.min()
+    offsets -= shift
+
+    race_laps = race_laps or int(target["LapNumber"].max() if not target.empty else laps["LapNumber"].max())
+    prefix = f"{season}:{round_number}:"
+    for i, name in enumerate(keys):
+        if name.startswith(prefix):
+            base_pace[name[len(prefix):]] = float(coef[i] + shift + fuel * (race_laps + 1) / 2)
+
+    tyre_model = {name: (float(o), float(d)) for name, o, d in zip(compounds, offsets, degradation)}
+    return base_pace, tyre_model, fuel, n
+
+
+def fit_event_model(season: int, round_number: int, data_dir="data", races: Optional[pd.DataFrame] = None,
+                    laps: Optional[pd.DataFrame] = None) -> PaceModel:
+    """Fit one event's model from its circuit's history. `races`/`laps` may be preloaded."""
+    if races is None:
+        races = _races(data_dir)
+    circuit, sources = _circuit_events(races, season, round_number)
+    if laps is None:
+        frames = [load_partition("laps", s, r, columns=FIT_COLUMNS, data_dir=data_dir) for s, r in sources]
+        laps = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=FIT_COLUMNS)
+    else:
+        laps = laps[pd.MultiIndex.from_arrays([laps["season"], laps["round"]]).isin(sources)]
+    # Older lap data may lack compound or tyre age; those laps only give base pace
+    laps = laps.assign(**{col: np.nan for col in FIT_COLUMNS if col not in laps.columns})
+
+    with span("fit_pace_model") as s:
+        base_pace, tyre_model, fuel, n_laps = fit_pace(laps, season, round_number)
+        s.add_rows(len(laps))
+    return PaceModel(
+        season=int(season),
+        round_number=int(round_number),
+        circuit=circuit,
+        base_pace=base_pace,
+        tyre_model=tyre_model,
+        fuel_per_lap=fuel,
+        n_laps=n_laps,
+        sources=sources,
+        fingerprint=data_fingerprint(sources, data_dir),
+    )
+
+
+def save_pace_model(model: PaceModel, data_dir="data") -> Path:
+    path = model_path(model.season, model.round_number, data_dir, model.version)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # A temp file per writer: workers fitting the same event must not share one
+    with tempfile.NamedTemporaryFile("w", dir=path.parent, prefix=path.stem, suffix=".tmp", delete=False) as fh:
+        fh.write(model.to_json())
+    os.replace(fh.name, path)
+    return path
+
+
+# path -> (artifact mtime_ns, model), so repeat lookups skip the JSON parse
+_LOADED: Dict[str, Tuple[int, PaceModel]] = {}
+
+
+def _read_artifact(path: Path) -> Optional[PaceModel]:
+    try:
+        mtime = path.stat().st_mtime_ns
+    except FileNotFoundError:
+        return None
+    cached = _LOADED.get(str(path))
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+    model = PaceModel.from_json(path.read_text())
+    _LOADED[str(path)] = (mtime, model)
+    return model
+
+
+def _is_current(model: Optional[PaceModel], sources: List[Tuple[int, int]], data_dir) -> bool:
+    """Fitted by this MODEL_VERSION from exactly the circuit's current events, unchanged since."""
+    return (
+        model is not None
+        and model.version == MODEL_VERSION
+        and list(model.sources) == list(sources)
+        and model.fingerprint == data_fingerprint(sources, data_dir)
+    )
+
+
+def get_pace_model(season: int, round_number: int, data_dir="data", refit: bool = False) -> PaceModel:
+    """
+    The event's fitted model: the saved artifact when it is current,
+    otherwise a fresh fit that replaces it. An event ingested later at the
+    same circuit (an earlier season, say) makes the artifact stale too.
+    """
+    races = _races(data_dir)
+    _, sources = _circuit_events(races, season, round_number)
+    model = None if refit else _read_artifact(model_path(season, round_number, data_dir))
+    if _is_current(model, sources, data_dir):
+        return model
+    model = fit_event_model(season, round_number, data_dir, races=races)
+    save_pace_model(model, data_dir)
+    return model
+
+
+def fit_pace_models(data_dir="data", seasons: Optional[Iterable[int]] = None, refit: bool = False) -> Dict[Tuple[int, int], PaceModel]:
+    """Fit (or validate) the artifact of every event, reading the lap store once."""
+    races = _races(data_dir)
+    events = [(int(s), int(r)) for s, r in zip(races["season"], races["round"])]
+    if seasons is not None:
+        wanted = set(seasons)
+        events = [e for e in events if e[0] in wanted]
+    laps = None
+    models = {}
+    for season, round_number in sorted(events):
+        model = None if refit else _read_artifact(model_path(season, round_number, data_dir))
+        if not _is_current(model, _circuit_events(races, season, round_number)[1], data_dir):
+            if laps is None:
+                laps = load_table("laps", columns=FIT_COLUMNS, data_dir=data_dir)
+            model = fit_event_model(season, round_number, data_dir, races=races, laps=laps)
+            save_pace_model(model, data_dir)
+        models[(season, round_number)] = model
+    print(f"Pace models current for {len(models)} events")
+    return models
@@ -0,0 +1,91 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, replace
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from src.simulation import RaceAggregate, RaceSetup, StrategyPlan, prepare_race, run_trials
+
+
+@dataclass
+class SimJob:
+    season: int
+    round_number: int
+    strategy_overrides: Optional[Dict[str, StrategyPlan]] = None
+
+
+# Per-process cache so each worker reads an event's CSVs at most once
+_SETUP_CACHE: Dict[Tuple[int, int, str], RaceSetup] = {}
+
+
+def _cached_setup(season: int, round_number: int, data_dir: str) -> RaceSetup:
+    key = (season, round_number, data_dir)
+    if key not in _SETUP_CACHE:
+        _SETUP_CACHE[key] = prepare_race(season, round_number, data_dir=data_dir)
+    return _SETUP_CACHE[key]
+
+
+def _run_chunk(
+    job_index: int,
+    chunk_index: int,
+    job: SimJob,
+    seeds: List[np.random.SeedSequence],
+    data_dir: str,
+) -> Tuple[int, int, RaceAggregate]:
+    setup = _cached_setup(job.season, job.round_number, data_dir)
+    if job.strategy_overrides:
+        setup = replace(setup, strategies={**setup.strategies, **job.strategy_overrides})
+    return job_index, chunk_index, run_trials(setup, seeds).aggregate()
+
+
+def _chunk_tasks(jobs: List[SimJob], n_trials: int, base_seed: int, chunk_size: int):
+    """
+    Split every job into fixed-size chunks with their own seed streams.
+
+    Streams are spawned from `base_seed` by job index, then chunk, then
+    trial, and chunk boundaries depend only on `chunk_size`, so results do
+    not change with the number of workers.
+    """
+    tasks = []
+    for job_index, (job, job_seq) in enumerate(zip(jobs, np.random.SeedSequence(base_seed).spawn(len(jobs)))):
+        n_chunks = -(-n_trials // chunk_size)
+        for chunk_index, chunk_seq in enumerate(job_seq.spawn(n_chunks)):
+            size = min(chunk_size, n_trials - chunk_index * chunk_size)
+            tasks.append((job_index, chunk_index, job, chunk_seq.spawn(size)))
+    return tasks
+
+
+def run_parallel(
+    jobs: Sequence[Union[SimJob, Tuple[int, int]]],
+    n_trials: int = 1000,
+    base_seed: int = 42,
+    n_workers: Optional[int] = None,
+    chunk_size: int = 250,
+    data_dir: str = "data",
+) -> List[RaceAggregate]:
+    """
+    Run `n_trials` Monte Carlo trials for each job across a process pool.
+
+    Jobs are (season, round) pairs or `SimJob`s carrying strategy overrides,
+    so one call can sweep several events or several strategies for one
+    event. Returns one merged `RaceAggregate` per job, in job order.
+    """
+    jobs = [j if isinstance(j, SimJob) else SimJob(*j) for j in jobs]
+    if n_trials < 1 or not jobs:
+        return []
+    tasks = _chunk_tasks(jobs, n_trials, base_seed, chunk_size)
+    n_workers = n_workers or os.cpu_count() or 1
+
+    if n_workers == 1:
+        outputs = [_run_chunk(*task, data_dir) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=n_workers) as pool:
+            futures = [pool.submit(_run_chunk, *task, data_dir) for task in tasks]
+            outputs = [f.result() for f in futures]
+
+    # Reduce in chunk order so float sums do not depend on completion order
+    merged: Dict[int, RaceAggregate] = {}
+    for job_index, _, agg in sorted(outputs, key=lambda o: (o[0], o[1])):
+        merged[job_index] = merged[job_index].merge(agg) if job_index in merged else agg
+    return [merged[i] for i in range(len(jobs))]
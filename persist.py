@@ -0,0 +1,250 @@
+import queue
+import threading
+import weakref
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import insert
+
+from src.db import (
+    copy_into, create_schema, get_engine, simulations, simulation_results, simulation_laps,
+    simulation_pitstops, simulation_sketches,
+)
+from src.instrument import span
+from src.sketch import FORMAT_VERSION
+
+
+@dataclass
+class SimulationRows:
+    """One simulation's output as columns (name -> array), ready for a bulk write."""
+    simulation_id: int
+    results: Dict[str, np.ndarray]
+    laps: Optional[Dict[str, np.ndarray]] = None
+    pitstops: Optional[Dict[str, np.ndarray]] = None
+
+
+# Engines whose schema has been created, so each new engine gets checked once
+_schema_checked: "weakref.WeakSet" = weakref.WeakSet()
+
+
+def _ensure_schema_once(db_engine):
+    if db_engine not in _schema_checked:
+        create_schema(db_engine)
+        _schema_checked.add(db_engine)
+
+
+def create_simulation_records(setup, n: int = 1, strategy_model: str = "heuristic_v1", db_engine=None) -> List[int]:
+    """Insert `n` rows into `simulations` for one event and return their ids in order."""
+    db_engine = db_engine if db_engine is not None else get_engine()
+    _ensure_schema_once(db_engine)
+    row = {
+        "season": setup.season,
+        "round": setup.round_number,
+        "event_name": setup.event_name,
+        "strategy_model": strategy_model,
+    }
+    with span("db_write", table="simulations") as s, db_engine.begin() as conn:
+        s.add_rows(n)
+        if n == 1:
+            return [conn.execute(insert(simulations).values(**row)).inserted_primary_key[0]]
+        res = conn.execute(
+            insert(simulations).returning(simulations.c.id, sort_by_parameter_order=True),
+            [row] * n,
+        )
+        return [r[0] for r in res]
+
+
+def trial_rows(simulation_id: int, setup, batch, trial: int = 0, summary_only: bool = False) -> SimulationRows:
+    """
+    Columns for one trial of a `BatchResult`.
+
+    Lap and pit-stop columns need a batch run with `keep_laps=True`; with
+    `summary_only` only the results rows are built.
+    """
+    drivers = np.array(batch.drivers, dtype=object)
+    teams = np.array(batch.teams, dtype=object)
+    finish = batch.finish_positions[trial]
+    order = np.argsort(finish, kind="stable")
+    n_drivers = len(drivers)
+
+    results = {
+        "simulation_id": np.full(n_drivers, simulation_id),
+        "driver": drivers[order],
+        "team": teams[order],
+        "grid_position": batch.grid_positions[order],
+        "finish_position": finish[order],
+        "points": batch.points[trial][order],
+        "status": np.full(n_drivers, "Finished", dtype=object),
+        "total_time_s": batch.total_time[trial][order],
+    }
+    if summary_only:
+        return SimulationRows(simulation_id, results)
+    if batch.lap_times is None:
+        raise ValueError("Lap rows need a batch run with keep_laps=True")
+
+    stint, compound, from_compound, pit_mask = setup.tyre_plan()
+    n_laps = setup.race_laps
+    # Lap-major, grid order within a lap
+    lap_no = np.repeat(np.arange(1, n_laps + 1), n_drivers)
+    laps = {
+        "simulation_id": np.full(n_laps * n_drivers, simulation_id),
+        "lap": lap_no,
+        "driver": np.tile(drivers, n_laps),
+        "position": batch.positions[trial].T.ravel(),
+        "lap_time_s": batch.lap_times[trial].T.ravel(),
+        "stint": stint.ravel(),
+        "tyre_compound": compound.ravel(),
+        "is_pit": pit_mask.ravel(),
+    }
+
+    pit_lap_idx, pit_driver_idx = np.nonzero(pit_mask)
+    pitstops = {
+        "simulation_id": np.full(len(pit_lap_idx), simulation_id),
+        "driver": drivers[pit_driver_idx],
+        "lap": pit_lap_idx + 1,
+        "pit_time_s": np.maximum(18.0, batch.pit_times[trial][pit_driver_idx, pit_lap_idx]),
+        "from_compound": from_compound[pit_lap_idx, pit_driver_idx],
+        "to_compound": compound[pit_lap_idx, pit_driver_idx],
+    }
+    return SimulationRows(simulation_id, results, laps, pitstops)
+
+
+def _write_columns(conn, table, columns: Dict[str, np.ndarray]):
+    n_rows = len(next(iter(columns.values())))
+    if n_rows == 0:
+        return
+    with span("db_write", table=table.name) as s:
+        s.add_rows(n_rows)
+        if conn.dialect.name == "postgresql":
+            copy_into(conn, table.name, pd.DataFrame(columns))
+        else:
+            names = list(columns)
+            values = [np.asarray(columns[c]).tolist() for c in names]
+            conn.execute(insert(table), [dict(zip(names, row)) for row in zip(*values)])
+
+
+def write_rows(batch_rows: List[SimulationRows], db_engine=None):
+    """Write several simulations' rows, one bulk statement per table."""
+    db_engine = db_engine if db_engine is not None else get_engine()
+    tables = [(simulation_laps, "laps"), (simulation_pitstops, "pitstops"), (simulation_results, "results")]
+    with db_engine.begin() as conn:
+        for table, attr in tables:
+            parts = [getattr(r, attr) for r in batch_rows if getattr(r, attr) is not None]
+            if parts:
+                _write_columns(conn, table, {c: np.concatenate([p[c] for p in parts]) for c in parts[0]})
+
+
+class SimulationWriter:
+    """
+    Persists `SimulationRows`, optionally on a background thread.
+
+    With `background=True`, `write` only enqueues and returns; a worker
+    thread groups whatever is queued into one bulk write per table. Call
+    `flush` (or use as a context manager) to wait for pending writes; an
+    error in the worker is re-raised there, or by the next `write`. Rows
+    queued behind a failed write are not written; they are counted in
+    `dropped` and the count is noted on the re-raised error.
+    `summary_only` drops lap and pit-stop rows and keeps only the results.
+    """
+
+    def __init__(self, db_engine=None, background: bool = False, summary_only: bool = False, max_pending: int = 64):
+        self.db_engine = db_engine
+        self.background = background
+        self.summary_only = summary_only
+        self._queue: "queue.Queue[Optional[SimulationRows]]" = queue.Queue(maxsize=max_pending)
+        self._error: Optional[BaseException] = None
+        self.dropped = 0
+        self._thread: Optional[threading.Thread] = None
+        if background:
+            self._thread = threading.Thread(target=self._run, name="simulation-writer", daemon=True)
+            self._thread.start()
+
+    def write(self, rows: SimulationRows):
+        self.write_many([rows])
+
+    def write_many(self, rows_list: List[SimulationRows]):
+        if self.summary_only:
+            rows_list = [SimulationRows(r.simulation_id, r.results) for r in rows_list]
+        if not self.background:
+            write_rows(rows_list, self.db_engine)
+            return
+        for rows in rows_list:
+            # Refuse new rows as soon as the worker has failed
+            self._raise_pending_error()
+            self._queue.put(rows)
+        self._raise_pending_error()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            pending = [item]
+            # Drain whatever else is queued so it goes out in the same statements
+            while True:
+                try:
+                    pending.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            rows = [r for r in pending if r is not None]
+            try:
+                if self._error is not None:
+                    self.dropped += len(rows)
+                elif rows:
+                    write_rows(rows, self.db_engine)
+            except BaseException as e:  # surfaced on the caller's thread by flush()
+                self._error = e
+            finally:
+                for _ in pending:
+                    self._queue.task_done()
+            if any(r is None for r in pending):
+                return
+
+    def _raise_pending_error(self):
+        if self._error is not None:
+            err, self._error = self._error, None
+            if self.dropped:
+                err.add_note(f"{self.dropped} queued simulations have not been written")
+            raise err
+
+    def flush(self):
+        if self.background:
+            self._queue.join()
+        self._raise_pending_error()
+
+    def close(self):
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+        self._raise_pending_error()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def persist_batch(setup, batch, writer: Optional[SimulationWriter] = None, strategy_model: str = "heuristic_v1") -> List[int]:
+    """Persist every trial of a `BatchResult` as its own simulation; returns the new ids."""
+    writer = writer or SimulationWriter()
+    summary_only = writer.summary_only or batch.lap_times is None
+    sim_ids = create_simulation_records(setup, batch.n_trials, strategy_model, writer.db_engine)
+    writer.write_many([
+        trial_rows(sim_id, setup, batch, trial=t, summary_only=summary_only)
+        for t, sim_id in enumerate(sim_ids)
+    ])
+    return sim_ids
+
+
+def persist_sketch(setup, sketch, strategy_model: str = "heuristic_v1", db_engine=None) -> int:
+    """Persist a `SimulationSketch` as one simulation with a single compact sketch row; returns its id."""
+    db_engine = db_engine if db_engine is not None else get_engine()
+    sim_id = create_simulation_records(setup, 1, strategy_model, db_engine)[0]
+    payload = sketch.to_bytes()
+    with span("db_write", table="simulation_sketches") as s, db_engine.begin() as conn:
+        s.add_rows(1)
+        conn.execute(insert(simulation_sketches).values(
+            simulation_id=sim_id, n_trials=sketch.n_trials, format=FORMAT_VERSION, payload=payload,
+        ))
+    return sim_id
@@ -1,33 +1,126 @@
 import pandas as pd
 import numpy as np
-from typing import Dict
+from bisect import bisect_left
+from typing import Optional
 
+from src.store import load_partition, load_table
 
-def predict_finishing_positions(season: int, round_number: int, data_dir: str = "data") -> pd.DataFrame:
+RESULT_COLUMNS = ["season", "round", "driver", "team", "points"]
+SEASON_COLUMNS = [
+    "season", "round", "driver", "team", "grid_position", "predicted_finish",
+    "score", "team_avg_points", "driver_avg_points",
+]
+
+
+class StrengthIndex:
     """
-    Simple baseline predictor using qualifying position and team average points.
-    Outputs a dataframe with predicted order.
+    As-of rolling average points per team (or driver), built in one pass.
+
+    For every event the table holds each key's mean points per result over
+    its last `window` events strictly before that event, so any (season,
+    round) is a row lookup instead of a scan of the history.
     """
-    results = pd.read_csv(f"{data_dir}/results_2022_2025.csv")
-    quali = pd.read_csv(f"{data_dir}/qualifying_2022_2025.csv")
 
-    # Team strength from rolling avg points (last 8 races prior to event)
-    evt_mask = (results["season"] < season) | ((results["season"] == season) & (results["round"] < round_number))
-    hist = results[evt_mask].copy()
-    team_points = hist.groupby(["team"]).agg(team_avg_points=("points", "mean")).reset_index()
+    def __init__(self, results: pd.DataFrame, key: str = "team", window: int = 8):
+        self.key = key
+        self.window = window
+        df = results[["season", "round", key, "points"]].dropna(subset=[key]).copy()
+        df[key] = df[key].astype(object)
+        df["season"] = df["season"].astype(int)
+        df["round"] = df["round"].astype(int)
 
-    grid = quali[(quali["season"] == season) & (quali["round"] == round_number)][["driver", "team", "position"]].rename(
-        columns={"position": "grid_position"}
-    )
+        per_event = df.groupby(["season", "round", key])["points"].agg(["sum", "count"])
+        sums = per_event["sum"].unstack(key, fill_value=0.0).sort_index()
+        counts = per_event["count"].unstack(key, fill_value=0).reindex_like(sums).fillna(0)
+        self.events = list(sums.index)
+        self._row = {evt: i for i, evt in enumerate(self.events)}
 
-    df = grid.merge(team_points, on="team", how="left").fillna({"team_avg_points": 0.0})
+        # Row e of each prefix array covers events 0..e-1
+        played = counts.to_numpy() > 0
+        sum_prefix = np.vstack([np.zeros(sums.shape[1]), np.cumsum(sums.to_numpy(dtype=float), axis=0)])
+        cnt_prefix = np.vstack([np.zeros(counts.shape[1]), np.cumsum(counts.to_numpy(dtype=float), axis=0)])
+        app_prefix = np.vstack([np.zeros(played.shape[1], dtype=np.int64), np.cumsum(played, axis=0)])
+
+        avg = np.full(sum_prefix.shape, np.nan)
+        for k in range(played.shape[1]):
+            app_rows = np.flatnonzero(played[:, k])
+            # Appearances to drop so only the last `window` remain in the window
+            drop = np.maximum(app_prefix[:, k] - window, 0)
+            start = np.where(drop > 0, app_rows[np.maximum(drop - 1, 0)] + 1, 0) if len(app_rows) else np.zeros_like(drop)
+            win_sum = sum_prefix[:, k] - sum_prefix[start, k]
+            win_cnt = cnt_prefix[:, k] - cnt_prefix[start, k]
+            with np.errstate(invalid="ignore", divide="ignore"):
+                avg[:, k] = np.where(win_cnt > 0, win_sum / np.where(win_cnt > 0, win_cnt, 1), np.nan)
+        self.table = pd.DataFrame(avg, columns=list(sums.columns))
+
+    def asof(self, season: int, round_number: int) -> pd.Series:
+        """Average points per key over the `window` events before (season, round)."""
+        evt = (int(season), int(round_number))
+        row = self._row.get(evt)
+        if row is None:
+            row = bisect_left(self.events, evt)
+        return self.table.iloc[row].dropna()
+
+
+def predict_from_grid(grid: pd.DataFrame, team_idx: StrengthIndex, driver_idx: Optional[StrengthIndex],
+                       season: int, round_number: int) -> pd.DataFrame:
+    grid = grid[["driver", "team", "position"]].rename(columns={"position": "grid_position"})
+    grid["driver"] = grid["driver"].astype(object)
+    grid["team"] = grid["team"].astype(object)
+
+    df = grid.assign(
+        team_avg_points=grid["team"].map(team_idx.asof(season, round_number)).astype(float).fillna(0.0)
+    )
+    if driver_idx is not None:
+        df["driver_avg_points"] = df["driver"].map(driver_idx.asof(season, round_number)).astype(float).fillna(0.0)
 
     # Score = -grid_position + alpha * team_strength
     alpha = 0.25
     df["score"] = -df["grid_position"].astype(float) + alpha * df["team_avg_points"].astype(float)
     df = df.sort_values("score", ascending=False).reset_index(drop=True)
     df["predicted_finish"] = np.arange(1, len(df) + 1)
+    return df
+
+
+def predict_finishing_positions(
+    season: int,
+    round_number: int,
+    data_dir: str = "data",
+    team_index: Optional[StrengthIndex] = None,
+) -> pd.DataFrame:
+    """
+    Simple baseline predictor using qualifying position and team average points.
+    Outputs a dataframe with predicted order.
+
+    Team strength is the rolling average points over the team's last 8 races
+    before the event. Pass a prebuilt `team_index` to skip loading results.
+    """
+    if team_index is None:
+        results = load_table("results", columns=RESULT_COLUMNS, seasons=range(season + 1), data_dir=data_dir)
+        team_index = StrengthIndex(results, key="team")
+    quali = load_partition("qualifying", season, round_number, columns=["driver", "team", "position"], data_dir=data_dir)
+
+    df = predict_from_grid(quali, team_index, None, season, round_number)
     return df[["driver", "team", "grid_position", "predicted_finish", "score"]]
 
 
+def predict_season(season: int, data_dir: str = "data", window: int = 8) -> pd.DataFrame:
+    """
+    Predict every round of a season from one load of results and qualifying.
+
+    Team and driver strength indexes are built once; each round is then an
+    as-of lookup. Adds a `driver_avg_points` column alongside the usual
+    prediction columns.
+    """
+    results = load_table("results", columns=RESULT_COLUMNS, seasons=range(season + 1), data_dir=data_dir)
+    quali = load_table("qualifying", columns=["season", "round", "driver", "team", "position"], seasons=[season], data_dir=data_dir)
+    team_idx = StrengthIndex(results, key="team", window=window)
+    driver_idx = StrengthIndex(results, key="driver", window=window)
 
+    frames = []
+    for round_number, grid in quali.groupby("round", sort=True):
+        df = predict_from_grid(grid, team_idx, driver_idx, season, int(round_number))
+        frames.append(df.assign(season=season, round=int(round_number)))
+    if not frames:
+        return pd.DataFrame(columns=SEASON_COLUMNS)
+    return pd.concat(frames, ignore_index=True)[SEASON_COLUMNS]
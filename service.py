@@ -0,0 +1,417 @@
+"""
+Long-running simulation service that keeps event data warm.
+
+    python -m src.service --socket /tmp/f1sim.sock
+    python -m src.service --port 8765
+
+The protocol is one JSON object per line in each direction, over a Unix
+socket or a local TCP port:
+
+    {"op": "simulate", "season": 2024, "round": 5, "n_trials": 100, "seed": 7}
+    {"op": "simulate", "season": 2024, "round": 5, "persist": true}
+    {"op": "predict", "season": 2024, "round": 5}
+    {"op": "stats"} / {"op": "reload"} / {"op": "ping"}
+
+Replies are {"ok": true, "result": ...} or {"ok": false, "error": "..."}.
+Simulate requests for the same event (and strategy overrides) that arrive
+within `batch_window` seconds are merged into one `run_trials` batch.
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, replace
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from src.simulation import RaceSetup, StrategyPlan, prepare_race, run_trials
+
+DEFAULT_SOCKET = "/tmp/f1sim.sock"
+
+_BatchKey = Tuple[int, int, str]
+
+
+@dataclass
+class _Pending:
+    seeds: List[int]
+    persist: bool
+    summary_only: bool
+    future: asyncio.Future
+
+
+def _json_default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def _overrides(raw: Optional[Dict[str, dict]]) -> Tuple[str, Dict[str, StrategyPlan]]:
+    """Parse strategy overrides from a request; returns (batch key part, plans)."""
+    if not raw:
+        return "", {}
+    plans = {
+        driver: StrategyPlan(
+            driver=driver,
+            planned_pit_laps=[int(lap) for lap in plan["planned_pit_laps"]],
+            starting_compound=plan.get("starting_compound", "Medium"),
+            compounds=plan.get("compounds"),
+        )
+        for driver, plan in raw.items()
+    }
+    return json.dumps(raw, sort_keys=True), plans
+
+
+def _summary_records(batch, trials) -> List[dict]:
+    """`BatchResult.summary()` for some trials (a slice or index array) as plain records, without building a DataFrame."""
+    fp = batch.finish_positions[trials]
+    pts = batch.points[trials]
+    mean_finish = fp.mean(axis=0)
+    mean_points = pts.mean(axis=0)
+    columns = {
+        "grid_position": batch.grid_positions.tolist(),
+        "mean_finish": mean_finish.tolist(),
+        "std_finish": fp.std(axis=0).tolist(),
+        "p_win": (fp == 1).mean(axis=0).tolist(),
+        "p_podium": (fp <= 3).mean(axis=0).tolist(),
+        "p_points": (fp <= 10).mean(axis=0).tolist(),
+        "mean_points": mean_points.tolist(),
+        "std_points": pts.std(axis=0).tolist(),
+    }
+    return [
+        {"driver": batch.drivers[j], "team": batch.teams[j], **{c: v[j] for c, v in columns.items()}}
+        for j in np.argsort(mean_finish, kind="stable")
+    ]
+
+
+class SimulationService:
+    """
+    Warm in-memory state plus per-event request batching.
+
+    Race setups (grid, base pace, default strategies), the team strength
+    index and predictions are cached per event; the DB engine is opened
+    once. Heavy work runs on a thread pool so the event loop keeps
+    accepting requests while a batch is simulated.
+    """
+
+    def __init__(
+        self,
+        data_dir: str = "data",
+        batch_window: float = 0.005,
+        max_batch_trials: int = 20_000,
+        workers: Optional[int] = None,
+        db_engine=None,
+    ):
+        self.data_dir = data_dir
+        self.batch_window = batch_window
+        self.max_batch_trials = max_batch_trials
+        self.db_engine = db_engine
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="f1sim")
+        self._setups: Dict[Tuple[int, int], RaceSetup] = {}
+        self._locks: Dict[Tuple[int, int], asyncio.Lock] = {}
+        self._pending: Dict[_BatchKey, List[_Pending]] = {}
+        self._timers: Dict[_BatchKey, asyncio.TimerHandle] = {}
+        self._team_index = None
+        self._predictions: Dict[Tuple[int, int], list] = {}
+        self.stats = {"requests": 0, "simulate_requests": 0, "batches": 0, "trials": 0, "setup_loads": 0}
+
+    async def _run(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    async def _setup(self, season: int, round_number: int) -> RaceSetup:
+        key = (season, round_number)
+        if key not in self._setups:
+            lock = self._locks.setdefault(key, asyncio.Lock())
+            async with lock:
+                if key not in self._setups:
+                    self._setups[key] = await self._run(prepare_race, season, round_number, None, self.data_dir)
+                    self.stats["setup_loads"] += 1
+        return self._setups[key]
+
+    async def simulate(self, season: int, round_number: int, n_trials: int = 1, seed: Optional[int] = None,
+                       persist: bool = False, summary_only: bool = False, strategy_overrides=None):
+        """Queue `n_trials` trials (seeded `seed + i`) into the event's next batch."""
+        strategy_key, plans = _overrides(strategy_overrides)
+        setup = await self._setup(season, round_number)
+        if plans:
+            setup = replace(setup, strategies={**setup.strategies, **plans})
+        seed = 42 if seed is None else int(seed)
+        loop = asyncio.get_running_loop()
+        item = _Pending([seed + i for i in range(int(n_trials))], persist, summary_only, loop.create_future())
+
+        key = (season, round_number, strategy_key)
+        queued = self._pending.setdefault(key, [])
+        queued.append(item)
+        self.stats["simulate_requests"] += 1
+        if sum(len(p.seeds) for p in queued) >= self.max_batch_trials:
+            self._flush(key, setup)
+        elif key not in self._timers:
+            self._timers[key] = loop.call_later(self.batch_window, self._flush, key, setup)
+        return await item.future
+
+    def _flush(self, key: _BatchKey, setup: RaceSetup):
+        timer = self._timers.pop(key, None)
+        if timer is not None:
+            timer.cancel()
+        items = self._pending.pop(key, [])
+        if items:
+            asyncio.get_running_loop().create_task(self._run_batch(setup, items))
+
+    async def _run_batch(self, setup: RaceSetup, items: List[_Pending]):
+        specs = [(len(item.seeds), item.persist, item.summary_only) for item in items]
+        seeds = [s for item in items for s in item.seeds]
+        try:
+            results = await self._run(self._execute, setup, seeds, specs)
+        except Exception as e:
+            for item in items:
+                if not item.future.done():
+                    item.future.set_exception(e)
+            return
+        self.stats["batches"] += 1
+        self.stats["trials"] += len(seeds)
+        for item, result in zip(items, results):
+            if not item.future.done():
+                item.future.set_result(result)
+
+    def _execute(self, setup: RaceSetup, seeds: List[int], specs: List[Tuple[int, bool, bool]]) -> list:
+        """
+        Run one merged batch and split it back into per-request results (worker thread).
+
+        Each distinct seed runs once, however many requests ask for it. Only
+        seeds of requests that persist lap rows keep per-lap arrays; the
+        rest of the batch runs without them.
+        """
+        offsets = np.cumsum([0] + [n for n, _, _ in specs])
+        request_seeds = [seeds[offsets[k]:offsets[k + 1]] for k in range(len(specs))]
+        lap_seeds = sorted({s for k, (_, persist, so) in enumerate(specs) if persist and not so
+                            for s in request_seeds[k]})
+        lapped = set(lap_seeds)
+        plain_seeds = sorted({s for s in seeds if s not in lapped})
+
+        # Trials of all distinct seeds, lap-keeping ones first
+        runs = []
+        if lap_seeds:
+            runs.append(run_trials(setup, lap_seeds, keep_laps=True))
+        if plain_seeds or not lap_seeds:
+            runs.append(run_trials(setup, plain_seeds))
+        batch = replace(
+            runs[0],
+            finish_positions=np.concatenate([b.finish_positions for b in runs]),
+            total_time=np.concatenate([b.total_time for b in runs]),
+            lap_times=None, positions=None, pit_times=None,
+        )
+        row = {s: i for i, s in enumerate(lap_seeds + plain_seeds)}
+        rows = [np.array([row[s] for s in request_seeds[k]], dtype=np.int64) for k in range(len(specs))]
+        results: List[object] = [None] * len(specs)
+
+        # Persisted trials go out in one write per summary_only flag
+        for summary_only in (False, True):
+            group = [k for k, (_, persist, so) in enumerate(specs) if persist and so == summary_only]
+            if not group:
+                continue
+            trials = np.concatenate([rows[k] for k in group])
+            # Lap-keeping seeds are the first rows, so they index that run too
+            source = batch if summary_only else runs[0]
+            ids = self._persist(setup, source.subset(trials), summary_only)
+            start = 0
+            for k in group:
+                results[k] = {"simulation_ids": ids[start:start + specs[k][0]]}
+                start += specs[k][0]
+        for k, (n, persist, _) in enumerate(specs):
+            if not persist:
+                results[k] = {"n_trials": n, "summary": _summary_records(batch, rows[k])}
+        return results
+
+    def _persist(self, setup: RaceSetup, batch, summary_only: bool) -> List[int]:
+        from src.persist import SimulationWriter, persist_batch
+        return persist_batch(setup, batch, SimulationWriter(self.db_engine, summary_only=summary_only))
+
+    def _predict(self, season: int, round_number: int) -> list:
+        from src.predict import RESULT_COLUMNS, StrengthIndex, predict_finishing_positions
+        from src.store import load_table
+        if self._team_index is None:
+            results = load_table("results", columns=RESULT_COLUMNS, data_dir=self.data_dir)
+            self._team_index = StrengthIndex(results, key="team")
+        df = predict_finishing_positions(season, round_number, data_dir=self.data_dir, team_index=self._team_index)
+        return df.to_dict(orient="records")
+
+    async def predict(self, season: int, round_number: int) -> list:
+        key = (season, round_number)
+        if key not in self._predictions:
+            self._predictions[key] = await self._run(self._predict, season, round_number)
+        return self._predictions[key]
+
+    def reload(self):
+        """Drop cached event data, e.g. after new rounds were extracted."""
+        self._setups.clear()
+        self._predictions.clear()
+        self._team_index = None
+
+    async def dispatch(self, request: dict):
+        self.stats["requests"] += 1
+        op = request.get("op")
+        if op == "simulate":
+            return await self.simulate(
+                int(request["season"]), int(request["round"]),
+                n_trials=int(request.get("n_trials", 1)),
+                seed=request.get("seed"),
+                persist=bool(request.get("persist", False)),
+                summary_only=bool(request.get("summary_only", False)),
+                strategy_overrides=request.get("strategy_overrides"),
+            )
+        if op == "predict":
+            return await self.predict(int(request["season"]), int(request["round"]))
+        if op == "stats":
+            return {**self.stats, "events_cached": len(self._setups)}
+        if op == "reload":
+            self.reload()
+            return True
+        if op == "ping":
+            return "pong"
+        raise ValueError(f"Unknown op {op!r}")
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    reply = {"ok": True, "result": await self.dispatch(json.loads(line))}
+                except Exception as e:
+                    reply = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+                writer.write(json.dumps(reply, default=_json_default).encode() + b"\n")
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    def warm_db(self):
+        """Open the engine and one pooled connection up front."""
+        from sqlalchemy import text
+        from src.db import get_engine
+        self.db_engine = self.db_engine if self.db_engine is not None else get_engine()
+        with self.db_engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+
+    async def start(self, socket_path: Optional[str] = DEFAULT_SOCKET, host: str = "127.0.0.1", port: Optional[int] = None):
+        """Start listening; returns the asyncio server."""
+        if port is not None:
+            return await asyncio.start_server(self.handle, host, port, limit=2 ** 24)
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        return await asyncio.start_unix_server(self.handle, socket_path, limit=2 ** 24)
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+
+
+class ServiceClient:
+    """Blocking client for one connection to the service."""
+
+    def __init__(self, socket_path: Optional[str] = DEFAULT_SOCKET, host: str = "127.0.0.1", port: Optional[int] = None,
+                 timeout: float = 300.0):
+        if port is not None:
+            self._sock = socket.create_connection((host, port), timeout=timeout)
+        else:
+            self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self._sock.settimeout(timeout)
+            self._sock.connect(socket_path)
+        self._file = self._sock.makefile("rwb")
+
+    def call(self, op: str, **params):
+        self._file.write(json.dumps({"op": op, **params}, default=_json_default).encode() + b"\n")
+        self._file.flush()
+        reply = json.loads(self._file.readline())
+        if not reply["ok"]:
+            raise RuntimeError(reply["error"])
+        return reply["result"]
+
+    def simulate(self, season: int, round_number: int, n_trials: int = 1, seed: Optional[int] = None, **kwargs):
+        return self.call("simulate", season=season, round=round_number, n_trials=n_trials, seed=seed, **kwargs)
+
+    def predict(self, season: int, round_number: int):
+        return self.call("predict", season=season, round=round_number)
+
+    def close(self):
+        self._file.close()
+        self._sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class AsyncServiceClient:
+    """asyncio client for one connection; requests on it are sent one at a time."""
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self._reader = reader
+        self._writer = writer
+        self._lock = asyncio.Lock()
+
+    @classmethod
+    async def connect(cls, socket_path: Optional[str] = DEFAULT_SOCKET, host: str = "127.0.0.1", port: Optional[int] = None):
+        if port is not None:
+            reader, writer = await asyncio.open_connection(host, port, limit=2 ** 24)
+        else:
+            reader, writer = await asyncio.open_unix_connection(socket_path, limit=2 ** 24)
+        return cls(reader, writer)
+
+    async def call(self, op: str, **params):
+        async with self._lock:
+            self._writer.write(json.dumps({"op": op, **params}, default=_json_default).encode() + b"\n")
+            await self._writer.drain()
+            reply = json.loads(await self._reader.readline())
+        if not reply["ok"]:
+            raise RuntimeError(reply["error"])
+        return reply["result"]
+
+    async def close(self):
+        self._writer.close()
+        await self._writer.wait_closed()
+
+
+async def serve(socket_path: Optional[str] = DEFAULT_SOCKET, port: Optional[int] = None, data_dir: str = "data",
+                batch_window: float = 0.005, warm_db: bool = True, preload: Optional[List[Tuple[int, int]]] = None):
+    """Run the service until cancelled."""
+    service = SimulationService(data_dir=data_dir, batch_window=batch_window)
+    if warm_db:
+        service.warm_db()
+    for season, round_number in preload or []:
+        await service._setup(season, round_number)
+    server = await service.start(socket_path, port=port)
+    print(f"Simulation service listening on {f'127.0.0.1:{port}' if port is not None else socket_path}")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        service.close()
+
+
+def main(argv: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--socket", default=DEFAULT_SOCKET)
+    parser.add_argument("--port", type=int, help="listen on 127.0.0.1:PORT instead of the Unix socket")
+    parser.add_argument("--data-dir", default="data")
+    parser.add_argument("--batch-window", type=float, default=0.005, help="seconds to wait for requests to merge")
+    parser.add_argument("--no-db", action="store_true", help="do not open a DB connection at startup")
+    parser.add_argument("--preload", nargs="*", default=[], help="events to load up front, as SEASON:ROUND")
+    args = parser.parse_args(argv)
+    preload = [tuple(int(x) for x in evt.split(":")) for evt in args.preload]
+    try:
+        asyncio.run(serve(args.socket, args.port, args.data_dir, args.batch_window, not args.no_db, preload))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
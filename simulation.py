@@ -1,12 +1,24 @@
 import pandas as pd
 import numpy as np
-from dataclasses import dataclass
-from typing import Dict, List, Optional
-from pathlib import Path
+from dataclasses import dataclass, replace
+from typing import Dict, List, Optional, Sequence, Tuple, Union
 
-from sqlalchemy import insert
+from src.instrument import span
+from src.pace_model import get_pace_model
+from src.persist import SimulationWriter, create_simulation_records, persist_sketch, trial_rows
+from src.sketch import SimulationSketch
+from src.store import compact_laps, load_partition
 
-from src.db import engine, simulations, simulation_results, simulation_laps, simulation_pitstops
+QUALI_COLUMNS = ["driver", "position", "team"]
+# Compact lap columns _estimate_base_pace and the race-distance lookup use
+LAP_COLUMNS = ["Driver", "LapNumber", "LapTime_s"]
+
+# Per compound: (pace offset in s, extra s per lap of tyre age)
+TYRE_MODEL: Dict[str, Tuple[float, float]] = {
+    "Soft": (0.0, 0.12),
+    "Medium": (0.35, 0.07),
+    "Hard": (0.7, 0.04),
+}
 
 
 @dataclass
@@ -14,22 +26,19 @@ class StrategyPlan:
     driver: str
     planned_pit_laps: List[int]
     starting_compound: str
+    # Compound fitted at each stop; None keeps the Medium/Hard alternation
+    compounds: Optional[List[str]] = None
 
 
 def _load_event_data(season: int, round_number: int, data_dir: str = "data") -> Dict[str, pd.DataFrame]:
-    data_path = Path(data_dir)
-    races = pd.read_csv(data_path / "races_2022_2025.csv")
-    results = pd.read_csv(data_path / "results_2022_2025.csv")
-    quali = pd.read_csv(data_path / "qualifying_2022_2025.csv")
-    laps = pd.read_csv(data_path / "laps_2022_2025.csv")
-
-    races_evt = races[(races["season"] == season) & (races["round"] == round_number)]
+    with span("load_event_data") as s:
+        races_evt = load_partition("races", season, round_number, columns=["race_name"], data_dir=data_dir)
+        res_evt = load_partition("results", season, round_number, data_dir=data_dir)
+        quali_evt = load_partition("qualifying", season, round_number, columns=QUALI_COLUMNS, data_dir=data_dir)
+        laps_evt = load_partition("laps", season, round_number, columns=LAP_COLUMNS, data_dir=data_dir)
+        s.add_rows(len(races_evt) + len(res_evt) + len(quali_evt) + len(laps_evt))
     event_name = races_evt.iloc[0]["race_name"] if not races_evt.empty else f"Round {round_number}"
 
-    res_evt = results[(results["season"] == season) & (results["round"] == round_number)]
-    quali_evt = quali[(quali["season"] == season) & (quali["round"] == round_number)]
-    laps_evt = laps[(laps["season"] == season) & (laps["round"] == round_number)]
-
     # Try to infer grid from quali, fallback to results.grid
     grid = quali_evt[["driver", "position", "team"]].rename(columns={"position": "grid_position"})
     if grid["grid_position"].isna().all():
@@ -47,42 +56,14 @@ def _load_event_data(season: int, round_number: int, data_dir: str = "data") ->
 
 
 def _estimate_base_pace(laps_evt: pd.DataFrame) -> Dict[str, float]:
+    """Median lap time in seconds per driver, read from compact laps (`Driver`, `LapTime_s`)."""
     if laps_evt.empty:
         return {}
-    # Use median clean lap times per driver as base pace
-    cols = [c for c in laps_evt.columns]
-    time_col = None
-    for cand in ["LapTime", "LapTimeSeconds", "LapTime_s", "Time"]:
-        if cand in cols:
-            time_col = cand
-            break
-    if time_col is None:
-        # try to construct lap time if FastF1 formatting
-        if {"LapTime", "Driver"}.issubset(set(cols)):
-            # FastF1 laps often have Timedelta-like strings; let pandas parse
-            lap_times = (
-                laps_evt[["Driver", "LapTime"]]
-                .dropna()
-                .assign(LapTimeSeconds=lambda d: pd.to_timedelta(d["LapTime"]).dt.total_seconds())
-            )
-            base = lap_times.groupby("Driver")["LapTimeSeconds"].median().to_dict()
-            return base
-        return {}
-
-    driver_col = "Driver" if "Driver" in laps_evt.columns else ("driver" if "driver" in laps_evt.columns else None)
-    if driver_col is None:
-        return {}
-
-    df = laps_evt[[driver_col, time_col]].dropna()
-    if np.issubdtype(df[time_col].dtype, np.number):
-        base = df.groupby(driver_col)[time_col].median().to_dict()
-    else:
-        base = (
-            df.assign(_s=lambda d: pd.to_timedelta(d[time_col]).dt.total_seconds())
-            .groupby(driver_col)["_s"].median()
-            .to_dict()
-        )
-    return base
+    if not {"Driver", "LapTime_s"}.issubset(laps_evt.columns):
+        # Raw FastF1 / legacy frame: normalize to the compact lap schema once
+        laps_evt = compact_laps(laps_evt)
+    df = laps_evt[["Driver", "LapTime_s"]].dropna()
+    return df.groupby("Driver", observed=True)["LapTime_s"].median().astype(float).to_dict()
 
 
 def _default_strategies(grid_df: pd.DataFrame, race_laps: int) -> Dict[str, StrategyPlan]:
@@ -100,16 +81,132 @@ def _default_strategies(grid_df: pd.DataFrame, race_laps: int) -> Dict[str, Stra
     return strategies
 
 
-def simulate_race(
+@dataclass
+class RaceSetup:
+    """Everything a race needs before the first lap, loaded once per event."""
+    season: int
+    round_number: int
+    event_name: str
+    grid: pd.DataFrame
+    drivers: List[str]
+    race_laps: int
+    base_pace: Dict[str, float]
+    strategies: Dict[str, StrategyPlan]
+    # Compound -> (offset, degradation per lap); None uses the flat wear cycle
+    tyre_model: Optional[Dict[str, Tuple[float, float]]] = None
+
+    @property
+    def teams(self) -> List[Optional[str]]:
+        if "team" not in self.grid.columns:
+            return [None] * len(self.drivers)
+        team_by_driver = dict(zip(self.grid["driver"], self.grid["team"]))
+        return [team_by_driver.get(d) for d in self.drivers]
+
+    @property
+    def grid_positions(self) -> np.ndarray:
+        pos_by_driver = dict(zip(self.grid["driver"], self.grid["grid_position"]))
+        return np.array([int(pos_by_driver[d]) for d in self.drivers], dtype=np.int64)
+
+    def pit_mask(self) -> np.ndarray:
+        """(laps x drivers) bool, True on each driver's planned pit laps."""
+        mask = np.zeros((self.race_laps, len(self.drivers)), dtype=bool)
+        for j, d in enumerate(self.drivers):
+            plan = self.strategies.get(d)
+            if plan:
+                laps = [lap for lap in set(plan.planned_pit_laps) if 1 <= lap <= self.race_laps]
+                mask[np.array(laps, dtype=np.int64) - 1, j] = True
+        return mask
+
+    def tyre_plan(self):
+        """
+        Stint number and compound per (lap, driver), as they stand at the end
+        of each lap, plus the compound fitted before each stop.
+
+        Stops follow the plan's `compounds` when given; otherwise every stop
+        switches to Hard, or from Hard back to Medium.
+        Returns (stint, compound, from_compound, pit_mask).
+        """
+        pit_mask = self.pit_mask()
+        stops = np.cumsum(pit_mask, axis=0)
+        starts = np.array(
+            [self.strategies[d].starting_compound if d in self.strategies else "Medium" for d in self.drivers],
+            dtype=object,
+        )
+        starts_hard = starts == "Hard"
+        after_odd = np.where(starts_hard, "Medium", "Hard")
+        after_even = np.where(starts_hard, "Hard", "Medium")
+        compound = np.where(stops % 2 == 1, after_odd, after_even).astype(object)
+        compound = np.where(stops == 0, starts, compound)
+        for j, d in enumerate(self.drivers):
+            plan = self.strategies.get(d)
+            if plan is not None and plan.compounds:
+                sequence = np.array([plan.starting_compound] + list(plan.compounds), dtype=object)
+                compound[:, j] = sequence[np.minimum(stops[:, j], len(sequence) - 1)]
+
+        before = np.vstack([starts[None, :], compound[:-1]])
+        from_compound = np.where(pit_mask, before, None)
+        return 1 + stops, compound, from_compound, pit_mask
+
+    def wear_penalty(self) -> np.ndarray:
+        """
+        (laps x drivers) seconds lost to tyres on each lap.
+
+        Without a `tyre_model` this is the flat 15-lap wear cycle shared by
+        every car. With one, each lap costs the fitted compound's offset plus
+        its degradation times the age of the set the lap was driven on.
+        """
+        n_laps, n_drivers = self.race_laps, len(self.drivers)
+        lap = np.arange(1, n_laps + 1)
+        if self.tyre_model is None:
+            return np.repeat((0.08 * (lap % 15))[:, None], n_drivers, axis=1)
+
+        _, compound, from_compound, pit_mask = self.tyre_plan()
+        # A pit lap is still driven on the old set
+        driven = np.where(pit_mask, from_compound, compound)
+        last_stop = np.where(pit_mask, lap[:, None], 0)
+        last_stop = np.maximum.accumulate(last_stop, axis=0)
+        age = lap[:, None] - np.vstack([np.zeros((1, n_drivers), dtype=np.int64), last_stop[:-1]])
+
+        offset = np.zeros((n_laps, n_drivers))
+        degradation = np.zeros((n_laps, n_drivers))
+        for name, (off, deg) in self.tyre_model.items():
+            on = driven == name
+            offset[on] = off
+            degradation[on] = deg
+        return offset + degradation * age
+
+
+def _complete_tyre_model(fitted: Dict[str, Tuple[float, float]]) -> Dict[str, Tuple[float, float]]:
+    """
+    A fitted tyre model with the compounds it lacks filled in from TYRE_MODEL.
+
+    Fitted offsets are relative to the fastest fitted compound, the default
+    ones to Soft, so a missing compound keeps its default degradation and
+    its default offset shifted onto the fitted baseline (by the mean gap
+    between fitted and default offsets of the compounds both have).
+    """
+    shared = [c for c in fitted if c in TYRE_MODEL]
+    shift = float(np.mean([fitted[c][0] - TYRE_MODEL[c][0] for c in shared])) if shared else 0.0
+    model = {c: fitted.get(c, (off + shift, deg)) for c, (off, deg) in TYRE_MODEL.items()}
+    model.update(fitted)
+    return model
+
+
+def prepare_race(
     season: int,
     round_number: int,
     strategy_overrides: Optional[Dict[str, StrategyPlan]] = None,
-    random_seed: int = 42,
     data_dir: str = "data",
-) -> int:
-    rng = np.random.default_rng(random_seed)
+    fitted: bool = True,
+) -> RaceSetup:
+    """
+    Load everything one event's races need.
+
+    With `fitted` (default) driver pace and tyre degradation come from the
+    event's cached pace model (see src.pace_model), fitted on first use;
+    otherwise pace is each driver's median lap and wear the flat cycle.
+    """
     evt = _load_event_data(season, round_number, data_dir=data_dir)
-    event_name = evt["event_name"]
     grid_df = evt["grid"].copy()
     laps_evt = evt["laps"].copy()
 
@@ -120,119 +217,53 @@ def simulate_race(
         # fallback typical distance
         race_laps = 57
 
-    base_pace = _estimate_base_pace(laps_evt)
-    drivers = list(grid_df.sort_values("grid_position")["driver"].values)
-
     strategies = _default_strategies(grid_df, race_laps)
     if strategy_overrides:
         strategies.update(strategy_overrides)
 
-    # Insert simulation record
-    with engine.begin() as conn:
-        res = conn.execute(
-            insert(simulations).values(
-                season=season,
-                round=round_number,
-                event_name=event_name,
-                strategy_model="heuristic_v1",
-            )
-        )
-        sim_id = res.inserted_primary_key[0]
-
-    # Initialize state
-    driver_state = {}
-    for _, row in grid_df.iterrows():
-        d = row["driver"]
-        driver_state[d] = {
-            "position": int(row["grid_position"]),
-            "stint": 1,
-            "compound": strategies[d].starting_compound if d in strategies else "Medium",
-            "total_time": 0.0,
-            "pitted_laps": set(),
-        }
-
-    lap_records = []
-    pit_records = []
-
-    for lap in range(1, race_laps + 1):
-        lap_times = {}
-        for d in drivers:
-            base = base_pace.get(d, 90.0)
-            wear_penalty = 0.08 * (lap % 15)
-            traffic = 0.02 * (driver_state[d]["position"] - 1)
-            randomness = rng.normal(0, 0.15)
-
-            pit_time = 0.0
-            is_pit = False
-            plan = strategies.get(d)
-            if plan and lap in plan.planned_pit_laps and lap not in driver_state[d]["pitted_laps"]:
-                is_pit = True
-                pit_time = 22.0 + rng.normal(0, 0.8)
-                driver_state[d]["pitted_laps"].add(lap)
-                driver_state[d]["stint"] += 1
-                # simple compound switch
-                driver_state[d]["compound"] = "Hard" if driver_state[d]["compound"] != "Hard" else "Medium"
-                pit_records.append({
-                    "simulation_id": sim_id,
-                    "driver": d,
-                    "lap": lap,
-                    "pit_time_s": max(18.0, pit_time),
-                    "from_compound": "Hard" if driver_state[d]["compound"] == "Hard" else "Medium",
-                    "to_compound": driver_state[d]["compound"],
-                })
-
-            lap_time = base + wear_penalty + traffic + randomness + pit_time
-            lap_time = float(max(75.0, lap_time))
-            lap_times[d] = lap_time
-
-        # Recompute positions based on cumulative time
-        for d in drivers:
-            driver_state[d]["total_time"] += lap_times[d]
-
-        ranking = sorted(drivers, key=lambda x: driver_state[x]["total_time"])  # smaller time -> ahead
-        for pos, d in enumerate(ranking, start=1):
-            driver_state[d]["position"] = pos
-
-        for d in drivers:
-            lap_records.append({
-                "simulation_id": sim_id,
-                "lap": lap,
-                "driver": d,
-                "position": driver_state[d]["position"],
-                "lap_time_s": lap_times[d],
-                "stint": driver_state[d]["stint"],
-                "tyre_compound": driver_state[d]["compound"],
-                "is_pit": lap in driver_state[d]["pitted_laps"],
-            })
-
-    # Final results
-    final_order = sorted(drivers, key=lambda x: driver_state[x]["total_time"])  # winner first
-    results_rows = []
-    for finish_pos, d in enumerate(final_order, start=1):
-        team_val = None
-        if "team" in grid_df.columns:
-            team_val = grid_df.loc[grid_df["driver"] == d, "team"].iloc[0]
-        grid_pos = int(grid_df.loc[grid_df["driver"] == d, "grid_position"].iloc[0])
-        results_rows.append({
-            "simulation_id": sim_id,
-            "driver": d,
-            "team": team_val,
-            "grid_position": grid_pos,
-            "finish_position": finish_pos,
-            "points": _points_for_pos(finish_pos),
-            "status": "Finished",
-            "total_time_s": float(driver_state[d]["total_time"]),
-        })
+    base_pace, tyre_model = None, None
+    if fitted:
+        model = get_pace_model(season, round_number, data_dir=data_dir)
+        base_pace = model.base_pace
+        if model.tyre_model:
+            tyre_model = _complete_tyre_model(model.tyre_model)
+
+    return RaceSetup(
+        season=season,
+        round_number=round_number,
+        event_name=evt["event_name"],
+        grid=grid_df,
+        drivers=list(grid_df.sort_values("grid_position")["driver"].values),
+        race_laps=race_laps,
+        base_pace=base_pace if base_pace else _estimate_base_pace(laps_evt),
+        strategies=strategies,
+        tyre_model=tyre_model,
+    )
 
-    # Write to DB
-    with engine.begin() as conn:
-        if lap_records:
-            conn.execute(insert(simulation_laps), lap_records)
-        if pit_records:
-            conn.execute(insert(simulation_pitstops), pit_records)
-        if results_rows:
-            conn.execute(insert(simulation_results), results_rows)
 
+def simulate_race(
+    season: int,
+    round_number: int,
+    strategy_overrides: Optional[Dict[str, StrategyPlan]] = None,
+    random_seed: int = 42,
+    data_dir: str = "data",
+    writer: Optional[SimulationWriter] = None,
+    summary_only: bool = False,
+) -> int:
+    """
+    Simulate one race, persist it and return its simulation id.
+
+    Runs as a single trial of the batch engine. Output is written
+    column-wise through `writer` (a synchronous `SimulationWriter` by
+    default); pass a background writer to keep the simulation from waiting
+    on the database, or `summary_only=True` to skip per-lap rows.
+    """
+    setup = prepare_race(season, round_number, strategy_overrides=strategy_overrides, data_dir=data_dir)
+    sim_id = create_simulation_records(setup)[0]
+
+    batch = run_trials(setup, [random_seed], keep_laps=not summary_only)
+    rows = trial_rows(sim_id, setup, batch, trial=0, summary_only=summary_only)
+    (writer or SimulationWriter()).write(rows)
     return sim_id
 
 
@@ -241,3 +272,353 @@ def _points_for_pos(pos: int) -> float:
     return float(mapping.get(pos, 0))
 
 
+_POINTS_TABLE = np.array([_points_for_pos(p) for p in range(0, 41)])
+
+
+@dataclass
+class BatchResult:
+    """Outcome of many independent trials of one race.
+
+    Per-trial arrays are shaped (trials x drivers); lap-level arrays, when
+    kept, are shaped (trials x drivers x laps). Drivers are in grid order.
+    """
+    season: int
+    round_number: int
+    event_name: str
+    drivers: List[str]
+    teams: List[Optional[str]]
+    grid_positions: np.ndarray
+    finish_positions: np.ndarray
+    total_time: np.ndarray
+    lap_times: Optional[np.ndarray] = None
+    positions: Optional[np.ndarray] = None
+    pit_times: Optional[np.ndarray] = None
+
+    @property
+    def n_trials(self) -> int:
+        return int(self.finish_positions.shape[0])
+
+    @property
+    def points(self) -> np.ndarray:
+        return _POINTS_TABLE[np.minimum(self.finish_positions, len(_POINTS_TABLE) - 1)]
+
+    def subset(self, trials) -> "BatchResult":
+        """The given trials (a slice or index array) as a batch of their own."""
+        def take(a):
+            return None if a is None else a[trials]
+        return replace(
+            self,
+            finish_positions=self.finish_positions[trials],
+            total_time=self.total_time[trials],
+            lap_times=take(self.lap_times),
+            positions=take(self.positions),
+            pit_times=take(self.pit_times),
+        )
+
+    def position_distribution(self) -> pd.DataFrame:
+        """Probability of each driver finishing in each position."""
+        return self.aggregate().position_distribution()
+
+    def summary(self) -> pd.DataFrame:
+        """Per-driver finish position and points statistics, best expected finish first."""
+        fp = self.finish_positions
+        pts = self.points
+        df = pd.DataFrame({
+            "driver": self.drivers,
+            "team": self.teams,
+            "grid_position": self.grid_positions,
+            "mean_finish": fp.mean(axis=0),
+            "std_finish": fp.std(axis=0),
+            "p_win": (fp == 1).mean(axis=0),
+            "p_podium": (fp <= 3).mean(axis=0),
+            "p_points": (fp <= 10).mean(axis=0),
+            "mean_points": pts.mean(axis=0),
+            "std_points": pts.std(axis=0),
+        })
+        return df.sort_values("mean_finish").reset_index(drop=True)
+
+    def aggregate(self) -> "RaceAggregate":
+        n_drivers = len(self.drivers)
+        counts = np.zeros((n_drivers, n_drivers), dtype=np.int64)
+        for j in range(n_drivers):
+            counts[j] = np.bincount(self.finish_positions[:, j] - 1, minlength=n_drivers)
+        pts = self.points
+        return RaceAggregate(
+            season=self.season,
+            round_number=self.round_number,
+            event_name=self.event_name,
+            drivers=list(self.drivers),
+            teams=list(self.teams),
+            grid_positions=self.grid_positions,
+            position_counts=counts,
+            points_sum=pts.sum(axis=0),
+            points_sq_sum=(pts ** 2).sum(axis=0),
+            n_trials=self.n_trials,
+        )
+
+
+@dataclass
+class RaceAggregate:
+    """
+    Mergeable per-driver totals for a batch of trials.
+
+    Small enough to ship between processes; `merge` adds two aggregates of
+    the same event so chunks of trials can be reduced in any grouping.
+    """
+    season: int
+    round_number: int
+    event_name: str
+    drivers: List[str]
+    teams: List[Optional[str]]
+    grid_positions: np.ndarray
+    position_counts: np.ndarray
+    points_sum: np.ndarray
+    points_sq_sum: np.ndarray
+    n_trials: int
+
+    def merge(self, other: "RaceAggregate") -> "RaceAggregate":
+        if other.drivers != self.drivers:
+            raise ValueError("Cannot merge aggregates with different driver lists")
+        return RaceAggregate(
+            season=self.season,
+            round_number=self.round_number,
+            event_name=self.event_name,
+            drivers=self.drivers,
+            teams=self.teams,
+            grid_positions=self.grid_positions,
+            position_counts=self.position_counts + other.position_counts,
+            points_sum=self.points_sum + other.points_sum,
+            points_sq_sum=self.points_sq_sum + other.points_sq_sum,
+            n_trials=self.n_trials + other.n_trials,
+        )
+
+    def position_distribution(self) -> pd.DataFrame:
+        n_drivers = len(self.drivers)
+        return pd.DataFrame(
+            self.position_counts / max(self.n_trials, 1),
+            index=pd.Index(self.drivers, name="driver"),
+            columns=pd.RangeIndex(1, n_drivers + 1, name="finish_position"),
+        )
+
+    def summary(self) -> pd.DataFrame:
+        n = max(self.n_trials, 1)
+        positions = np.arange(1, len(self.drivers) + 1)
+        probs = self.position_counts / n
+        mean_finish = probs @ positions
+        mean_points = self.points_sum / n
+        df = pd.DataFrame({
+            "driver": self.drivers,
+            "team": self.teams,
+            "grid_position": self.grid_positions,
+            "mean_finish": mean_finish,
+            "std_finish": np.sqrt(np.maximum(probs @ positions ** 2 - mean_finish ** 2, 0.0)),
+            "p_win": probs[:, 0],
+            "p_podium": probs[:, :3].sum(axis=1),
+            "p_points": probs[:, :10].sum(axis=1),
+            "mean_points": mean_points,
+            "std_points": np.sqrt(np.maximum(self.points_sq_sum / n - mean_points ** 2, 0.0)),
+        })
+        return df.sort_values("mean_finish").reset_index(drop=True)
+
+
+def _draw_layout(setup: RaceSetup, common: bool = False):
+    """
+    Map every random draw of a trial to its slot.
+
+    By default this is the scalar lap loop's order: one pace sample per
+    driver per lap and, on a pit lap, one pit-time sample straight after
+    it, so a batch trial seeded with `s` matches `simulate_race(random_seed=s)`.
+
+    With `common` each (lap, driver) owns two consecutive draws, pace then
+    pit time (unused without a stop), so the noise does not depend on
+    anyone's pit plan and variants compared on a seed share it.
+    """
+    n_laps, n_drivers = setup.race_laps, len(setup.drivers)
+    if common:
+        noise_idx = 2 * np.arange(n_laps * n_drivers).reshape(n_laps, n_drivers)
+        return noise_idx, noise_idx + 1, 2 * n_laps * n_drivers
+
+    pit_mask = setup.pit_mask()
+    # Each slot takes one draw, plus one more when the driver pits that lap
+    draws_per_slot = 1 + pit_mask.ravel().astype(np.int64)
+    slot_start = np.concatenate([[0], np.cumsum(draws_per_slot)[:-1]])
+    noise_idx = slot_start.reshape(n_laps, n_drivers)
+    # Laps without a stop point their (unused) pit slot at the pace draw
+    pit_idx = np.where(pit_mask, noise_idx + 1, noise_idx)
+    return noise_idx, pit_idx, int(draws_per_slot.sum())
+
+
+def run_trials(
+    setup: RaceSetup,
+    seeds: Sequence[Union[int, np.random.SeedSequence]],
+    keep_laps: bool = False,
+    sketch: Optional[SimulationSketch] = None,
+) -> BatchResult:
+    """
+    Run one trial per seed, vectorized across trials and drivers.
+
+    The lap loop stays sequential because traffic depends on the previous
+    lap's order, but each lap is a handful of array operations over the
+    whole (trials x drivers) field. A `sketch` is updated as each lap
+    completes, so its aggregates need no per-lap arrays.
+    """
+    return _run_batch([setup], seeds, keep_laps, sketch, common=False)
+
+
+def run_variants(
+    variants: Sequence[RaceSetup],
+    seeds: Sequence[Union[int, np.random.SeedSequence]],
+    keep_laps: bool = False,
+) -> BatchResult:
+    """
+    Run every seed under each of `variants` in one batch.
+
+    Variants are setups of the same event that differ in strategies or tyre
+    model (pace and grid come from the first). Trial `v * len(seeds) + t`
+    is variant `v` on seed `t`, and all variants use the same draws per
+    seed (common random numbers), so differences between them come from
+    the variants and not from the noise. The draws are laid out
+    independently of pit plans (see `_draw_layout`), so a seed's trial here
+    differs from the same seed in `run_trials`.
+    """
+    return _run_batch(list(variants), seeds, keep_laps, None, common=True)
+
+
+def _run_batch(
+    variants: List[RaceSetup],
+    seeds: Sequence[Union[int, np.random.SeedSequence]],
+    keep_laps: bool,
+    sketch: Optional[SimulationSketch],
+    common: bool,
+) -> BatchResult:
+    setup = variants[0]
+    drivers = setup.drivers
+    if any(v.drivers != drivers or v.race_laps != setup.race_laps for v in variants[1:]):
+        raise ValueError("Variants must share the field and race length")
+    if sketch is not None and len(variants) > 1:
+        raise ValueError("A sketch aggregates a single setup")
+    n_seeds, n_drivers, n_laps = len(seeds), len(drivers), setup.race_laps
+    noise_idx, pit_idx, n_draws = _draw_layout(setup, common)
+
+    draws = np.empty((n_seeds, n_draws))
+    for t, seed in enumerate(seeds):
+        draws[t] = np.random.default_rng(seed).standard_normal(n_draws)
+
+    # (variants x laps x drivers); with several variants each trial row
+    # looks up its own variant's plan on every lap, and its seed's draws
+    # one lap at a time rather than from a copy of `draws` per variant
+    pit_masks = np.stack([v.pit_mask() for v in variants])
+    wears = np.stack([v.wear_penalty() for v in variants])
+    row_seed = None
+    if len(variants) == 1:
+        pit_mask, wear = pit_masks[0], wears[0]
+    else:
+        row_variant = np.repeat(np.arange(len(variants)), n_seeds)
+        row_seed = np.tile(np.arange(n_seeds), len(variants))
+    n_trials = n_seeds * len(variants)
+
+    def lap_draws(idx):
+        return draws[:, idx] if row_seed is None else draws[:, idx][row_seed]
+
+    base = np.array([setup.base_pace.get(d, 90.0) for d in drivers], dtype=float)
+    positions = np.tile(setup.grid_positions.astype(float), (n_trials, 1))
+    total_time = np.zeros((n_trials, n_drivers))
+    ranks = np.arange(1, n_drivers + 1, dtype=float)
+    rows = np.arange(n_trials)[:, None]
+
+    lap_hist = np.empty((n_trials, n_drivers, n_laps)) if keep_laps else None
+    pos_hist = np.empty((n_trials, n_drivers, n_laps), dtype=np.int16) if keep_laps else None
+    pit_hist = np.zeros((n_trials, n_drivers, n_laps)) if keep_laps else None
+
+    with span("simulate_laps") as s:
+        for i in range(n_laps):
+            if len(variants) == 1:
+                lap_wear, pitting = wear[i], pit_mask[i]
+            else:
+                lap_wear, pitting = wears[row_variant, i], pit_masks[row_variant, i]
+            traffic = 0.02 * (positions - 1)
+            randomness = 0.15 * lap_draws(noise_idx[i])
+            lap_time = base + lap_wear + traffic + randomness
+            if pitting.any():
+                pit_time = np.where(pitting, 22.0 + 0.8 * lap_draws(pit_idx[i]), 0.0)
+                lap_time += pit_time
+                if keep_laps:
+                    pit_hist[:, :, i] = pit_time
+            np.maximum(lap_time, 75.0, out=lap_time)
+            total_time += lap_time
+
+            order = np.argsort(total_time, axis=1, kind="stable")
+            positions[rows, order] = ranks
+
+            if keep_laps:
+                lap_hist[:, :, i] = lap_time
+                pos_hist[:, :, i] = positions
+            if sketch is not None:
+                sketch.observe_lap(i, positions, lap_time, pitting)
+        if sketch is not None:
+            sketch.observe_finish(positions)
+        s.add_rows(n_trials * n_drivers * n_laps)
+        s.incr("trials", n_trials)
+
+    return BatchResult(
+        season=setup.season,
+        round_number=setup.round_number,
+        event_name=setup.event_name,
+        drivers=list(drivers),
+        teams=setup.teams,
+        grid_positions=setup.grid_positions,
+        finish_positions=positions.astype(np.int64),
+        total_time=total_time,
+        lap_times=lap_hist,
+        positions=pos_hist,
+        pit_times=pit_hist,
+    )
+
+
+def simulate_race_batch(
+    season: int,
+    round_number: int,
+    n_trials: int = 1000,
+    strategy_overrides: Optional[Dict[str, StrategyPlan]] = None,
+    random_seed: int = 42,
+    data_dir: str = "data",
+    seeds: Optional[Sequence[Union[int, np.random.SeedSequence]]] = None,
+    keep_laps: bool = False,
+) -> BatchResult:
+    """
+    Monte Carlo version of `simulate_race`: many trials, no DB writes.
+
+    Trial `i` is seeded with `random_seed + i` unless explicit `seeds` are
+    given, so trial 0 reproduces `simulate_race(..., random_seed=random_seed)`.
+    """
+    setup = prepare_race(season, round_number, strategy_overrides=strategy_overrides, data_dir=data_dir)
+    if seeds is None:
+        seeds = [random_seed + i for i in range(n_trials)]
+    return run_trials(setup, seeds, keep_laps=keep_laps)
+
+
+def simulate_race_sketch(
+    season: int,
+    round_number: int,
+    n_trials: int = 1000,
+    strategy_overrides: Optional[Dict[str, StrategyPlan]] = None,
+    random_seed: int = 42,
+    chunk_size: int = 500,
+    data_dir: str = "data",
+    persist: bool = True,
+) -> Tuple[Optional[int], SimulationSketch]:
+    """
+    Monte Carlo an event into a `SimulationSketch` instead of per-lap rows.
+
+    Trials run `chunk_size` at a time with the same seeds as
+    `simulate_race_batch`, and only the sketch is kept between chunks. With
+    `persist` the batch gets one `simulations` row and one compact sketch
+    row; returns (simulation id or None, sketch).
+    """
+    setup = prepare_race(season, round_number, strategy_overrides=strategy_overrides, data_dir=data_dir)
+    sketch = SimulationSketch.for_setup(setup)
+    for start in range(0, n_trials, chunk_size):
+        seeds = [random_seed + i for i in range(start, min(start + chunk_size, n_trials))]
+        run_trials(setup, seeds, sketch=sketch)
+    sim_id = persist_sketch(setup, sketch) if persist else None
+    return sim_id, sketch
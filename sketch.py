@@ -0,0 +1,218 @@
+"""
+Streaming aggregates of a batch of simulated trials.
+
+Instead of drivers x laps x trials rows in `simulation_laps`, a
+`SimulationSketch` keeps fixed-size counts that are updated lap by lap
+while the trials run (pass it to `run_trials(..., sketch=...)`):
+
+    position_counts  (laps x drivers x positions)  how often each driver held each position
+    lap_time_counts  (drivers x bins)              lap-time histogram on a log scale
+    pit_counts       (drivers x laps)              how often each driver pitted on each lap
+    finish_counts    (drivers x positions)         finishing positions
+
+Size depends on the field and race length, never on the number of
+trials, and sketches of the same event add up with `merge`. Lap-time
+quantiles read from the histogram are within LAP_TIME_ACCURACY (relative)
+of the exact values.
+"""
+import io
+import json
+from dataclasses import dataclass
+from typing import List, Sequence
+
+import numpy as np
+import pandas as pd
+
+# Compound codes stored per (lap, driver); index 0 means unknown
+COMPOUNDS = ["?", "Hard", "Medium", "Soft"]
+
+# Lap-time histogram: geometric bins from LAP_TIME_MIN to LAP_TIME_MAX seconds,
+# each LAP_TIME_ACCURACY wide in relative terms; times outside are clamped
+LAP_TIME_MIN = 60.0
+LAP_TIME_MAX = 300.0
+LAP_TIME_ACCURACY = 0.001
+_GAMMA = (1 + LAP_TIME_ACCURACY) / (1 - LAP_TIME_ACCURACY)
+N_LAP_TIME_BINS = int(np.ceil(np.log(LAP_TIME_MAX / LAP_TIME_MIN) / np.log(_GAMMA)))
+
+FORMAT_VERSION = 1
+
+
+def _bin_values() -> np.ndarray:
+    """Representative lap time of each histogram bin (its geometric midpoint)."""
+    lower = LAP_TIME_MIN * _GAMMA ** np.arange(N_LAP_TIME_BINS)
+    return lower * np.sqrt(_GAMMA)
+
+
+@dataclass
+class SimulationSketch:
+    season: int
+    round_number: int
+    event_name: str
+    drivers: List[str]
+    race_laps: int
+    position_counts: np.ndarray
+    lap_time_counts: np.ndarray
+    pit_counts: np.ndarray
+    finish_counts: np.ndarray
+    compounds: np.ndarray
+    n_trials: int = 0
+
+    @classmethod
+    def for_setup(cls, setup) -> "SimulationSketch":
+        """An empty sketch for a `RaceSetup`, with its planned compounds."""
+        n_laps, n_drivers = setup.race_laps, len(setup.drivers)
+        _, compound, _, _ = setup.tyre_plan()
+        codes = {name: i for i, name in enumerate(COMPOUNDS)}
+        return cls(
+            season=setup.season,
+            round_number=setup.round_number,
+            event_name=setup.event_name,
+            drivers=list(setup.drivers),
+            race_laps=n_laps,
+            position_counts=np.zeros((n_laps, n_drivers, n_drivers), dtype=np.uint32),
+            lap_time_counts=np.zeros((n_drivers, N_LAP_TIME_BINS), dtype=np.uint32),
+            pit_counts=np.zeros((n_drivers, n_laps), dtype=np.uint32),
+            finish_counts=np.zeros((n_drivers, n_drivers), dtype=np.uint32),
+            compounds=np.vectorize(lambda c: codes.get(c, 0), otypes=[np.int8])(compound),
+        )
+
+    def observe_lap(self, lap_index: int, positions: np.ndarray, lap_time: np.ndarray, pitting: np.ndarray):
+        """Add one lap of every trial: positions and lap times are (trials x drivers)."""
+        n_drivers = len(self.drivers)
+        offsets = np.arange(n_drivers) * n_drivers
+        idx = (offsets + positions.astype(np.int64) - 1).ravel()
+        self.position_counts[lap_index] += np.bincount(idx, minlength=n_drivers * n_drivers).reshape(n_drivers, n_drivers).astype(np.uint32)
+
+        bins = np.floor(np.log(lap_time / LAP_TIME_MIN) / np.log(_GAMMA)).astype(np.int64)
+        np.clip(bins, 0, N_LAP_TIME_BINS - 1, out=bins)
+        idx = (np.arange(n_drivers) * N_LAP_TIME_BINS + bins).ravel()
+        self.lap_time_counts += np.bincount(idx, minlength=n_drivers * N_LAP_TIME_BINS).reshape(n_drivers, -1).astype(np.uint32)
+
+        self.pit_counts[:, lap_index] += np.asarray(pitting, dtype=np.uint32) * np.uint32(positions.shape[0])
+
+    def observe_finish(self, finish_positions: np.ndarray):
+        """Add the final (trials x drivers) classification and count the trials."""
+        n_drivers = len(self.drivers)
+        idx = (np.arange(n_drivers) * n_drivers + finish_positions.astype(np.int64) - 1).ravel()
+        self.finish_counts += np.bincount(idx, minlength=n_drivers * n_drivers).reshape(n_drivers, n_drivers).astype(np.uint32)
+        self.n_trials += int(finish_positions.shape[0])
+
+    def merge(self, other: "SimulationSketch") -> "SimulationSketch":
+        if other.drivers != self.drivers or other.race_laps != self.race_laps:
+            raise ValueError("Cannot merge sketches of different fields or race lengths")
+        return SimulationSketch(
+            season=self.season,
+            round_number=self.round_number,
+            event_name=self.event_name,
+            drivers=self.drivers,
+            race_laps=self.race_laps,
+            position_counts=self.position_counts + other.position_counts,
+            lap_time_counts=self.lap_time_counts + other.lap_time_counts,
+            pit_counts=self.pit_counts + other.pit_counts,
+            finish_counts=self.finish_counts + other.finish_counts,
+            compounds=self.compounds,
+            n_trials=self.n_trials + other.n_trials,
+        )
+
+    # --- Views used by the figures ---
+
+    def position_frame(self) -> pd.DataFrame:
+        """Expected position per (lap, driver), in the `simulation_laps` column layout."""
+        n_drivers = len(self.drivers)
+        probs = self.position_counts / max(self.n_trials, 1)
+        mean = probs @ np.arange(1, n_drivers + 1)
+        return pd.DataFrame({
+            "lap": np.repeat(np.arange(1, self.race_laps + 1), n_drivers),
+            "driver": np.tile(self.drivers, self.race_laps),
+            "position": mean.ravel(),
+        })
+
+    def tyre_frame(self) -> pd.DataFrame:
+        """Planned compound per (lap, driver)."""
+        n_drivers = len(self.drivers)
+        return pd.DataFrame({
+            "lap": np.repeat(np.arange(1, self.race_laps + 1), n_drivers),
+            "driver": np.tile(self.drivers, self.race_laps),
+            "tyre_compound": np.array(COMPOUNDS, dtype=object)[self.compounds.ravel()],
+        })
+
+    def finish_frame(self) -> pd.DataFrame:
+        """Expected points, mean finish and win probability per driver, best first."""
+        from src.simulation import _POINTS_TABLE
+        n_drivers = len(self.drivers)
+        probs = self.finish_counts / max(self.n_trials, 1)
+        points = _POINTS_TABLE[np.minimum(np.arange(1, n_drivers + 1), len(_POINTS_TABLE) - 1)]
+        df = pd.DataFrame({
+            "driver": self.drivers,
+            "finish_position": probs @ np.arange(1, n_drivers + 1),
+            "points": probs @ points,
+            "p_win": probs[:, 0],
+        })
+        return df.sort_values("finish_position").reset_index(drop=True)
+
+    def pit_frame(self) -> pd.DataFrame:
+        """Share of trials in which each driver pitted on each lap (non-zero entries only)."""
+        driver_idx, lap_idx = np.nonzero(self.pit_counts)
+        return pd.DataFrame({
+            "driver": np.array(self.drivers, dtype=object)[driver_idx],
+            "lap": lap_idx + 1,
+            "p_pit": self.pit_counts[driver_idx, lap_idx] / max(self.n_trials, 1),
+        })
+
+    def lap_time_quantiles(self, quantiles: Sequence[float] = (0.1, 0.5, 0.9)) -> pd.DataFrame:
+        """Lap-time quantiles per driver (seconds), read from the histogram."""
+        values = _bin_values()
+        cumulative = np.cumsum(self.lap_time_counts, axis=1)
+        totals = np.maximum(cumulative[:, -1:], 1)
+        out = {"driver": self.drivers}
+        for q in quantiles:
+            idx = np.argmax(cumulative >= np.ceil(q * totals), axis=1)
+            out[f"q{int(round(q * 100))}"] = values[idx]
+        return pd.DataFrame(out)
+
+    # --- Compact serialization ---
+
+    def to_bytes(self) -> bytes:
+        meta = {
+            "format": FORMAT_VERSION,
+            "season": self.season,
+            "round_number": self.round_number,
+            "event_name": self.event_name,
+            "drivers": self.drivers,
+            "race_laps": self.race_laps,
+            "n_trials": self.n_trials,
+            "lap_time_bins": [LAP_TIME_MIN, LAP_TIME_MAX, LAP_TIME_ACCURACY],
+        }
+        buf = io.BytesIO()
+        np.savez_compressed(
+            buf,
+            meta=np.frombuffer(json.dumps(meta).encode(), dtype=np.uint8),
+            position_counts=self.position_counts,
+            lap_time_counts=self.lap_time_counts,
+            pit_counts=self.pit_counts,
+            finish_counts=self.finish_counts,
+            compounds=self.compounds,
+        )
+        return buf.getvalue()
+
+    @classmethod
+    def from_bytes(cls, payload: bytes) -> "SimulationSketch":
+        with np.load(io.BytesIO(payload)) as data:
+            meta = json.loads(data["meta"].tobytes().decode())
+            if meta.get("format") != FORMAT_VERSION:
+                raise ValueError(f"Unsupported sketch format {meta.get('format')}")
+            if meta["lap_time_bins"] != [LAP_TIME_MIN, LAP_TIME_MAX, LAP_TIME_ACCURACY]:
+                raise ValueError("Sketch was written with different lap-time bins")
+            return cls(
+                season=meta["season"],
+                round_number=meta["round_number"],
+                event_name=meta["event_name"],
+                drivers=meta["drivers"],
+                race_laps=meta["race_laps"],
+                position_counts=data["position_counts"],
+                lap_time_counts=data["lap_time_counts"],
+                pit_counts=data["pit_counts"],
+                finish_counts=data["finish_counts"],
+                compounds=data["compounds"],
+                n_trials=meta["n_trials"],
+            )
@@ -0,0 +1,214 @@
+import itertools
+import math
+from dataclasses import dataclass, replace
+from statistics import NormalDist
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from src.simulation import TYRE_MODEL, RaceSetup, StrategyPlan, prepare_race, run_variants
+
+COMPOUNDS = ("Soft", "Medium", "Hard")
+OBJECTIVES = ("finish", "points", "time")
+
+
+@dataclass
+class StrategyResult:
+    """Best plan found for one driver, with a confidence interval on its score."""
+    driver: str
+    plan: StrategyPlan
+    objective: str
+    mean: float
+    ci_low: float
+    ci_high: float
+    n_trials: int
+    baseline_mean: float
+    candidates: int
+    trials_used: int
+
+
+def candidate_plans(
+    driver: str,
+    race_laps: int,
+    max_stops: int = 2,
+    compounds: Sequence[str] = COMPOUNDS,
+    min_stint: int = 8,
+    lap_step: int = 3,
+) -> List[StrategyPlan]:
+    """
+    Enumerate pit-lap and compound sequences for one driver.
+
+    Stops sit on a `lap_step` grid and every stint lasts at least
+    `min_stint` laps. Each plan uses two or more distinct compounds, as the
+    dry-race rules require.
+    """
+    laps = list(range(min_stint, race_laps - min_stint + 1, lap_step))
+    plans = []
+    for n_stops in range(1, max_stops + 1):
+        for pit_laps in itertools.combinations(laps, n_stops):
+            if any(b - a < min_stint for a, b in zip(pit_laps, pit_laps[1:])):
+                continue
+            for sequence in itertools.product(compounds, repeat=n_stops + 1):
+                if len(set(sequence)) < 2:
+                    continue
+                plans.append(StrategyPlan(
+                    driver=driver,
+                    planned_pit_laps=list(pit_laps),
+                    starting_compound=sequence[0],
+                    compounds=list(sequence[1:]),
+                ))
+    return plans
+
+
+def _scores(setup: RaceSetup, driver: str, plans: Sequence[StrategyPlan], seeds, objective: str) -> np.ndarray:
+    """(plans x seeds) scores for `driver` (lower is better), all plans in one batch on the same draws."""
+    variants = [replace(setup, strategies={**setup.strategies, driver: plan}) for plan in plans]
+    batch = run_variants(variants, seeds)
+    j = batch.drivers.index(driver)
+    if objective == "finish":
+        scores = batch.finish_positions[:, j].astype(float)
+    elif objective == "points":
+        scores = -batch.points[:, j]
+    else:
+        scores = batch.total_time[:, j]
+    return scores.reshape(len(plans), len(seeds))
+
+
+def optimize_driver(
+    setup: RaceSetup,
+    driver: str,
+    candidates: Optional[List[StrategyPlan]] = None,
+    objective: str = "finish",
+    min_trials: int = 16,
+    max_trials: int = 512,
+    eta: int = 3,
+    base_seed: int = 42,
+    confidence: float = 0.95,
+) -> StrategyResult:
+    """
+    Successive halving over one driver's candidate plans, the rest of the
+    field keeping its strategies in `setup`.
+
+    Every rung runs all surviving candidates in one batch on the same fresh
+    seeds; a trial's noise does not depend on the pit plan, so candidates
+    see common random numbers. Each adds the trials to its running totals
+    and the best 1/`eta` are kept. Rungs grow by `eta` until one candidate is left or a rung
+    would exceed `max_trials` per candidate. The driver's current plan runs
+    in every rung as the baseline, so it is compared on the same trials.
+    """
+    if objective not in OBJECTIVES:
+        raise ValueError(f"objective must be one of {OBJECTIVES}")
+    if setup.tyre_model is None:
+        setup = replace(setup, tyre_model=TYRE_MODEL)
+    if candidates is None:
+        candidates = candidate_plans(driver, setup.race_laps)
+    baseline = setup.strategies.get(driver)
+    pool = list(candidates) + ([baseline] if baseline is not None else [])
+    ref = len(pool) - 1 if baseline is not None else None
+
+    n = np.zeros(len(pool), dtype=np.int64)
+    total = np.zeros(len(pool))
+    total_sq = np.zeros(len(pool))
+    alive = np.arange(len(pool))
+    rung_trials = min_trials
+    trials_used = 0
+    rung = 0
+    while True:
+        seeds = np.random.SeedSequence([base_seed, rung]).spawn(rung_trials)
+        active = alive if ref is None or ref in alive else np.append(alive, ref)
+        scores = _scores(setup, driver, [pool[k] for k in active], seeds, objective)
+        n[active] += scores.shape[1]
+        total[active] += scores.sum(axis=1)
+        total_sq[active] += (scores ** 2).sum(axis=1)
+        trials_used += rung_trials * (len(alive) + int(ref is not None and ref not in alive))
+        rung += 1
+
+        if len(alive) <= 1 or n[alive].max() + rung_trials * eta > max_trials:
+            break
+        means = total[alive] / n[alive]
+        keep = max(1, math.ceil(len(alive) / eta))
+        alive = alive[np.argsort(means, kind="stable")[:keep]]
+        rung_trials *= eta
+
+    means = total / np.maximum(n, 1)
+    best = alive[np.argmin(means[alive])]
+    std = math.sqrt(max(total_sq[best] / n[best] - means[best] ** 2, 0.0))
+    half = _z(confidence) * std / math.sqrt(n[best])
+    # Report in the objective's natural sign (points are maximized)
+    sign = -1.0 if objective == "points" else 1.0
+    low, high = sorted((sign * (means[best] - half), sign * (means[best] + half)))
+    baseline_mean = float(sign * means[ref]) if ref is not None else float("nan")
+
+    return StrategyResult(
+        driver=driver,
+        plan=pool[best],
+        objective=objective,
+        mean=float(sign * means[best]),
+        ci_low=float(low),
+        ci_high=float(high),
+        n_trials=int(n[best]),
+        baseline_mean=baseline_mean,
+        candidates=len(candidates),
+        trials_used=int(trials_used),
+    )
+
+
+def _z(confidence: float) -> float:
+    """Two-sided standard normal quantile for `confidence`."""
+    return NormalDist().inv_cdf(0.5 + confidence / 2)
+
+
+def optimize_strategies(
+    season: int,
+    round_number: int,
+    drivers: Optional[Iterable[str]] = None,
+    objective: str = "finish",
+    max_stops: int = 2,
+    lap_step: int = 3,
+    min_trials: int = 16,
+    max_trials: int = 512,
+    eta: int = 3,
+    base_seed: int = 42,
+    tyre_model: Optional[Dict[str, tuple]] = None,
+    data_dir: str = "data",
+) -> Dict[str, StrategyResult]:
+    """
+    Best pit strategy per driver for an event, without touching the database.
+
+    Each driver is optimized against the field's default strategies, so the
+    result for one driver does not depend on the order drivers are searched.
+    """
+    setup = prepare_race(season, round_number, data_dir=data_dir)
+    setup = replace(setup, tyre_model=tyre_model or setup.tyre_model or TYRE_MODEL)
+    results = {}
+    for driver in (list(drivers) if drivers is not None else setup.drivers):
+        candidates = candidate_plans(driver, setup.race_laps, max_stops=max_stops, lap_step=lap_step)
+        best = optimize_driver(
+            setup, driver, candidates, objective=objective,
+            min_trials=min_trials, max_trials=max_trials, eta=eta, base_seed=base_seed,
+        )
+        results[driver] = best
+        print(f"{driver}: pit {best.plan.planned_pit_laps} {objective}={best.mean:.2f} "
+              f"[{best.ci_low:.2f}, {best.ci_high:.2f}] (baseline {best.baseline_mean:.2f})")
+    return results
+
+
+def results_frame(results: Dict[str, StrategyResult]) -> pd.DataFrame:
+    """One row per driver: best plan, score with confidence interval, and baseline."""
+    return pd.DataFrame([
+        {
+            "driver": r.driver,
+            "pit_laps": r.plan.planned_pit_laps,
+            "compounds": [r.plan.starting_compound] + list(r.plan.compounds or []),
+            "objective": r.objective,
+            "mean": r.mean,
+            "ci_low": r.ci_low,
+            "ci_high": r.ci_high,
+            "baseline_mean": r.baseline_mean,
+            "n_trials": r.n_trials,
+            "candidates": r.candidates,
+            "trials_used": r.trials_used,
+        }
+        for r in results.values()
+    ])
@@ -0,0 +1,116 @@
+from pathlib import Path
+from typing import Dict
+
+import numpy as np
+import pandas as pd
+
+from src.store import export_csv, write_partition
+
+POINTS = {1: 25, 2: 18, 3: 15, 4: 12, 5: 10, 6: 8, 7: 6, 8: 4, 9: 2, 10: 1}
+COMPOUNDS = np.array(["SOFT", "MEDIUM", "HARD"])
+
+
+def _event_frames(rng: np.random.Generator, season: int, round_number: int, n_drivers: int, n_laps: int) -> Dict[str, pd.DataFrame]:
+    drivers = np.array([f"D{i:02d}" for i in range(n_drivers)])
+    teams = np.array([f"Team {i // 2}" for i in range(n_drivers)])
+    skill = np.linspace(0.0, 2.0, n_drivers) + rng.normal(0, 0.3, n_drivers)
+
+    quali_order = np.argsort(skill + rng.normal(0, 0.4, n_drivers), kind="stable")
+    grid = np.empty(n_drivers, dtype=np.int64)
+    grid[quali_order] = np.arange(1, n_drivers + 1)
+
+    # Laps: base pace by skill, linear tyre wear within a stint, one stop near half distance
+    pit_lap = np.clip(n_laps // 2 + rng.integers(-5, 6, n_drivers), 2, max(n_laps - 1, 2))
+    lap_no = np.arange(1, n_laps + 1)
+    stint = np.where(lap_no[None, :] > pit_lap[:, None], 2, 1)
+    tyre_life = np.where(stint == 1, lap_no[None, :], lap_no[None, :] - pit_lap[:, None])
+    lap_s = (
+        88.0 + skill[:, None]
+        + 0.05 * tyre_life
+        + rng.normal(0, 0.4, (n_drivers, n_laps))
+        + np.where(lap_no[None, :] == pit_lap[:, None], 21.0, 0.0)
+    )
+    cum = np.cumsum(lap_s, axis=1)
+    position = np.argsort(np.argsort(cum, axis=0, kind="stable"), axis=0, kind="stable") + 1
+    start_compound = rng.integers(0, 2, n_drivers)
+    compound = np.where(stint == 1, COMPOUNDS[start_compound][:, None], "HARD")
+
+    laps = pd.DataFrame({
+        "Driver": np.repeat(drivers, n_laps),
+        "Team": np.repeat(teams, n_laps),
+        "LapNumber": np.tile(lap_no, n_drivers).astype(float),
+        "LapTime": pd.to_timedelta(lap_s.ravel(), unit="s"),
+        "Sector1Time": pd.to_timedelta(lap_s.ravel() * 0.31, unit="s"),
+        "Sector2Time": pd.to_timedelta(lap_s.ravel() * 0.36, unit="s"),
+        "Sector3Time": pd.to_timedelta(lap_s.ravel() * 0.33, unit="s"),
+        "Stint": stint.ravel().astype(float),
+        "Compound": compound.ravel(),
+        "TyreLife": tyre_life.ravel().astype(float),
+        "Position": position.ravel().astype(float),
+        "season": season,
+        "round": round_number,
+    })
+
+    finish = position[:, -1]
+    results = pd.DataFrame({
+        "season": season,
+        "round": round_number,
+        "driver": drivers,
+        "team": teams,
+        "position": finish.astype(float),
+        "laps": float(n_laps),
+        "time": pd.to_timedelta(cum[:, -1], unit="s"),
+        "points": [float(POINTS.get(int(p), 0)) for p in finish],
+        "fastest_lap": None,
+        "grid": grid.astype(float),
+    })
+    qualifying = pd.DataFrame({
+        "season": season,
+        "round": round_number,
+        "driver": drivers,
+        "team": teams,
+        "position": grid.astype(float),
+        "q1": pd.to_timedelta(87.0 + skill, unit="s"),
+        "q2": None,
+        "q3": None,
+    })
+    races = pd.DataFrame([{
+        "season": season,
+        "round": round_number,
+        "race_name": f"Synthetic Grand Prix {round_number}",
+        "circuit": f"Circuit {round_number}",
+        "date": pd.Timestamp(year=season, month=1, day=1) + pd.Timedelta(weeks=2 * round_number),
+    }])
+    return {"races": races, "results": results, "qualifying": qualifying, "laps": laps}
+
+
+def generate_synthetic_data(
+    data_dir="data",
+    seasons: int = 1,
+    events: int = 4,
+    drivers: int = 20,
+    laps: int = 57,
+    first_season: int = 2022,
+    seed: int = 0,
+    csv: bool = False,
+) -> Dict[str, int]:
+    """
+    Write a deterministic synthetic dataset into the event store.
+
+    Scale is seasons x events x drivers x laps. The same arguments always
+    produce the same data. With `csv=True` the season-wide CSVs are
+    written as well. Returns row counts per table.
+    """
+    data_dir = Path(data_dir)
+    rng = np.random.default_rng(seed)
+    counts = {"races": 0, "results": 0, "qualifying": 0, "laps": 0}
+    for season in range(first_season, first_season + seasons):
+        for round_number in range(1, events + 1):
+            frames = _event_frames(rng, season, round_number, drivers, laps)
+            for table in ("results", "qualifying", "laps", "races"):
+                write_partition(frames[table], table, season, round_number, data_dir)
+                counts[table] += len(frames[table])
+    if csv:
+        for table in counts:
+            export_csv(table, data_dir / f"{table}_2022_2025.csv", data_dir)
+    return counts
@@ -0,0 +1,290 @@
+"""
+Telemetry store: per-car channels cut into one chunk per (driver, lap),
+kept in one memory-mapped Arrow IPC file per event.
+
+    data/telemetry/season=2024/round=5/car_data-<id>.arrow   one record batch per driver-lap
+    data/telemetry/season=2024/round=5/index.parquet         driver, lap -> batch number
+
+The index names the data file it describes and is replaced last, so a
+rewrite that dies half way leaves the previous store readable.
+
+Reading a lap maps the file and touches only that lap's record batch. With
+the default uncompressed layout the returned arrays are zero-copy views of
+the mapped file; `compression="zstd"` (or "lz4") gives smaller files, at
+the price of decompressing a lap's batch each time it is read.
+"""
+import uuid
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from src.instrument import span
+
+TELEMETRY_SUBDIR = "telemetry"
+
+# Stored channels and their on-disk types (no nulls, so reads stay zero-copy)
+CHANNELS: Dict[str, pa.DataType] = {
+    "Time_s": pa.float32(),      # seconds since the start of the lap
+    "Distance": pa.float32(),    # metres since the start of the lap
+    "Speed": pa.float32(),
+    "Throttle": pa.float32(),
+    "Brake": pa.uint8(),
+    "nGear": pa.int8(),
+    "RPM": pa.float32(),
+    "DRS": pa.int8(),
+}
+SCHEMA = pa.schema([(name, dtype) for name, dtype in CHANNELS.items()])
+
+# Discrete channels are resampled by holding the last value, not interpolated
+STEP_CHANNELS = ("Brake", "nGear", "DRS")
+
+# Index schema metadata key naming the event's data file
+DATA_FILE_KEY = b"data_file"
+# Data file of stores written before the index named it
+LEGACY_DATA_FILE = "car_data.arrow"
+
+
+def telemetry_dir(season: int, round_number: int, data_dir="data") -> Path:
+    return Path(data_dir) / TELEMETRY_SUBDIR / f"season={int(season)}" / f"round={int(round_number)}"
+
+
+def has_telemetry(season: int, round_number: int, data_dir="data") -> bool:
+    return (telemetry_dir(season, round_number, data_dir) / "index.parquet").exists()
+
+
+def list_telemetry(data_dir="data") -> List[Tuple[int, int]]:
+    """(season, round) pairs that have a telemetry store, sorted."""
+    events = []
+    for path in (Path(data_dir) / TELEMETRY_SUBDIR).glob("season=*/round=*/index.parquet"):
+        events.append((int(path.parent.parent.name.split("=", 1)[1]), int(path.parent.name.split("=", 1)[1])))
+    return sorted(events)
+
+
+def _seconds(values: pd.Series) -> np.ndarray:
+    if pd.api.types.is_timedelta64_dtype(values):
+        return values.dt.total_seconds().to_numpy(dtype=float)
+    return pd.to_numeric(values, errors="coerce").to_numpy(dtype=float)
+
+
+def _lap_batch(car: Dict[str, np.ndarray], lo: int, hi: int, lap_start: float) -> pa.RecordBatch:
+    t = car["SessionTime"][lo:hi]
+    speed = car["Speed"][lo:hi]
+    # Distance integrated from speed over each lap, as FastF1's add_distance does
+    dt = np.diff(t, prepend=t[0] if len(t) else 0.0)
+    distance = np.cumsum(speed / 3.6 * dt)
+    columns = {
+        "Time_s": t - lap_start,
+        "Distance": distance,
+        "Speed": speed,
+        "Throttle": car["Throttle"][lo:hi],
+        "Brake": car["Brake"][lo:hi],
+        "nGear": car["nGear"][lo:hi],
+        "RPM": car["RPM"][lo:hi],
+        "DRS": car["DRS"][lo:hi],
+    }
+    return pa.RecordBatch.from_arrays(
+        [pa.array(np.asarray(columns[name]).astype(dtype.to_pandas_dtype(), copy=False)) for name, dtype in CHANNELS.items()],
+        schema=SCHEMA,
+    )
+
+
+def _car_arrays(df: pd.DataFrame) -> Dict[str, np.ndarray]:
+    df = df.sort_values("SessionTime") if "SessionTime" in df.columns else df
+    arrays = {"SessionTime": _seconds(df["SessionTime"])}
+    for name in ("Speed", "Throttle", "RPM"):
+        arrays[name] = (
+            np.nan_to_num(pd.to_numeric(df[name], errors="coerce").to_numpy(dtype=float))
+            if name in df.columns else np.zeros(len(df))
+        )
+    for name in ("Brake", "nGear", "DRS"):
+        arrays[name] = (
+            pd.to_numeric(df[name], errors="coerce").fillna(0).to_numpy(dtype=np.int64)
+            if name in df.columns else np.zeros(len(df), dtype=np.int64)
+        )
+    return arrays
+
+
+def write_event_telemetry(
+    car_data: Mapping[str, pd.DataFrame],
+    laps: pd.DataFrame,
+    season: int,
+    round_number: int,
+    data_dir="data",
+    compression: Optional[str] = None,
+) -> int:
+    """
+    Cut each car's session telemetry into laps and write the event's store.
+
+    `car_data` maps driver number to a frame with SessionTime and the raw
+    channels (FastF1's `session.car_data`); `laps` needs DriverNumber,
+    Driver, LapNumber, LapStartTime and Time (lap end, session time).
+    Uncompressed by default so reads stay zero-copy; pass
+    `compression="lz4"` or "zstd" to trade read speed for disk space.
+
+    Overwrites any existing store for the event: the data goes to a new
+    file and the index, which names it, is swapped in last. Returns the
+    lap count.
+    """
+    out_dir = telemetry_dir(season, round_number, data_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    options = pa.ipc.IpcWriteOptions(compression=compression) if compression else None
+    previous = _data_file(out_dir) if (out_dir / "index.parquet").exists() else None
+
+    laps = laps.dropna(subset=["LapNumber", "LapStartTime", "Time"])
+    index_rows = []
+    data_file = f"car_data-{uuid.uuid4().hex[:12]}.arrow"
+    tmp = out_dir / f"{data_file}.tmp"
+    with span("telemetry_write") as s, pa.OSFile(str(tmp), "wb") as sink:
+        with pa.ipc.new_file(sink, SCHEMA, options=options) as writer:
+            for number, car_laps in laps.groupby("DriverNumber", sort=True, observed=True):
+                car_df = car_data.get(str(number))
+                if car_df is None or car_df.empty:
+                    continue
+                car = _car_arrays(car_df)
+                starts = _seconds(car_laps["LapStartTime"])
+                ends = _seconds(car_laps["Time"])
+                lo = np.searchsorted(car["SessionTime"], starts, side="left")
+                hi = np.searchsorted(car["SessionTime"], ends, side="right")
+                driver = str(car_laps["Driver"].iloc[0])
+                for lap, a, b, start in zip(car_laps["LapNumber"].astype(int), lo, hi, starts):
+                    if b <= a:
+                        continue
+                    writer.write_batch(_lap_batch(car, a, b, start))
+                    index_rows.append({"driver": driver, "lap": int(lap), "batch": len(index_rows), "n_samples": int(b - a)})
+                    s.add_rows(b - a)
+    tmp.replace(out_dir / data_file)
+
+    index = pd.DataFrame(index_rows, columns=["driver", "lap", "batch", "n_samples"]).astype(
+        {"lap": "int16", "batch": "int32", "n_samples": "int32"}
+    )
+    table = pa.Table.from_pandas(index, preserve_index=False)
+    table = table.replace_schema_metadata({**(table.schema.metadata or {}), DATA_FILE_KEY: data_file.encode()})
+    pq.write_table(table, out_dir / "index.parquet.tmp")
+    (out_dir / "index.parquet.tmp").replace(out_dir / "index.parquet")
+    _open_cached.cache_clear()
+    if previous is not None and previous != data_file:
+        try:
+            (out_dir / previous).unlink(missing_ok=True)
+        except OSError:
+            pass  # still mapped by a reader (Windows); the next rewrite retries
+    return len(index)
+
+
+def _data_file(path: Path) -> str:
+    """Name of the data file the event's index describes."""
+    metadata = pq.read_schema(path / "index.parquet").metadata or {}
+    return metadata.get(DATA_FILE_KEY, LEGACY_DATA_FILE.encode()).decode()
+
+
+def ingest_session_telemetry(session, season: int, round_number: int, data_dir="data",
+                             compression: Optional[str] = None) -> int:
+    """
+    Write a loaded FastF1 session's car telemetry (session.load(telemetry=True))
+    to the store; uncompressed (zero-copy reads) unless `compression` is given.
+    """
+    return write_event_telemetry(session.car_data, session.laps, season, round_number, data_dir, compression)
+
+
+class EventTelemetry:
+    """Memory-mapped reader for one event's telemetry store."""
+
+    def __init__(self, season: int, round_number: int, data_dir="data"):
+        path = telemetry_dir(season, round_number, data_dir)
+        self.season = season
+        self.round_number = round_number
+        index = pq.read_table(path / "index.parquet")
+        data_file = (index.schema.metadata or {}).get(DATA_FILE_KEY, LEGACY_DATA_FILE.encode()).decode()
+        self.index = index.to_pandas()
+        self._batch = {(d, int(lap)): int(b) for d, lap, b in zip(self.index["driver"], self.index["lap"], self.index["batch"])}
+        self._source = pa.memory_map(str(path / data_file), "r")
+        self._reader = pa.ipc.open_file(self._source)
+
+    @property
+    def drivers(self) -> List[str]:
+        return sorted(self.index["driver"].unique())
+
+    def laps(self, driver: str) -> List[int]:
+        return sorted(self.index.loc[self.index["driver"] == driver, "lap"].astype(int))
+
+    def lap(self, driver: str, lap: int, channels: Optional[Sequence[str]] = None) -> Dict[str, np.ndarray]:
+        """One lap's trace as read-only arrays (zero-copy views when the store is uncompressed)."""
+        key = (driver, int(lap))
+        if key not in self._batch:
+            raise KeyError(f"No telemetry for {driver} lap {lap} in {self.season} R{self.round_number}")
+        batch = self._reader.get_batch(self._batch[key])
+        names = list(channels) if channels is not None else batch.schema.names
+        return {name: batch.column(name).to_numpy(zero_copy_only=True) for name in names}
+
+    def iter_laps(self, driver: Optional[str] = None, channels: Optional[Sequence[str]] = None) -> Iterator[Tuple[str, int, Dict[str, np.ndarray]]]:
+        index = self.index if driver is None else self.index[self.index["driver"] == driver]
+        for d, lap in zip(index["driver"], index["lap"]):
+            yield d, int(lap), self.lap(d, lap, channels)
+
+    def lap_frame(self, driver: str, lap: int, channels: Optional[Sequence[str]] = None,
+                  distance_step: Optional[float] = None) -> pd.DataFrame:
+        trace = self.lap(driver, lap, channels if channels is None or "Distance" in channels else list(channels) + ["Distance"])
+        if distance_step is not None:
+            trace = resample_to_distance(trace, step=distance_step)
+        return pd.DataFrame(trace)
+
+    def close(self):
+        self._source.close()
+
+
+@lru_cache(maxsize=8)
+def _open_cached(season: int, round_number: int, data_dir: str) -> EventTelemetry:
+    return EventTelemetry(season, round_number, data_dir)
+
+
+def open_event_telemetry(season: int, round_number: int, data_dir="data") -> EventTelemetry:
+    """Shared reader for an event; the last few opened events stay mapped."""
+    return _open_cached(int(season), int(round_number), str(data_dir))
+
+
+def resample_to_distance(
+    trace: Dict[str, np.ndarray],
+    step: float = 5.0,
+    grid: Optional[np.ndarray] = None,
+) -> Dict[str, np.ndarray]:
+    """
+    Resample a lap trace onto a fixed distance grid (every `step` metres, or
+    an explicit `grid`) so laps of different sample timing line up.
+
+    Continuous channels are linearly interpolated; Brake, gear and DRS hold
+    their last value.
+    """
+    distance = np.asarray(trace["Distance"], dtype=float)
+    if grid is None:
+        grid = np.arange(0.0, distance[-1] if len(distance) else 0.0, step)
+    grid = np.asarray(grid, dtype=float)
+    # Distance can stall when the car is stationary; np.interp needs it non-decreasing
+    distance = np.maximum.accumulate(distance)
+    out = {"Distance": grid.astype(np.float32)}
+    held = np.clip(np.searchsorted(distance, grid, side="right") - 1, 0, max(len(distance) - 1, 0))
+    for name, values in trace.items():
+        if name == "Distance":
+            continue
+        if name in STEP_CHANNELS:
+            out[name] = np.asarray(values)[held]
+        else:
+            out[name] = np.interp(grid, distance, np.asarray(values, dtype=float)).astype(np.float32)
+    return out
+
+
+def load_lap_telemetry(
+    season: int,
+    round_number: int,
+    driver: str,
+    lap: int,
+    channels: Optional[Iterable[str]] = None,
+    distance_step: Optional[float] = None,
+    data_dir="data",
+) -> pd.DataFrame:
+    """One driver-lap trace as a DataFrame, optionally on a `distance_step` metre grid."""
+    event = open_event_telemetry(season, round_number, data_dir)
+    return event.lap_frame(driver, lap, list(channels) if channels is not None else None, distance_step)
@@ -0,0 +1,42 @@
+"""
+Shared fixtures. The modules import each other as `src.<module>`, so the
+repository directory is registered as the `src` package whatever the
+checkout is called, and the database defaults to a throwaway SQLite file.
+"""
+import importlib.util
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+
+if "src" not in sys.modules:
+    _spec = importlib.util.spec_from_file_location("src", ROOT / "__init__.py", submodule_search_locations=[str(ROOT)])
+    _module = importlib.util.module_from_spec(_spec)
+    sys.modules["src"] = _module
+    _spec.loader.exec_module(_module)
+
+
+@pytest.fixture(autouse=True)
+def _sqlite_default(tmp_path, monkeypatch):
+    """Never reach the configured PostgreSQL server from a test."""
+    monkeypatch.setenv("F1_DB_URI", f"sqlite:///{tmp_path / 'default.db'}")
+
+
+@pytest.fixture(scope="session")
+def synthetic_dir(tmp_path_factory):
+    """A small synthetic dataset (two events, six drivers, twelve laps) with its CSVs."""
+    from src.synthetic import generate_synthetic_data
+    data_dir = tmp_path_factory.mktemp("data")
+    generate_synthetic_data(data_dir, seasons=1, events=2, drivers=6, laps=12, csv=True)
+    return data_dir
+
+
+@pytest.fixture
+def sqlite_engine(tmp_path):
+    from sqlalchemy import create_engine
+    engine = create_engine(f"sqlite:///{tmp_path / 'sim.db'}")
+    yield engine
+    engine.dispose()
@@ -0,0 +1,30 @@
+import numpy as np
+import pytest
+
+import src.championship as championship
+from src.championship import current_standings, simulate_championship
+from src.simulation import _POINTS_TABLE
+
+
+def test_rounds_missing_from_the_store_race_the_latest_field(synthetic_dir):
+    agg = simulate_championship(2022, after_round=1, rounds=[2, 3, 4], n_trials=20, chunk_size=8,
+                                data_dir=str(synthetic_dir))
+    assert agg.rounds == [2, 3, 4]
+    assert agg.n_trials == 20
+
+    # Every simulated round hands out a full race's points on top of round 1
+    actual = current_standings(2022, 1, str(synthetic_dir))["points"].sum()
+    per_race = _POINTS_TABLE[1:len(agg.drivers) + 1].sum()
+    assert agg.driver_points_sum.sum() / agg.n_trials == pytest.approx(actual + 3 * per_race)
+    np.testing.assert_array_equal(agg.driver_position_counts.sum(axis=1), [20] * len(agg.drivers))
+
+
+def test_default_rounds_come_from_the_schedule(synthetic_dir, monkeypatch):
+    monkeypatch.setattr(championship, "_schedule_rounds", lambda season, data_dir="data": [1, 2, 3, 4, 5])
+    agg = simulate_championship(2022, after_round=2, n_trials=4, data_dir=str(synthetic_dir))
+    assert agg.rounds == [3, 4, 5]
+
+
+def test_round_without_any_field_is_an_error(synthetic_dir):
+    with pytest.raises(ValueError, match="2023 round 1"):
+        simulate_championship(2023, rounds=[1], n_trials=4, data_dir=str(synthetic_dir))
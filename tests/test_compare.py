@@ -0,0 +1,45 @@
+import pytest
+from sqlalchemy import func, select
+
+from src.compare import compare_many, compare_sim_to_actual
+from src.db import simulation_vs_actual
+from src.persist import SimulationWriter, persist_batch
+from src.simulation import prepare_race, run_trials
+
+
+@pytest.fixture(scope="module")
+def setup(synthetic_dir):
+    return prepare_race(2022, 1, data_dir=str(synthetic_dir))
+
+
+@pytest.fixture(scope="module")
+def batch(setup):
+    return run_trials(setup, [1, 2, 3], keep_laps=True)
+
+
+def _count(engine, table, **where):
+    stmt = select(func.count()).select_from(table)
+    for column, value in where.items():
+        stmt = stmt.where(table.c[column] == value)
+    with engine.connect() as conn:
+        return conn.execute(stmt).scalar_one()
+
+
+def test_compare_paths_agree(synthetic_dir, setup, batch, sqlite_engine):
+    ids = persist_batch(setup, batch, SimulationWriter(sqlite_engine))
+    many = compare_many(ids, data_dir=str(synthetic_dir), db_engine=sqlite_engine)
+    assert len(many) == 3 * len(setup.drivers)
+    assert (many["diff_positions"] == many["sim_finish"] - many["actual_finish"]).all()
+
+    one = compare_sim_to_actual(ids[2], 2022, 1, data_dir=str(synthetic_dir), db_engine=sqlite_engine)
+    expected = many[many["simulation_id"] == ids[2]].set_index("driver")["diff_positions"]
+    assert one.set_index("driver")["diff_positions"].sort_index().tolist() == expected.sort_index().tolist()
+    assert _count(sqlite_engine, simulation_vs_actual) == len(many) + len(one)
+    assert _count(sqlite_engine, simulation_vs_actual, simulation_id=ids[2]) == 2 * len(setup.drivers)
+
+
+def test_compare_many_without_ids_or_persist(synthetic_dir, setup, batch, sqlite_engine):
+    assert compare_many([], data_dir=str(synthetic_dir), db_engine=sqlite_engine).empty
+    ids = persist_batch(setup, batch, SimulationWriter(sqlite_engine))
+    compare_many(ids, data_dir=str(synthetic_dir), persist=False, db_engine=sqlite_engine)
+    assert _count(sqlite_engine, simulation_vs_actual) == 0
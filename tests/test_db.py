@@ -0,0 +1,30 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.db import bulk_load
+from src.store import load_partition
+
+
+def test_bulk_load_is_idempotent(synthetic_dir, sqlite_engine):
+    results = load_partition("results", 2022, 1, data_dir=synthetic_dir)
+    first = bulk_load(results, "results", chunksize=4, db_engine=sqlite_engine)
+    second = bulk_load(results, "results", chunksize=4, db_engine=sqlite_engine)
+    assert first["rows"] == second["rows"] == len(results)
+
+    with sqlite_engine.connect() as conn:
+        stored = pd.read_sql("SELECT driver, points FROM results ORDER BY driver", conn)
+    assert len(stored) == len(results)
+    expected = results.assign(driver=results["driver"].astype(str)).sort_values("driver")
+    np.testing.assert_allclose(stored["points"], expected["points"])
+    with sqlite_engine.connect() as conn:
+        assert conn.exec_driver_sql("SELECT COUNT(*) FROM event_driver_stats").scalar_one() == len(results)
+
+
+def test_bulk_load_updates_changed_rows(synthetic_dir, sqlite_engine):
+    results = load_partition("results", 2022, 1, data_dir=synthetic_dir)
+    bulk_load(results, "results", db_engine=sqlite_engine)
+    bulk_load(results.assign(points=results["points"] + 1), "results", db_engine=sqlite_engine)
+    with sqlite_engine.connect() as conn:
+        total = conn.exec_driver_sql("SELECT SUM(points) FROM results").scalar_one()
+    assert total == pytest.approx(float(results["points"].sum()) + len(results))
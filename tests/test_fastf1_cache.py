@@ -0,0 +1,16 @@
+import warnings
+from types import SimpleNamespace
+
+import pandas as pd
+
+from src.fastf1_cache import FINAL_AFTER, _is_final
+
+
+def test_is_final_compares_naive_dates_in_utc():
+    now = pd.Timestamp.now(tz="UTC").tz_localize(None)
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        assert _is_final(SimpleNamespace(date=now - FINAL_AFTER - pd.Timedelta(minutes=5)))
+        assert not _is_final(SimpleNamespace(date=now - pd.Timedelta(minutes=5)))
+        assert not _is_final(SimpleNamespace(date=pd.Timestamp.now(tz="Europe/Rome")))
+    assert _is_final(SimpleNamespace(date=None))
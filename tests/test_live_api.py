@@ -0,0 +1,78 @@
+import asyncio
+
+import pandas as pd
+import pytest
+
+import src.live_api as live_api
+from src.live_api import SessionSnapshot, _compact_session_laps
+
+
+def _session_laps(rows):
+    raw = pd.DataFrame(rows, columns=["Driver", "Team", "LapNumber", "LapTime", "Position"])
+    raw["LapTime"] = pd.to_timedelta(raw["LapTime"], unit="s")
+    return _compact_session_laps(raw, 2024, 1)
+
+
+LAPS = [
+    ("VER", "Red Bull", 1, 90.0, 1),
+    ("HAM", "Mercedes", 1, 90.5, 2),
+    ("VER", "Red Bull", 2, 89.8, 1),
+    ("HAM", "Mercedes", 2, 89.7, 2),
+    ("VER", "Red Bull", 3, 89.9, 2),
+    ("HAM", "Mercedes", 3, 89.6, 1),
+]
+
+
+def test_diff_over_successive_polls_of_compact_laps():
+    laps = _session_laps(LAPS)
+    assert isinstance(laps["driver"].dtype, pd.CategoricalDtype)
+    snapshot = SessionSnapshot()
+
+    # First poll: VER is a lap ahead of HAM, so last laps differ per driver
+    first = laps[(laps["LapNumber"] <= 1) | ((laps["driver"] == "VER") & (laps["LapNumber"] == 2))]
+    new_laps, changes = snapshot.diff(first)
+    assert len(new_laps) == 3
+    assert snapshot.last_lap == {"VER": 2.0, "HAM": 1.0}
+    assert sorted(changes["driver"]) == ["HAM", "VER"]
+
+    new_laps, changes = snapshot.diff(laps)
+    assert sorted(zip(new_laps["driver"].astype(str), new_laps["LapNumber"])) == [("HAM", 2), ("HAM", 3), ("VER", 3)]
+    assert snapshot.last_lap == {"VER": 3.0, "HAM": 3.0}
+    moved = dict(zip(changes["driver"], zip(changes["old_position"], changes["new_position"])))
+    assert moved == {"VER": (1.0, 2.0), "HAM": (2.0, 1.0)}
+
+    # Nothing new: no laps, no changes
+    new_laps, changes = snapshot.diff(laps)
+    assert new_laps.empty and changes.empty
+
+
+def test_failed_load_is_reported_on_the_update(monkeypatch):
+    def down(*args, **kwargs):
+        raise ConnectionError("timing API unavailable")
+
+    monkeypatch.setattr(live_api, "load_session", down)
+    poller = live_api.LivePoller(2024, 1, min_interval=1.0, max_interval=8.0, backoff=2.0)
+    update = asyncio.run(poller.poll_once())
+    assert isinstance(update.error, ConnectionError)
+    assert poller.interval == 2.0
+
+
+def test_grid_and_results_raise_failed_loads(monkeypatch):
+    def down(*args, **kwargs):
+        raise ConnectionError("timing API unavailable")
+
+    monkeypatch.setattr(live_api, "load_session", down)
+    with pytest.raises(ConnectionError):
+        live_api.get_event_grid_and_results(2024, 1)
+
+
+def test_grid_and_results_are_empty_before_the_sessions(monkeypatch):
+    from fastf1.exceptions import DataNotLoadedError
+
+    def not_run(*args, **kwargs):
+        raise DataNotLoadedError("no data")
+
+    monkeypatch.setattr(live_api, "load_session", not_run)
+    grid, results = live_api.get_event_grid_and_results(2024, 1)
+    assert grid.empty and list(grid.columns) == ["driver", "team", "grid_position"]
+    assert results.empty
@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+
+from src.parallel import SimJob, run_parallel
+from src.simulation import StrategyPlan
+
+
+def _run(data_dir, n_workers, jobs=((2022, 1), (2022, 2))):
+    return run_parallel(list(jobs), n_trials=30, base_seed=7, n_workers=n_workers, chunk_size=8, data_dir=str(data_dir))
+
+
+@pytest.fixture(scope="module")
+def serial(synthetic_dir):
+    return _run(synthetic_dir, 1)
+
+
+@pytest.mark.parametrize("n_workers", [2, 3])
+def test_results_do_not_depend_on_worker_count(synthetic_dir, serial, n_workers):
+    pooled = _run(synthetic_dir, n_workers)
+    assert len(pooled) == len(serial) == 2
+    for a, b in zip(serial, pooled):
+        assert a.n_trials == b.n_trials == 30
+        np.testing.assert_array_equal(a.position_counts, b.position_counts)
+        np.testing.assert_array_equal(a.points_sum, b.points_sum)
+        np.testing.assert_array_equal(a.points_sq_sum, b.points_sq_sum)
+
+
+def test_seed_and_job_select_the_streams(synthetic_dir, serial):
+    again = _run(synthetic_dir, 1)
+    np.testing.assert_array_equal(again[0].position_counts, serial[0].position_counts)
+
+    reseeded = run_parallel([(2022, 1)], n_trials=30, base_seed=8, n_workers=1, chunk_size=8, data_dir=str(synthetic_dir))
+    assert not np.array_equal(reseeded[0].position_counts, serial[0].position_counts)
+
+
+def test_mixed_jobs_are_returned_in_job_order(synthetic_dir):
+    override = SimJob(2022, 1, {"D00": StrategyPlan("D00", [3, 9], "Soft")})
+    serial = _run(synthetic_dir, 1, jobs=[(2022, 2), override])
+    pooled = _run(synthetic_dir, 2, jobs=[(2022, 2), override])
+    assert [a.round_number for a in pooled] == [2, 1]
+    for a, b in zip(serial, pooled):
+        np.testing.assert_array_equal(a.position_counts, b.position_counts)
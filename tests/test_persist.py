@@ -0,0 +1,58 @@
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine, func, select
+
+from src.db import simulation_laps, simulation_pitstops, simulation_results
+from src.persist import SimulationWriter, persist_batch, trial_rows
+from src.simulation import prepare_race, run_trials
+
+
+@pytest.fixture(scope="module")
+def setup(synthetic_dir):
+    return prepare_race(2022, 1, data_dir=str(synthetic_dir))
+
+
+@pytest.fixture(scope="module")
+def batch(setup):
+    return run_trials(setup, [1, 2, 3], keep_laps=True)
+
+
+def _count(engine, table, **where):
+    stmt = select(func.count()).select_from(table)
+    for column, value in where.items():
+        stmt = stmt.where(table.c[column] == value)
+    with engine.connect() as conn:
+        return conn.execute(stmt).scalar_one()
+
+
+@pytest.mark.parametrize("background", [False, True])
+def test_persist_batch_writes_every_trial(setup, batch, sqlite_engine, background):
+    with SimulationWriter(sqlite_engine, background=background) as writer:
+        ids = persist_batch(setup, batch, writer)
+        writer.flush()
+    n_drivers, n_laps = len(setup.drivers), setup.race_laps
+
+    assert len(set(ids)) == 3
+    assert _count(sqlite_engine, simulation_results) == 3 * n_drivers
+    assert _count(sqlite_engine, simulation_laps) == 3 * n_drivers * n_laps
+    assert _count(sqlite_engine, simulation_pitstops) == 3 * int(setup.pit_mask().sum())
+
+    with sqlite_engine.connect() as conn:
+        stored = pd.read_sql(select(simulation_results).where(simulation_results.c.simulation_id == ids[1]), conn)
+    finish = dict(zip(stored["driver"], stored["finish_position"]))
+    assert [finish[d] for d in batch.drivers] == batch.finish_positions[1].tolist()
+
+
+def test_summary_only_writer_skips_lap_rows(setup, batch, sqlite_engine):
+    persist_batch(setup, batch, SimulationWriter(sqlite_engine, summary_only=True))
+    assert _count(sqlite_engine, simulation_results) == 3 * len(setup.drivers)
+    assert _count(sqlite_engine, simulation_laps) == 0
+
+
+def test_background_writer_surfaces_failures(setup, batch, tmp_path):
+    # The writer's database has no schema, so the worker's insert fails
+    writer = SimulationWriter(create_engine(f"sqlite:///{tmp_path / 'empty.db'}"), background=True)
+    writer.write(trial_rows(1, setup, batch))
+    with pytest.raises(Exception, match="simulation_"):
+        writer.flush()
+    writer.close()
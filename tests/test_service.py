@@ -0,0 +1,49 @@
+import pytest
+from sqlalchemy import func, select
+
+import src.service as service
+from src.db import simulation_laps, simulation_results
+from src.service import SimulationService, _summary_records
+from src.simulation import prepare_race, run_trials
+
+
+@pytest.fixture(scope="module")
+def setup(synthetic_dir):
+    return prepare_race(2022, 1, data_dir=str(synthetic_dir))
+
+
+def _count(engine, table):
+    with engine.connect() as conn:
+        return conn.execute(select(func.count()).select_from(table)).scalar_one()
+
+
+def test_merged_batch_runs_each_seed_once_and_keeps_laps_only_where_persisted(
+        synthetic_dir, setup, sqlite_engine, monkeypatch):
+    calls = []
+
+    def recording_run_trials(setup, seeds, keep_laps=False):
+        calls.append((list(seeds), keep_laps))
+        return run_trials(setup, seeds, keep_laps=keep_laps)
+
+    monkeypatch.setattr(service, "run_trials", recording_run_trials)
+    sim = SimulationService(data_dir=str(synthetic_dir), db_engine=sqlite_engine)
+    # Summary of 1-3, lap rows for 2-4, results-only rows for 3 and 5
+    specs = [(3, False, False), (3, True, False), (2, True, True)]
+    results = sim._execute(setup, [1, 2, 3, 2, 3, 4, 3, 5], specs)
+
+    assert sorted(calls) == [([1, 5], False), ([2, 3, 4], True)]
+    assert results[0] == {"n_trials": 3, "summary": _summary_records(run_trials(setup, [1, 2, 3]), slice(None))}
+    assert len(results[1]["simulation_ids"]) == 3 and len(results[2]["simulation_ids"]) == 2
+
+    n_drivers = len(setup.drivers)
+    assert _count(sqlite_engine, simulation_laps) == 3 * n_drivers * setup.race_laps
+    assert _count(sqlite_engine, simulation_results) == 5 * n_drivers
+    with sqlite_engine.connect() as conn:
+        stored = conn.execute(
+            select(simulation_results.c.driver, simulation_results.c.finish_position)
+            .where(simulation_results.c.simulation_id == results[2]["simulation_ids"][1])
+        ).all()
+    finish = dict(stored)
+    expected = run_trials(setup, [5]).finish_positions[0]
+    assert [finish[d] for d in setup.drivers] == expected.tolist()
+
@@ -0,0 +1,111 @@
+from dataclasses import replace
+
+import numpy as np
+import pytest
+
+from src.simulation import StrategyPlan, prepare_race, run_trials, run_variants
+
+
+@pytest.fixture(scope="module")
+def setup(synthetic_dir):
+    return prepare_race(2022, 1, data_dir=str(synthetic_dir))
+
+
+@pytest.fixture(scope="module")
+def flat_setup(synthetic_dir):
+    """Median-lap pace and the flat wear cycle, as the original scalar loop had."""
+    return prepare_race(2022, 1, data_dir=str(synthetic_dir), fitted=False)
+
+
+def _baseline_race(setup, random_seed):
+    """The original scalar `simulate_race` lap loop, minus the database writes."""
+    rng = np.random.default_rng(random_seed)
+    drivers, strategies, base_pace = setup.drivers, setup.strategies, setup.base_pace
+    driver_state = {}
+    for _, row in setup.grid.iterrows():
+        d = row["driver"]
+        driver_state[d] = {
+            "position": int(row["grid_position"]),
+            "total_time": 0.0,
+            "pitted_laps": set(),
+        }
+
+    for lap in range(1, setup.race_laps + 1):
+        lap_times = {}
+        for d in drivers:
+            base = base_pace.get(d, 90.0)
+            wear_penalty = 0.08 * (lap % 15)
+            traffic = 0.02 * (driver_state[d]["position"] - 1)
+            randomness = rng.normal(0, 0.15)
+
+            pit_time = 0.0
+            plan = strategies.get(d)
+            if plan and lap in plan.planned_pit_laps and lap not in driver_state[d]["pitted_laps"]:
+                pit_time = 22.0 + rng.normal(0, 0.8)
+                driver_state[d]["pitted_laps"].add(lap)
+
+            lap_time = base + wear_penalty + traffic + randomness + pit_time
+            lap_time = float(max(75.0, lap_time))
+            lap_times[d] = lap_time
+
+        for d in drivers:
+            driver_state[d]["total_time"] += lap_times[d]
+
+        ranking = sorted(drivers, key=lambda x: driver_state[x]["total_time"])
+        for pos, d in enumerate(ranking, start=1):
+            driver_state[d]["position"] = pos
+
+    return [driver_state[d]["position"] for d in drivers], [driver_state[d]["total_time"] for d in drivers]
+
+
+def _check_parity(setup, seeds):
+    batch = run_trials(setup, seeds)
+    for t, seed in enumerate(seeds):
+        finish, total = _baseline_race(setup, seed)
+        assert batch.finish_positions[t].tolist() == finish
+        np.testing.assert_array_equal(batch.total_time[t], total)
+
+
+def test_batch_matches_the_scalar_loop_per_seed(flat_setup):
+    _check_parity(flat_setup, [0, 7, 42])
+
+
+def test_parity_holds_with_stops_on_the_last_lap(flat_setup):
+    # The last driver pitting on the last lap uses the final draw of the stream
+    last = flat_setup.drivers[-1]
+    plans = {last: StrategyPlan(last, [3, flat_setup.race_laps], "Medium"),
+             flat_setup.drivers[0]: StrategyPlan(flat_setup.drivers[0], [], "Hard")}
+    _check_parity(replace(flat_setup, strategies={**flat_setup.strategies, **plans}), [1, 2])
+
+
+def test_trials_depend_only_on_their_seed(setup):
+    together = run_trials(setup, [3, 4, 5], keep_laps=True)
+    alone = run_trials(setup, [4], keep_laps=True)
+    np.testing.assert_array_equal(together.finish_positions[1], alone.finish_positions[0])
+    np.testing.assert_array_equal(together.lap_times[1], alone.lap_times[0])
+
+
+def test_variants_share_draws_and_match_separate_runs(setup):
+    driver = setup.drivers[0]
+    plan = setup.strategies[driver]
+    moved = replace(plan, planned_pit_laps=[lap + 2 for lap in plan.planned_pit_laps])
+    other = replace(setup, strategies={**setup.strategies, driver: moved})
+    seeds = [11, 12, 13, 14]
+    both = run_variants([setup, other], seeds, keep_laps=True)
+    for v, variant in enumerate([setup, other]):
+        alone = run_variants([variant], seeds, keep_laps=True)
+        rows = slice(v * len(seeds), (v + 1) * len(seeds))
+        np.testing.assert_array_equal(both.finish_positions[rows], alone.finish_positions)
+        np.testing.assert_array_equal(both.total_time[rows], alone.total_time)
+
+    # Before anyone's plan differs, every driver's laps are identical across variants
+    first_diff = min(set(plan.planned_pit_laps) ^ set(moved.planned_pit_laps))
+    np.testing.assert_array_equal(
+        both.lap_times[:len(seeds), :, :first_diff - 1], both.lap_times[len(seeds):, :, :first_diff - 1],
+    )
+
+
+def test_variants_must_share_the_field(setup):
+    shorter = replace(setup, race_laps=setup.race_laps - 1)
+    with pytest.raises(ValueError):
+        run_variants([setup, shorter], [1])
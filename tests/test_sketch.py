@@ -0,0 +1,80 @@
+from dataclasses import replace
+
+import numpy as np
+import pytest
+
+from src.simulation import prepare_race, run_trials
+from src.sketch import LAP_TIME_ACCURACY, SimulationSketch
+
+SEEDS = list(range(60))
+
+
+@pytest.fixture(scope="module")
+def setup(synthetic_dir):
+    return prepare_race(2022, 2, data_dir=str(synthetic_dir))
+
+
+@pytest.fixture(scope="module")
+def sketched(setup):
+    sketch = SimulationSketch.for_setup(setup)
+    batch = run_trials(setup, SEEDS, keep_laps=True, sketch=sketch)
+    return sketch, batch
+
+
+def test_sketch_counts_match_the_batch(setup, sketched):
+    sketch, batch = sketched
+    n_drivers = len(setup.drivers)
+    assert sketch.n_trials == len(SEEDS)
+    for j in range(n_drivers):
+        np.testing.assert_array_equal(
+            sketch.finish_counts[j], np.bincount(batch.finish_positions[:, j] - 1, minlength=n_drivers),
+        )
+        for i in range(setup.race_laps):
+            np.testing.assert_array_equal(
+                sketch.position_counts[i, j], np.bincount(batch.positions[:, j, i] - 1, minlength=n_drivers),
+            )
+    np.testing.assert_array_equal(sketch.pit_counts, setup.pit_mask().T * len(SEEDS))
+    assert sketch.lap_time_counts.sum(axis=1).tolist() == [len(SEEDS) * setup.race_laps] * n_drivers
+
+
+def test_merged_chunks_equal_one_pass(setup, sketched):
+    whole, _ = sketched
+    parts = []
+    for chunk in (SEEDS[:17], SEEDS[17:40], SEEDS[40:]):
+        part = SimulationSketch.for_setup(setup)
+        run_trials(setup, chunk, sketch=part)
+        parts.append(part)
+    merged = parts[0].merge(parts[1]).merge(parts[2])
+
+    assert merged.n_trials == whole.n_trials
+    for name in ("position_counts", "lap_time_counts", "pit_counts", "finish_counts"):
+        np.testing.assert_array_equal(getattr(merged, name), getattr(whole, name))
+
+
+def test_merge_rejects_other_fields(setup, sketched):
+    whole, _ = sketched
+    other = SimulationSketch.for_setup(replace(setup, race_laps=setup.race_laps - 1))
+    with pytest.raises(ValueError):
+        whole.merge(other)
+
+
+def test_lap_time_quantiles_within_accuracy(sketched):
+    sketch, batch = sketched
+    quantiles = (0.1, 0.5, 0.9)
+    table = sketch.lap_time_quantiles(quantiles)
+    assert table["driver"].tolist() == batch.drivers
+    for j in range(len(batch.drivers)):
+        times = batch.lap_times[:, j, :].ravel()
+        for q in quantiles:
+            exact = np.quantile(times, q, method="inverted_cdf")
+            estimate = table[f"q{int(round(q * 100))}"].iloc[j]
+            assert abs(estimate - exact) <= LAP_TIME_ACCURACY * exact
+
+
+def test_bytes_round_trip(sketched):
+    sketch, _ = sketched
+    restored = SimulationSketch.from_bytes(sketch.to_bytes())
+    assert restored.drivers == sketch.drivers
+    assert restored.n_trials == sketch.n_trials
+    for name in ("position_counts", "lap_time_counts", "pit_counts", "finish_counts", "compounds"):
+        np.testing.assert_array_equal(getattr(restored, name), getattr(sketch, name))
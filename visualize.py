@@ -1,26 +1,152 @@
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
 import pandas as pd
-import plotly.express as px
-from sqlalchemy import text
-from src.db import engine
+from sqlalchemy import inspect, text
+from src.db import get_engine
+
+# Columns each figure actually reads
+POSITION_COLUMNS = ["lap", "driver", "position"]
+TYRE_COLUMNS = ["lap", "driver", "tyre_compound"]
+FINISH_COLUMNS = ["driver", "points", "finish_position"]
+
+ORDER_BY = {"simulation_laps": "lap, position", "simulation_results": "finish_position"}
+
+# Above this many (driver, lap) points, line/heatmap figures keep every n-th lap
+MAX_PLOT_POINTS = 5000
+
+
+class _FrameCache:
+    """
+    Small LRU cache with a TTL for per-simulation frames.
+
+    Entries are keyed by (simulation_id, table, columns), columns being the
+    sorted tuple fetched or None for all of them, so fetches of different
+    columns sit side by side. A request for a subset of a cached entry's
+    columns is served from it without another query.
+    """
+
+    def __init__(self, maxsize: int = 32, ttl: float = 300.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Tuple[int, str, Optional[tuple]], Tuple[float, object]]" = OrderedDict()
+
+    @staticmethod
+    def _columns_key(columns: Optional[Sequence[str]]) -> Optional[tuple]:
+        return tuple(sorted(set(columns))) if columns is not None else None
+
+    def _live(self, key):
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        if time.monotonic() - entry[0] > self.ttl:
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return entry[1]
+
+    def get(self, simulation_id: int, table: str, columns: Optional[Sequence[str]]):
+        wanted = self._columns_key(columns)
+        value = self._live((simulation_id, table, wanted))
+        if value is not None or columns is None:
+            return value
+        # Any entry holding a superset of the columns will do, the full frame first
+        candidates = [(simulation_id, table, None)] + [
+            key for key in self._data
+            if key[:2] == (simulation_id, table) and key[2] is not None and set(wanted) < set(key[2])
+        ]
+        for key in candidates:
+            value = self._live(key)
+            if value is not None:
+                return value[list(columns)]
+        return None
+
+    def put(self, simulation_id: int, table: str, columns: Optional[Sequence[str]], value):
+        key = (simulation_id, table, self._columns_key(columns))
+        self._data[key] = (time.monotonic(), value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def clear(self):
+        self._data.clear()
+
+
+_cache = _FrameCache()
+# Cached in place of a sketch for simulations that were persisted as rows
+_NO_SKETCH = object()
+
+
+def clear_cache():
+    _cache.clear()
+
+
+def _load_table(table: str, simulation_id: int, columns: Optional[Sequence[str]] = None) -> pd.DataFrame:
+    cached = _cache.get(simulation_id, table, columns)
+    if cached is not None:
+        return cached
+    select_list = "*" if columns is None else ", ".join(columns)
+    df = pd.read_sql(
+        text(f"SELECT {select_list} FROM {table} WHERE simulation_id = :sid ORDER BY {ORDER_BY[table]}"),
+        get_engine(),
+        params={"sid": simulation_id},
+    )
+    _cache.put(simulation_id, table, columns, df)
+    return df
+
+
+def load_simulation_sketch(simulation_id: int):
+    """The `SimulationSketch` stored for a simulation, or None if it was persisted as rows."""
+    from src.sketch import SimulationSketch
+    cached = _cache.get(simulation_id, "simulation_sketches", None)
+    if cached is not None:
+        return None if cached is _NO_SKETCH else cached
+    sketch = None
+    with get_engine().connect() as conn:
+        if inspect(conn).has_table("simulation_sketches"):
+            payload = conn.execute(
+                text("SELECT payload FROM simulation_sketches WHERE simulation_id = :sid"), {"sid": simulation_id}
+            ).scalar()
+            if payload is not None:
+                sketch = SimulationSketch.from_bytes(bytes(payload))
+    # The outcome is cached either way, so row-based simulations skip the lookup too
+    _cache.put(simulation_id, "simulation_sketches", None, _NO_SKETCH if sketch is None else sketch)
+    return sketch
 
 
 def load_simulation_frames(simulation_id: int) -> tuple[pd.DataFrame, pd.DataFrame]:
-    laps = pd.read_sql(text("SELECT * FROM simulation_laps WHERE simulation_id = :sid ORDER BY lap, position"), engine, params={"sid": simulation_id})
-    results = pd.read_sql(text("SELECT * FROM simulation_results WHERE simulation_id = :sid ORDER BY finish_position"), engine, params={"sid": simulation_id})
+    laps = _load_table("simulation_laps", simulation_id)
+    results = _load_table("simulation_results", simulation_id)
     return laps, results
 
 
-def fig_positions_over_laps(simulation_id: int):
-    laps, _ = load_simulation_frames(simulation_id)
+def _downsample_laps(laps: pd.DataFrame, max_points: int = MAX_PLOT_POINTS) -> pd.DataFrame:
+    """Keep every n-th lap (and always the last) so the figure stays under `max_points`."""
+    if len(laps) <= max_points:
+        return laps
+    lap_numbers = np.sort(laps["lap"].unique())
+    stride = int(np.ceil(len(laps) / max_points))
+    keep = set(lap_numbers[::stride]) | {lap_numbers[-1]}
+    return laps[laps["lap"].isin(keep)]
+
+
+def fig_positions_over_laps(simulation_id: int, laps: Optional[pd.DataFrame] = None, sketch=None):
+    if sketch is not None:
+        laps = sketch.position_frame()
+    if laps is None:
+        laps = _load_table("simulation_laps", simulation_id, POSITION_COLUMNS)
     if laps.empty:
         return None
+    import plotly.express as px
     fig = px.line(
-        laps,
+        _downsample_laps(laps),
         x="lap",
         y="position",
         color="driver",
         line_group="driver",
-        title=f"Positions over Laps (Sim {simulation_id})",
+        title=f"{'Expected ' if sketch is not None else ''}Positions over Laps (Sim {simulation_id})",
         markers=False,
     )
     fig.update_yaxes(autorange="reversed", dtick=1)
@@ -28,14 +154,18 @@ def fig_positions_over_laps(simulation_id: int):
     return fig
 
 
-def fig_stint_tyre_heatmap(simulation_id: int):
-    laps, _ = load_simulation_frames(simulation_id)
+def fig_stint_tyre_heatmap(simulation_id: int, laps: Optional[pd.DataFrame] = None, sketch=None):
+    if sketch is not None:
+        laps = sketch.tyre_frame()
+    if laps is None:
+        laps = _load_table("simulation_laps", simulation_id, TYRE_COLUMNS)
     if laps.empty:
         return None
-    pivot = laps.pivot_table(index="driver", columns="lap", values="tyre_compound", aggfunc="last")
     # Encode compounds ordinally for coloring
     mapping = {"Soft": 2, "Medium": 1, "Hard": 0}
-    encoded = pivot.applymap(lambda x: mapping.get(x, -1))
+    coded = _downsample_laps(laps).assign(compound_code=lambda d: d["tyre_compound"].map(mapping).fillna(-1))
+    encoded = coded.pivot_table(index="driver", columns="lap", values="compound_code", aggfunc="last").fillna(-1)
+    import plotly.express as px
     fig = px.imshow(
         encoded,
         color_continuous_scale=["#999", "#FDBA74", "#22C55E"],
@@ -44,22 +174,44 @@ def fig_stint_tyre_heatmap(simulation_id: int):
         labels=dict(color="Compound (H/M/S)"),
         title=f"Tyre Compounds by Lap (Sim {simulation_id})",
     )
-    fig.update_yaxes(ticktext=list(pivot.index), tickvals=list(range(len(pivot.index))))
+    fig.update_yaxes(ticktext=list(encoded.index), tickvals=list(range(len(encoded.index))))
     return fig
 
 
-def fig_finish_bar(simulation_id: int):
-    _, results = load_simulation_frames(simulation_id)
+def fig_finish_bar(simulation_id: int, results: Optional[pd.DataFrame] = None, sketch=None):
+    if sketch is not None:
+        results = sketch.finish_frame()
+    if results is None:
+        results = _load_table("simulation_results", simulation_id, FINISH_COLUMNS)
     if results.empty:
         return None
+    import plotly.express as px
     fig = px.bar(
         results,
         x="driver",
         y="points",
         color="finish_position",
-        title=f"Simulated Points by Driver (Sim {simulation_id})",
+        title=f"Simulated {'Expected ' if sketch is not None else ''}Points by Driver (Sim {simulation_id})",
     )
     return fig
 
 
-
+def dashboard_bundle(simulation_id: int) -> Dict[str, object]:
+    """
+    Build every figure for one simulation from a single fetch per table, or
+    from its stored sketch when the simulation was persisted as one.
+    """
+    sketch = load_simulation_sketch(simulation_id)
+    if sketch is not None:
+        return {
+            "positions": fig_positions_over_laps(simulation_id, sketch=sketch),
+            "tyres": fig_stint_tyre_heatmap(simulation_id, sketch=sketch),
+            "finish": fig_finish_bar(simulation_id, sketch=sketch),
+        }
+    laps = _load_table("simulation_laps", simulation_id, sorted(set(POSITION_COLUMNS) | set(TYRE_COLUMNS)))
+    results = _load_table("simulation_results", simulation_id, FINISH_COLUMNS)
+    return {
+        "positions": fig_positions_over_laps(simulation_id, laps=laps),
+        "tyres": fig_stint_tyre_heatmap(simulation_id, laps=laps),
+        "finish": fig_finish_bar(simulation_id, results=results),
+    }